@@ -4,6 +4,7 @@
 # This file is licensed under the GNU General Public License v2.
 # See the file COPYING.txt for details.
 
+import time
 import wx
 import api
 import config
@@ -17,13 +18,29 @@ from scriptHandler import script
 from .labeler import (
 	makeLabelOverlay,
 	labelStore,
+	getCachedLabel,
+	cacheLabel,
 	getLabel,
 	setLabel,
 	removeLabel,
 )
-from .dialogs import SetLabelDialog, makeSettingsPanel
-from .fingerPrintReader import getObjectFingerprint, fingerprintToDict
-from . import virtualBufferSupport
+from .fingerPrintReader import (
+	getObjectFingerprint,
+	getObjectCacheKey,
+	getObjectWindow,
+	getFingerprintScope,
+	scopeFingerprint,
+	fingerprintToDict,
+	loadAppProfiles,
+	setRowLabelingEnabled,
+	ROW_ROLES,
+	SCOPES,
+	SCOPE_APP,
+	SCOPE_GLOBAL,
+	SCOPE_WINDOW,
+)
+from .circuitBreaker import breaker
+from .throttle import rateController
 
 import addonHandler
 
@@ -33,6 +50,10 @@ addonHandler.initTranslation()
 # Config spec for addon settings
 config.conf.spec["customLabels"] = {
 	"autoDescribe": "boolean(default=False)",
+	# Fingerprint profile assignments, as "appName=profileName" entries
+	"appProfiles": "string_list(default=list())",
+	# Allow labeling list items, tree items and table cells
+	"labelListItems": "boolean(default=False)",
 }
 
 # Only these roles can be labeled
@@ -61,7 +82,97 @@ def getRoleName(role):
 
 def isLabelable(obj):
 	"""Return True if the object's role supports custom labeling."""
-	return obj.role in LABELABLE_ROLES
+	role = obj.role
+	if role in LABELABLE_ROLES:
+		return True
+	return role in ROW_ROLES and config.conf["customLabels"]["labelListItems"]
+
+
+# Modules imported when first needed rather than at startup.
+# Browse mode support is loaded when a document first gains focus.
+_virtualBufferSupport = None
+_usageStats = None
+_recorder = None
+
+
+def _getVirtualBufferSupport():
+	global _virtualBufferSupport
+	if _virtualBufferSupport is None:
+		# It records label hits too.
+		_getUsageStats()
+		from . import virtualBufferSupport
+		virtualBufferSupport.initialize()
+		_virtualBufferSupport = virtualBufferSupport
+	return _virtualBufferSupport
+
+
+def _getUsageStats():
+	global _usageStats
+	if _usageStats is None:
+		from . import usageStats
+		usageStats.initialize(labelStore)
+		_usageStats = usageStats
+	return _usageStats
+
+
+def _getRecorder():
+	global _recorder
+	if _recorder is None:
+		from . import recorder
+		_recorder = recorder
+	return _recorder
+
+
+def _onLabelChanged(appName, fingerprint, label):
+	# Usage statistics note new labels, so they are loaded at the first change.
+	_getUsageStats().noteLabelChanged(appName, fingerprint, label)
+
+
+def _saveScopedLabel(fp, window, scope, label, currentKey):
+	"""Save a label in the chosen scope, replacing the user's label it was edited from.
+
+	A label of a broader scope than the chosen one is kept, as the new label only
+	overrides it: giving a control a label for one app keeps its label for all apps.
+	"""
+	key = scopeFingerprint(fp, scope, window)
+	with labelStore.batch():
+		if (
+			currentKey and currentKey != key
+			and SCOPES.index(getFingerprintScope(currentKey)) <= SCOPES.index(scope)
+		):
+			removeLabel(currentKey)
+		setLabel(key, label)
+
+
+class CustomLabelsSettingsPanel(gui.settingsDialogs.SettingsPanel):
+	"""The add-on's panel in NVDA's settings, holding the panel from the dialogs module.
+
+	The dialogs module imports most of the add-on, so it is only imported when
+	the panel is first shown: the panel it makes is then placed in this one,
+	which passes NVDA's calls on to it.
+	"""
+	# Translators: Title of the settings panel
+	title = _("Custom Labels")
+	_panelClass = None
+
+	def makeSettings(self, settingsSizer):
+		if CustomLabelsSettingsPanel._panelClass is None:
+			from .dialogs import makeSettingsPanel
+			CustomLabelsSettingsPanel._panelClass = makeSettingsPanel(labelStore)
+		self._panel = self._panelClass(self)
+		settingsSizer.Add(self._panel, proportion=1, flag=wx.EXPAND)
+
+	def isValid(self):
+		return self._panel.isValid()
+
+	def onSave(self):
+		self._panel.onSave()
+
+	def postSave(self):
+		self._panel.postSave()
+
+	def onDiscard(self):
+		self._panel.onDiscard()
 
 
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
@@ -70,13 +181,22 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
 	def __init__(self):
 		super().__init__()
-		# Create the settings panel class with the label store bound
-		self._settingsPanel = makeSettingsPanel(labelStore)
+		self._settingsPanel = CustomLabelsSettingsPanel
 		gui.settingsDialogs.NVDASettingsDialog.categoryClasses.append(self._settingsPanel)
-		virtualBufferSupport.initialize()
+		loadAppProfiles(config.conf["customLabels"]["appProfiles"])
+		setRowLabelingEnabled(config.conf["customLabels"]["labelListItems"])
+		labelStore.loadSources()
+		labelStore.labelChanged.register(_onLabelChanged)
 
 	def terminate(self):
-		virtualBufferSupport.terminate()
+		if _recorder is not None:
+			_recorder.stop()
+		if _virtualBufferSupport is not None:
+			_virtualBufferSupport.terminate()
+		labelStore.labelChanged.unregister(_onLabelChanged)
+		if _usageStats is not None:
+			_usageStats.terminate()
+		labelStore.closeSources()
 		# Unregister the settings panel
 		try:
 			gui.settingsDialogs.NVDASettingsDialog.categoryClasses.remove(self._settingsPanel)
@@ -90,31 +210,64 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			if not isLabelable(obj):
 				return
 
-			fp = getObjectFingerprint(obj)
-			if fp:
-				label = getLabel(fp)
+			# Skip apps that recently stalled a fingerprint, until their cooldown expires.
+			try:
+				appName = obj.appModule.appName
+			except Exception:
+				appName = "unknown"
+			if breaker.isTripped(appName):
+				return
+
+			startTime = time.perf_counter()
+			try:
+				self._applyLabelOverlay(obj, clsList, appName)
+			finally:
+				rateController.record(appName, (time.perf_counter() - startTime) * 1000)
+
+		except Exception:
+			log.error("CustomLabels: unexpected error in chooseNVDAObjectOverlayClasses", exc_info=True)
+
+	def _applyLabelOverlay(self, obj, clsList, appName):
+		cacheKey = getObjectCacheKey(obj)
+
+		# During an event storm only previously resolved objects are labeled,
+		# and auto-describe is skipped. Objects without a cache key, or not resolved
+		# before, are left as they are: a cached None and a miss are treated alike.
+		if rateController.isDegraded(appName):
+			if cacheKey is not None:
+				label = getCachedLabel(cacheKey)[1]
 				if label:
 					clsList.insert(0, makeLabelOverlay(label))
-					return
+			return
 
-			# Auto-describe: if enabled and name is empty, use description
-			if config.conf["customLabels"]["autoDescribe"]:
+		fp = getObjectFingerprint(obj)
+		label = key = None
+		if fp:
+			# The window is only read for apps with window-scoped labels.
+			label, key = labelStore.lookup(fp, lambda: getObjectWindow(obj))
+		if cacheKey is not None:
+			cacheLabel(cacheKey, label)
+		if label:
+			clsList.insert(0, makeLabelOverlay(label))
+			usageStats = _getUsageStats()
+			usageStats.recordHit(key, usageStats.getAppVersion(obj))
+			return
+
+		# Auto-describe: if enabled and name is empty, use description
+		if config.conf["customLabels"]["autoDescribe"]:
+			try:
+				name = obj._get_name() if hasattr(obj, '_get_name') else obj.name
+			except Exception:
+				log.debugWarning("CustomLabels: failed to get name for auto-describe check", exc_info=True)
+				name = obj.name
+			if not name:
 				try:
-					name = obj._get_name() if hasattr(obj, '_get_name') else obj.name
+					desc = obj.description
 				except Exception:
-					log.debugWarning("CustomLabels: failed to get name for auto-describe check", exc_info=True)
-					name = obj.name
-				if not name:
-					try:
-						desc = obj.description
-					except Exception:
-						log.debugWarning("CustomLabels: failed to get description for auto-describe", exc_info=True)
-						desc = None
-					if desc:
-						clsList.insert(0, makeLabelOverlay(desc))
-
-		except Exception:
-			log.error("CustomLabels: unexpected error in chooseNVDAObjectOverlayClasses", exc_info=True)
+					log.debugWarning("CustomLabels: failed to get description for auto-describe", exc_info=True)
+					desc = None
+				if desc:
+					clsList.insert(0, makeLabelOverlay(desc))
 
 	@script(
 		# Translators: Description for the set custom label script
@@ -131,7 +284,8 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			return
 
 		try:
-			fp = getObjectFingerprint(obj)
+			# The fingerprint is saved with the label, so it must not have dropped fields.
+			fp = getObjectFingerprint(obj, enforceBudget=False)
 			if not fp:
 				# Translators: Error message when control cannot be identified
 				ui.message(_("Cannot identify this control"))
@@ -142,7 +296,10 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			ui.message(_("An unexpected error occurred"))
 			return
 
-		currentLabel = getLabel(fp)
+		window = getObjectWindow(obj)
+		currentLabel = getLabel(fp, window)
+		# The user's label, if any, which may apply to the window, the app or all apps.
+		currentKey = labelStore.getLabelKey(fp, window)
 		fpDict = fingerprintToDict(fp)
 
 		# Get original name, bypassing any custom label overlay
@@ -159,21 +316,33 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			'app': fpDict.get('app', _('Unknown')),
 		}
 
+		scopes = []
+		if window:
+			# Translators: Choice in the label dialog for a label that applies to one window only.
+			# {window} is the title of the window.
+			scopes.append((SCOPE_WINDOW, _("This window ({window})").format(window=window)))
+		# Translators: Choice in the label dialog for a label that applies to the whole application
+		scopes.append((SCOPE_APP, _("This application")))
+		# Translators: Choice in the label dialog for a label that applies to all applications
+		scopes.append((SCOPE_GLOBAL, _("All applications")))
+		currentScope = getFingerprintScope(currentKey) if currentKey else SCOPE_APP
+
 		def showDialog():
-			dlg = SetLabelDialog(gui.mainFrame, controlInfo, currentLabel)
+			from .dialogs import SetLabelDialog
+			dlg = SetLabelDialog(gui.mainFrame, controlInfo, currentLabel, scopes, currentScope)
 			gui.mainFrame.prePopup()
 			try:
 				result = dlg.ShowModal()
 				if result == wx.ID_OK:
 					if dlg.result == "":
-						if removeLabel(fp):
+						if currentKey and removeLabel(currentKey):
 							# Translators: Confirmation when label is removed
 							wx.CallAfter(ui.message, _("Label removed"))
 						else:
 							# Translators: Message when there's no label to remove
 							wx.CallAfter(ui.message, _("No label to remove"))
 					elif dlg.result:
-						setLabel(fp, dlg.result)
+						_saveScopedLabel(fp, window, dlg.scope, dlg.result, currentKey)
 						# Translators: Confirmation when label is set. {label} is the new label text.
 						wx.CallAfter(ui.message, _("Label set to: {label}").format(label=dlg.result))
 			finally:
@@ -193,7 +362,8 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
 		try:
 			fp = getObjectFingerprint(obj)
-			if fp and removeLabel(fp):
+			key = labelStore.getLabelKey(fp, lambda: getObjectWindow(obj)) if fp else None
+			if key and removeLabel(key):
 				# Translators: Confirmation when label is removed
 				ui.message(_("Label removed"))
 			else:
@@ -215,7 +385,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 
 		try:
 			fp = getObjectFingerprint(obj)
-			label = getLabel(fp) if fp else None
+			label = getLabel(fp, lambda: getObjectWindow(obj)) if fp else None
 
 			if label:
 				# Translators: Message showing the custom label. {label} is the label text.
@@ -237,11 +407,85 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		"""Open the Custom Labels settings panel."""
 		wx.CallAfter(self._openSettingsPanel)
 
+	@script(
+		# Translators: Description for the script reporting apps skipped because they respond slowly
+		description=_("Report applications whose custom labels are paused because they respond slowly"),
+	)
+	def script_reportSlowApps(self, gesture):
+		"""Report apps and properties currently skipped by the circuit breaker."""
+		tripped = breaker.getTripped()
+		if not tripped:
+			# Translators: Message when no application is being skipped for responding slowly
+			ui.message(_("No slow applications"))
+			return
+		parts = []
+		for appName, prop in tripped:
+			if prop is None:
+				# Translators: Reported for an app whose custom labels are paused. {app} is the app name.
+				parts.append(_("{app}: all labels paused").format(app=appName))
+			else:
+				# Translators: Reported for an app where one control property is skipped.
+				# {app} is the app name, {property} the skipped property.
+				parts.append(_("{app}: skipping {property}").format(app=appName, property=prop))
+		ui.message(", ".join(parts))
+
+	@script(
+		# Translators: Description for the script writing recent custom label events to the log
+		description=_("Write recent custom label events to the NVDA log"),
+	)
+	def script_dumpTrace(self, gesture):
+		from . import trace
+		count = trace.dump()
+		# Translators: Reported after recent events were written to the log. {count} is the number of events.
+		ui.message(_("{count} events written to the log").format(count=count))
+
+	@script(
+		# Translators: Description for the script starting or stopping a recording for offline profiling
+		description=_("Start or stop recording focus and browse mode events for offline profiling"),
+	)
+	def script_toggleRecording(self, gesture):
+		recorder = _getRecorder()
+		if recorder.active:
+			path = recorder.stop()
+			# Translators: Reported when a recording stops. {path} is the recording file.
+			ui.message(_("Recording saved to {path}").format(path=path))
+			return
+		try:
+			recorder.start()
+		except OSError:
+			log.error("CustomLabels: failed to start recording", exc_info=True)
+			# Translators: Reported when a recording cannot be started
+			ui.message(_("Could not start recording"))
+			return
+		# Translators: Reported when a recording starts
+		ui.message(_("Recording"))
+
+	def event_treeInterceptor_gainFocus(self, obj, nextHandler):
+		"""Load browse mode support when a document first gains focus, and patch the document."""
+		_getVirtualBufferSupport().ensurePatched(obj)
+		nextHandler()
+
 	def event_gainFocus(self, obj, nextHandler):
-		"""Ensure the browse mode patch is applied whenever a virtual buffer gains focus."""
+		"""Record the event while recording, and ensure the browse mode patch is applied
+		whenever a virtual buffer gains focus.
+		"""
+		if _recorder is not None and _recorder.active:
+			_recorder.recordFocus(obj)
 		ti = getattr(obj, "treeInterceptor", None)
 		if ti is not None:
-			virtualBufferSupport.ensurePatched(ti)
+			_getVirtualBufferSupport().ensurePatched(ti)
+		nextHandler()
+
+	def event_nameChange(self, obj, nextHandler):
+		"""Drop browse mode cache entries for a renamed control and its descendants."""
+		if _virtualBufferSupport is not None:
+			_virtualBufferSupport.handleNodeChange(obj)
+		nextHandler()
+
+	def event_reorder(self, obj, nextHandler):
+		"""Drop browse mode cache entries for a container whose children changed."""
+		if _virtualBufferSupport is not None:
+			_virtualBufferSupport.handleNodeChange(obj)
 		nextHandler()
 
 	def _openSettingsPanel(self):
@@ -0,0 +1,89 @@
+# circuitBreaker
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Protects NVDA from applications that are slow to answer property reads.
+
+# How this works:
+# Every property read made while fingerprinting is timed and reported with record().
+# When a read takes longer than the threshold, the breaker trips:
+# - for skippable properties (optional fingerprint fields), only that property is
+#   skipped for that app until the cooldown expires;
+# - for anything else, the whole app is tripped, and custom label lookups for it
+#   are skipped until the cooldown expires.
+# After the cooldown the next read is measured again, and trips again if still slow.
+# A COM call that is already blocking cannot be interrupted; the breaker only
+# prevents the following calls from paying the same price.
+
+import time
+from collections import deque
+from logHandler import log
+
+
+class CircuitBreaker:
+	"""Tracks property read latency per app and per property, and trips on slow reads."""
+
+	def __init__(self, thresholdMs=200, appThresholdMs=500, cooldownSec=30, maxEvents=100):
+		self.thresholdMs = thresholdMs
+		self.appThresholdMs = appThresholdMs
+		self.cooldownSec = cooldownSec
+		# (appName, prop) -> monotonic time the trip expires. prop None means the whole app.
+		self._tripped = {}
+		# Most recent trip events: (wall clock time, appName, prop, latencyMs)
+		self._events = deque(maxlen=maxEvents)
+		self.tripCount = 0
+
+	def isTripped(self, appName, prop=None):
+		"""Return True if reads of prop (or, with prop None, all lookups) are skipped for appName."""
+		expiry = self._tripped.get((appName, prop))
+		if expiry is None:
+			return False
+		if time.monotonic() >= expiry:
+			del self._tripped[(appName, prop)]
+			log.info(f"CustomLabels: circuit breaker reset for '{appName}' ({prop or 'all lookups'})")
+			return False
+		return True
+
+	def record(self, appName, prop, latencyMs, skippable=False):
+		"""Record how long a property read took, tripping the breaker if it was too slow."""
+		if latencyMs <= self.thresholdMs:
+			return
+		self._trip(appName, prop if skippable else None, latencyMs)
+
+	def recordTotal(self, appName, latencyMs):
+		"""Record how long a complete fingerprint took, tripping the whole app if it was too slow."""
+		if latencyMs > self.appThresholdMs:
+			self._trip(appName, None, latencyMs)
+
+	def _trip(self, appName, prop, latencyMs):
+		if (appName, prop) in self._tripped:
+			return
+		self._tripped[(appName, prop)] = time.monotonic() + self.cooldownSec
+		self._events.append((time.time(), appName, prop, latencyMs))
+		self.tripCount += 1
+		log.info(
+			f"CustomLabels: circuit breaker tripped for '{appName}' ({prop or 'all lookups'}) "
+			f"after a {latencyMs:.0f} ms read; skipping for {self.cooldownSec} s",
+		)
+
+	def getTripEvents(self):
+		"""Return the most recent trip events as (time, appName, prop, latencyMs) tuples, oldest first.
+
+		prop is None when the whole app was tripped.
+		"""
+		return list(self._events)
+
+	def getTripped(self):
+		"""Return the (appName, prop) pairs currently tripped."""
+		now = time.monotonic()
+		return [key for key, expiry in self._tripped.items() if expiry > now]
+
+	def reset(self):
+		"""Close all tripped circuits."""
+		self._tripped.clear()
+
+
+# Global circuit breaker instance
+breaker = CircuitBreaker()
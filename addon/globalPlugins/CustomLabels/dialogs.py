@@ -5,6 +5,7 @@
 # This file is licensed under the GNU General Public License v2.
 # See the file COPYING.txt for details.
 
+import threading
 import wx
 import config
 import gui
@@ -14,6 +15,25 @@ import controlTypes
 import addonHandler
 from logHandler import log
 
+from .fingerPrintReader import (
+	GLOBAL_APP,
+	SCOPE_APP,
+	WINDOW_FIELD,
+	getFingerprintIdentifier,
+	setRowLabelingEnabled,
+)
+from .searchIndex import LabelSearchIndex
+from .labelPacks import (
+	LabelPackError,
+	MERGE_KEEP_EXISTING,
+	MERGE_OVERWRITE,
+	MERGE_REPLACE_APP,
+	exportPack,
+	iterPackApps,
+	mergeAppLabels,
+)
+from .usageStats import findUnusedLabels, pruneLabels
+
 # Initialize translations
 addonHandler.initTranslation()
 
@@ -29,14 +49,20 @@ def getRoleDisplayString(roleValue):
 
 
 class SetLabelDialog(wx.Dialog):
-	"""Dialog to set or edit a custom label for a control."""
+	"""Dialog to set or edit a custom label for a control.
+
+	scopes, if given, are (scope, display text) pairs the user chooses the label's scope
+	from, starting with currentScope. The chosen scope is left in self.scope.
+	"""
 
-	def __init__(self, parent, controlInfo, currentLabel=None):
+	def __init__(self, parent, controlInfo, currentLabel=None, scopes=None, currentScope=SCOPE_APP):
 		# Translators: Title of dialog when editing an existing label or setting a new label
 		title = _("Edit Custom Label") if currentLabel else _("Set Custom Label")
 		super().__init__(parent, title=title)
 
 		self.result = None
+		self.scope = currentScope
+		self._scopes = [scope for scope, text in scopes] if scopes else []
 
 		mainSizer = wx.BoxSizer(wx.VERTICAL)
 		sHelper = gui.guiHelper.BoxSizerHelper(self, orientation=wx.VERTICAL)
@@ -95,6 +121,18 @@ class SetLabelDialog(wx.Dialog):
 		# Pre-populate with current label (if editing) or original name (if setting new)
 		self.labelEdit.SetValue(currentLabel or controlInfo.get('name', ''))
 
+		self.scopeChoice = None
+		if scopes:
+			# Translators: Label for the choice of where a custom label applies
+			scopeText = _("&Applies to:")
+			self.scopeChoice = sHelper.addLabeledControl(
+				scopeText, wx.Choice, choices=[text for scope, text in scopes],
+			)
+			if currentScope in self._scopes:
+				self.scopeChoice.SetSelection(self._scopes.index(currentScope))
+			else:
+				self.scopeChoice.SetSelection(0)
+
 		bHelper = sHelper.addItem(gui.guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
 
 		# Translators: OK button
@@ -118,6 +156,8 @@ class SetLabelDialog(wx.Dialog):
 
 	def Okay(self, evt):
 		self.result = self.labelEdit.GetValue().strip()
+		if self.scopeChoice is not None:
+			self.scope = self._scopes[self.scopeChoice.GetSelection()]
 		self.EndModal(wx.ID_OK)
 
 	def onRemove(self, evt):
@@ -125,6 +165,129 @@ class SetLabelDialog(wx.Dialog):
 		self.EndModal(wx.ID_OK)
 
 
+class PruneLabelsDialog(wx.Dialog):
+	"""Dialog choosing which unused labels to remove."""
+
+	def __init__(self, parent):
+		# Translators: Title of the dialog for removing unused labels
+		super().__init__(parent, title=_("Remove Unused Labels"))
+
+		mainSizer = wx.BoxSizer(wx.VERTICAL)
+		sHelper = gui.guiHelper.BoxSizerHelper(self, orientation=wx.VERTICAL)
+
+		# Translators: Label for the number of days after which a label counts as unused
+		daysText = _("Remove labels not used for this many &days:")
+		self.daysEdit = sHelper.addLabeledControl(daysText, wx.SpinCtrl, min=1, max=3650, initial=180)
+
+		self.appUpdateCheckbox = sHelper.addItem(
+			# Translators: Option to also remove labels not used since their application was updated
+			wx.CheckBox(self, label=_("Also remove labels not used since their a&pplication was updated"))
+		)
+
+		self.archiveCheckbox = sHelper.addItem(
+			# Translators: Option to save the removed labels to a label pack in the archive folder
+			wx.CheckBox(self, label=_("&Keep a copy of the removed labels in the archive folder"))
+		)
+		self.archiveCheckbox.SetValue(True)
+
+		bHelper = sHelper.addItem(gui.guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
+
+		# Translators: OK button
+		okayButton = bHelper.addButton(self, id=wx.ID_OK, label=_("&OK"))
+		okayButton.SetDefault()
+
+		# Translators: Cancel button
+		bHelper.addButton(self, id=wx.ID_CANCEL, label=_("&Cancel"))
+
+		mainSizer.Add(sHelper.sizer, border=gui.guiHelper.BORDER_FOR_DIALOGS, flag=wx.ALL)
+		mainSizer.Fit(self)
+		self.SetSizer(mainSizer)
+		self.daysEdit.SetFocus()
+		self.CentreOnScreen()
+
+	def getOptions(self):
+		"""Return (days, sinceAppUpdate, archive)."""
+		return self.daysEdit.GetValue(), self.appUpdateCheckbox.GetValue(), self.archiveCheckbox.GetValue()
+
+
+# Apps with more labels than this show them in a virtual list instead of as tree items.
+_VIRTUAL_LIST_THRESHOLD = 500
+
+# Seconds an import waits for the main thread to merge one app before giving up.
+_IMPORT_APP_TIMEOUT = 60
+
+
+def formatLabelText(label, fp):
+	"""Return the text shown for a label in the settings panel."""
+	idStr = getFingerprintIdentifier(fp)
+	# Translators: A label in the settings panel. {label} is the label, {identifier} the control identifier.
+	text = _("{label} - {identifier}").format(label=label, identifier=idStr) if idStr else label
+	window = dict(fp).get(WINDOW_FIELD)
+	if window:
+		# Translators: A label of one window in the settings panel. {label} is the label text,
+		# {window} the title of the window.
+		text = _("{label} (in {window})").format(label=text, window=window)
+	return text
+
+
+def getAppDisplayName(appName):
+	"""Return the name shown for an app in the settings panel."""
+	# Translators: Name shown in the settings panel for the labels that apply to all applications
+	return _("All applications") if appName == GLOBAL_APP else appName
+
+
+class AppLabelsListCtrl(wx.ListCtrl):
+	"""Virtual list of the labels of one app, used for apps with many labels.
+
+	Rows are only formatted when the list displays them, so showing an app
+	costs the same however many labels it has.
+	"""
+
+	def __init__(self, parent, **kwargs):
+		super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL, **kwargs)
+		# Translators: Column header for the custom label
+		self.InsertColumn(0, _("Label"), width=200)
+		# Translators: Column header for the control identifier
+		self.InsertColumn(1, _("Identifier"), width=250)
+		self.appName = None
+		self._entries = []
+
+	def setApp(self, appName, labels):
+		"""Show the labels of appName, given as {fingerprint: label}."""
+		self.appName = appName
+		self._entries = list(labels.items())
+		self.SetItemCount(len(self._entries))
+		self.Refresh()
+
+	def clearApp(self):
+		self.appName = None
+		self._entries = []
+		self.SetItemCount(0)
+
+	def getSelectedEntry(self):
+		"""Return the (fingerprint, label) of the first selected row, or None."""
+		index = self.GetFirstSelected()
+		if index == -1 or index >= len(self._entries):
+			return None
+		return self._entries[index]
+
+	def getSelectedEntries(self):
+		"""Return the (fingerprint, label) of every selected row."""
+		entries = []
+		index = self.GetFirstSelected()
+		while index != -1:
+			if index < len(self._entries):
+				entries.append(self._entries[index])
+			index = self.GetNextSelected(index)
+		return entries
+
+	def OnGetItemText(self, item, column):
+		fp, label = self._entries[item]
+		if column == 0:
+			return label
+		return getFingerprintIdentifier(fp)
+
+
 def makeSettingsPanel(labelStore):
 	"""Return a CustomLabelsSettingsPanel class with labelStore bound at class creation time.
 
@@ -133,28 +296,58 @@ def makeSettingsPanel(labelStore):
 	"""
 
 	class CustomLabelsSettingsPanel(gui.settingsDialogs.SettingsPanel):
-		"""Settings panel for managing custom labels."""
+		"""Settings panel for managing custom labels.
+
+		App nodes are created from label counts only. Their labels are added when
+		the node is expanded, or shown in a virtual list for apps with many labels.
+		Later changes are applied item by item from the store's labelChanged notifications.
+		"""
 		# Translators: Title of the settings panel
 		title = _("Custom Labels")
 		_store = labelStore
+		# Shared by all instances of the panel, so it is only built once per session.
+		_searchIndex = LabelSearchIndex(labelStore)
 
 		def makeSettings(self, settingsSizer):
 			sHelper = gui.guiHelper.BoxSizerHelper(self, sizer=settingsSizer)
 
 			# Store mapping from tree items to data
 			self._itemData = {}
+			# {appName: set of fingerprints} matching the filter, or None when not filtering
+			self._filter = None
+			# True while a filter update for label changes is queued
+			self._filterPending = False
+
+			# Translators: Label for the field filtering the custom labels
+			filterText = _("&Filter:")
+			self.filterEdit = sHelper.addLabeledControl(filterText, wx.TextCtrl)
+			self.filterEdit.Bind(wx.EVT_TEXT, self.onFilterChanged)
 
 			# Translators: Label for the tree of custom labels
 			labelsText = _("&Available custom labels:")
 			self.labelsTree = sHelper.addLabeledControl(
 				labelsText,
 				wx.TreeCtrl,
-				style=wx.TR_HAS_BUTTONS | wx.TR_LINES_AT_ROOT | wx.TR_SINGLE
+				style=wx.TR_HAS_BUTTONS | wx.TR_LINES_AT_ROOT | wx.TR_MULTIPLE
 			)
 
+			# Shown instead of tree items when an app with many labels is selected.
+			self._appLabelsSizer = wx.BoxSizer(wx.VERTICAL)
+			# Translators: Label for the list of labels of the selected application
+			appLabelsText = wx.StaticText(self, label=_("Labels of &the selected application:"))
+			self._appLabelsSizer.Add(appLabelsText)
+			self.appLabelsList = AppLabelsListCtrl(self, size=(450, 200))
+			self._appLabelsSizer.Add(self.appLabelsList, flag=wx.EXPAND)
+			sHelper.addItem(self._appLabelsSizer, flag=wx.EXPAND)
+			self._appLabelsSizer.ShowItems(False)
+
 			self._populateTree()
 
 			self.labelsTree.Bind(wx.EVT_TREE_SEL_CHANGED, self.onTreeSelChanged)
+			self.labelsTree.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.onTreeItemExpanding)
+			self.appLabelsList.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onListSelChanged)
+			self.appLabelsList.Bind(wx.EVT_LIST_ITEM_DESELECTED, self.onListSelChanged)
+			self._store.labelChanged.register(self._onLabelChanged)
 
 			bHelper = sHelper.addItem(gui.guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
 
@@ -177,6 +370,20 @@ def makeSettingsPanel(labelStore):
 			self.removeAllButton = bHelper.addButton(self, label=_("Remove &All"))
 			self.removeAllButton.Bind(wx.EVT_BUTTON, self.onRemoveAll)
 
+			packsHelper = sHelper.addItem(gui.guiHelper.ButtonHelper(orientation=wx.HORIZONTAL))
+
+			# Translators: Button to import a label pack
+			self.importButton = packsHelper.addButton(self, label=_("&Import..."))
+			self.importButton.Bind(wx.EVT_BUTTON, self.onImport)
+
+			# Translators: Button to export all labels to a label pack
+			self.exportButton = packsHelper.addButton(self, label=_("E&xport..."))
+			self.exportButton.Bind(wx.EVT_BUTTON, self.onExport)
+
+			# Translators: Button to remove labels that have not been used for a while
+			self.pruneButton = packsHelper.addButton(self, label=_("Remove &Unused..."))
+			self.pruneButton.Bind(wx.EVT_BUTTON, self.onPrune)
+
 			self._updateButtonStates()
 
 			# Translators: Checkbox label for auto-describe feature
@@ -185,20 +392,11 @@ def makeSettingsPanel(labelStore):
 			)
 			self.autoDescribeCheckbox.SetValue(config.conf["customLabels"]["autoDescribe"])
 
-		def _getExpandedApps(self):
-			"""Return the set of app names whose tree nodes are currently expanded."""
-			expanded = set()
-			root = self.labelsTree.GetRootItem()
-			if not root.IsOk():
-				return expanded
-			child, cookie = self.labelsTree.GetFirstChild(root)
-			while child.IsOk():
-				if self.labelsTree.IsExpanded(child):
-					data = self._itemData.get(child)
-					if data:
-						expanded.add(data[0])
-				child, cookie = self.labelsTree.GetNextChild(root, cookie)
-			return expanded
+			# Translators: Checkbox label for allowing labels on list items, tree items and table cells
+			self.labelListItemsCheckbox = sHelper.addItem(
+				wx.CheckBox(self, label=_("Allow labeling &list items, tree items and table cells"))
+			)
+			self.labelListItemsCheckbox.SetValue(config.conf["customLabels"]["labelListItems"])
 
 		def _getSelectedAppName(self):
 			data = self._getSelectedData()
@@ -206,99 +404,264 @@ def makeSettingsPanel(labelStore):
 				return data[0]
 			return None
 
-		def _populateTree(self, restoreAppName=None):
-			"""Rebuild the tree, restoring expanded state and optionally re-selecting an app node.
+		def _populateTree(self):
+			"""Build the tree of app nodes, for all labels or those matching the filter.
 
-			Args:
-				restoreAppName: if given, select this app's node after rebuilding.
+			Only app nodes are created here; label items are added when an app is expanded.
+			Afterwards the tree is kept up to date by _onLabelChanged, one item at a time.
 			"""
-			expandedApps = self._getExpandedApps()
-
 			self.labelsTree.DeleteAllItems()
 			self._itemData.clear()
+			# {appName: app tree item}
+			self._appItems = {}
+			# {appName: label count}
+			self._appCounts = {}
+			# {appName: {fingerprint: label tree item}}, for apps whose label items were added
+			self._labelItems = {}
+			self.appLabelsList.clearApp()
 
 			# Translators: Root item in the labels tree
 			root = self.labelsTree.AddRoot(_("All Labels"))
 
-			# Get labels grouped by app
-			labelsByApp = self._store.getAllByApp()
-
-			restoreItem = None
-			for appName in sorted(labelsByApp.keys()):
-				labels = labelsByApp[appName]
-				if not labels:
-					continue
+			if self._filter is None:
+				appCounts = self._store.getAppCounts()
+			else:
+				appCounts = {appName: len(fps) for appName, fps in self._filter.items()}
+			for appName in sorted(appCounts.keys()):
+				count = appCounts[appName]
+				if count:
+					self._insertAppItem(appName, count)
 
-				# Translators: App node showing app name and label count
-				appText = _("{app} ({count} labels)").format(app=appName, count=len(labels))
-				appItem = self.labelsTree.AppendItem(root, appText)
-				self._itemData[appItem] = (appName, None)
+			self.labelsTree.Expand(root)
 
-				for fp, label in labels.items():
-					fpDict = dict(fp)
-					idStr = fpDict.get("automationId") or fpDict.get("windowClassName") or fpDict.get("htmlId") or ""
-					labelText = _("{label} - {identifier}").format(label=label, identifier=idStr) if idStr else label
-					labelItem = self.labelsTree.AppendItem(appItem, labelText)
-					self._itemData[labelItem] = (appName, fp)
+			# First open: expand the first app node by default
+			firstChild, cookie = self.labelsTree.GetFirstChild(root)
+			if firstChild.IsOk() and firstChild in self._itemData:
+				self._expandApp(firstChild)
 
-				# Restore expanded state for this app node
-				if appName in expandedApps:
-					self.labelsTree.Expand(appItem)
+		def _getAppLabels(self, appName):
+			"""Return {fingerprint: label} for an app, limited to the filter's matches."""
+			labels = self._store.getLabelsForApp(appName)
+			if self._filter is None:
+				return labels
+			matches = self._filter.get(appName, ())
+			return {fp: label for fp, label in labels.items() if fp in matches}
 
-				if appName == restoreAppName:
-					restoreItem = appItem
+		def onFilterChanged(self, evt):
+			self._applyFilter()
 
-			self.labelsTree.Expand(root)
+		def _applyPendingFilter(self):
+			self._filterPending = False
+			self._applyFilter()
 
-			# Restore selection, or fall back to expanding the first child
-			if restoreItem and restoreItem.IsOk():
-				self.labelsTree.SelectItem(restoreItem)
-			else:
-				firstChild, cookie = self.labelsTree.GetFirstChild(root)
-				if firstChild.IsOk() and firstChild not in self._itemData:
-					pass  # root only, nothing to expand
-				elif firstChild.IsOk() and not expandedApps:
-					# First open: expand the first app node by default
-					self.labelsTree.Expand(firstChild)
+		def _applyFilter(self):
+			if not self:
+				return
+			query = self.filterEdit.GetValue().strip()
+			self._filter = self._searchIndex.search(query) if query else None
+			self._populateTree()
+			self._updateAppLabelsList()
+			self._updateButtonStates()
 
-		def _updateButtonStates(self):
-			selection = self.labelsTree.GetSelection()
-			hasLabels = bool(self._itemData)
+		def _getAppText(self, appName):
+			# Translators: App node showing app name and label count
+			return _("{app} ({count} labels)").format(
+				app=getAppDisplayName(appName), count=self._appCounts[appName],
+			)
 
-			if not selection.IsOk() or selection == self.labelsTree.GetRootItem():
-				self.editButton.Disable()
-				self.removeButton.Disable()
-				self.removeAppButton.Disable()
-			else:
-				data = self._itemData.get(selection)
-				if data:
-					appName, fp = data
-					if fp is None:
-						self.editButton.Disable()
-						self.removeButton.Disable()
-						self.removeAppButton.Enable()
-					else:
-						self.editButton.Enable()
-						self.removeButton.Enable()
-						self.removeAppButton.Enable()
+		def _insertAppItem(self, appName, count):
+			"""Add an app node, keeping app nodes sorted by name."""
+			root = self.labelsTree.GetRootItem()
+			self._appCounts[appName] = count
+			laterApps = [name for name in self._appItems if name > appName]
+			appText = self._getAppText(appName)
+			if laterApps:
+				nextItem = self._appItems[min(laterApps)]
+				previousItem = self.labelsTree.GetPrevSibling(nextItem)
+				if previousItem.IsOk():
+					appItem = self.labelsTree.InsertItem(root, previousItem, appText)
 				else:
-					self.editButton.Disable()
-					self.removeButton.Disable()
-					self.removeAppButton.Disable()
+					appItem = self.labelsTree.PrependItem(root, appText)
+			else:
+				appItem = self.labelsTree.AppendItem(root, appText)
+			self._itemData[appItem] = (appName, None)
+			self._appItems[appName] = appItem
+			# Apps with many labels have no label items; selecting them shows the virtual list.
+			if count <= _VIRTUAL_LIST_THRESHOLD:
+				self.labelsTree.SetItemHasChildren(appItem, True)
+			return appItem
+
+		def _removeAppItem(self, appName):
+			appItem = self._appItems.pop(appName, None)
+			self._appCounts.pop(appName, None)
+			for labelItem in self._labelItems.pop(appName, {}).values():
+				self._itemData.pop(labelItem, None)
+			if appItem is not None:
+				self._itemData.pop(appItem, None)
+				self.labelsTree.Delete(appItem)
+
+		def _populateApp(self, appItem):
+			"""Add the label items of an app node, if not added yet."""
+			data = self._itemData.get(appItem)
+			if not data or data[1] is not None:
+				return
+			appName = data[0]
+			if appName in self._labelItems:
+				return
+			items = self._labelItems[appName] = {}
+			labels = self._getAppLabels(appName)
+			if len(labels) > _VIRTUAL_LIST_THRESHOLD:
+				self.labelsTree.SetItemHasChildren(appItem, False)
+				return
+			for fp, label in labels.items():
+				self._appendLabelItem(appItem, appName, fp, label, items)
+
+		def _appendLabelItem(self, appItem, appName, fp, label, items):
+			labelItem = self.labelsTree.AppendItem(appItem, formatLabelText(label, fp))
+			self._itemData[labelItem] = (appName, fp)
+			items[fp] = labelItem
+
+		def _onLabelChanged(self, appName, fingerprint, label, previousLabel):
+			"""Patch the tree for one label change in the store.
+
+			Only the changed label item and its app node are touched, so the cost
+			does not depend on how many labels other apps have. App counts change only
+			when previousLabel tells a label was added or removed: a label without a tree
+			item may be edited too, as apps get label items only once expanded, and never
+			when shown in the virtual list.
+			"""
+			if not self:
+				# The panel has been destroyed.
+				self._store.labelChanged.unregister(self._onLabelChanged)
+				return
+			if self._filter is not None:
+				# Matches are recomputed once the search index has seen the change too,
+				# once for all the changes notified meanwhile, as an import makes thousands.
+				if not self._filterPending:
+					self._filterPending = True
+					wx.CallAfter(self._applyPendingFilter)
+				return
+			selection = self.labelsTree.GetFocusedItem()
+			selectedData = self._itemData.get(selection) if selection.IsOk() else None
 
-			if hasLabels:
-				self.removeAllButton.Enable()
+			if fingerprint is None:
+				self._removeAppItem(appName)
 			else:
-				self.removeAllButton.Disable()
+				items = self._labelItems.get(appName)
+				labelItem = items.get(fingerprint) if items else None
+				if label is None:
+					if labelItem is not None:
+						del items[fingerprint]
+						self._itemData.pop(labelItem, None)
+						self.labelsTree.Delete(labelItem)
+					self._updateAppCount(appName, -1)
+				elif labelItem is not None:
+					self.labelsTree.SetItemText(labelItem, formatLabelText(label, fingerprint))
+				elif previousLabel is None:
+					self._updateAppCount(appName, 1)
+					if items is not None and appName in self._appItems:
+						self._appendLabelItem(self._appItems[appName], appName, fingerprint, label, items)
+
+			# If the focused item went away, select its app node, or the root.
+			if selectedData and selection not in self._itemData:
+				appItem = self._appItems.get(selectedData[0])
+				if appItem is None:
+					appItem = self.labelsTree.GetRootItem()
+				self.labelsTree.UnselectAll()
+				self.labelsTree.SelectItem(appItem)
+				self.labelsTree.SetFocusedItem(appItem)
+			if self.appLabelsList.appName == appName:
+				# Reload the virtual list of this app only.
+				self.appLabelsList.clearApp()
+			self._updateAppLabelsList()
+			self._updateButtonStates()
+
+		def _updateAppCount(self, appName, delta):
+			count = self._appCounts.get(appName, 0) + delta
+			if count <= 0:
+				self._removeAppItem(appName)
+				return
+			appItem = self._appItems.get(appName)
+			if appItem is None:
+				self._insertAppItem(appName, count)
+				return
+			self._appCounts[appName] = count
+			self.labelsTree.SetItemText(appItem, self._getAppText(appName))
+			if count > _VIRTUAL_LIST_THRESHOLD and self._labelItems.get(appName):
+				# Too many labels for tree items now: switch the app to the virtual list.
+				for labelItem in self._labelItems.pop(appName).values():
+					self._itemData.pop(labelItem, None)
+				self.labelsTree.DeleteChildren(appItem)
+				self.labelsTree.SetItemHasChildren(appItem, False)
+
+		def _unregisterStoreEvents(self):
+			self._store.labelChanged.unregister(self._onLabelChanged)
+
+		def _expandApp(self, appItem):
+			self._populateApp(appItem)
+			if self.labelsTree.ItemHasChildren(appItem):
+				self.labelsTree.Expand(appItem)
+
+		def onTreeItemExpanding(self, evt):
+			self._populateApp(evt.GetItem())
+			evt.Skip()
+
+		def _updateAppLabelsList(self):
+			"""Show the virtual list if an app with many labels is focused, otherwise hide it."""
+			selection = self.labelsTree.GetFocusedItem()
+			data = self._itemData.get(selection) if selection.IsOk() else None
+			showList = False
+			if data and data[1] is None and not self.labelsTree.ItemHasChildren(selection):
+				labels = self._getAppLabels(data[0])
+				if len(labels) > _VIRTUAL_LIST_THRESHOLD:
+					if self.appLabelsList.appName != data[0]:
+						self.appLabelsList.setApp(data[0], labels)
+					showList = True
+			if not showList:
+				self.appLabelsList.clearApp()
+			if self._appLabelsSizer.AreAnyItemsShown() != showList:
+				self._appLabelsSizer.ShowItems(showList)
+				self.Layout()
+
+		def _updateButtonStates(self):
+			data = self._getSelectedData()
+			isLabel = bool(data and data[1] is not None)
+			self.editButton.Enable(isLabel)
+			self.removeButton.Enable(isLabel or bool(self._getSelectedLabels()))
+			self.removeAppButton.Enable(bool(data))
+			self.removeAllButton.Enable(bool(self._itemData))
+			self.pruneButton.Enable(bool(self._itemData))
 
 		def onTreeSelChanged(self, evt):
+			self._updateAppLabelsList()
+			self._updateButtonStates()
+
+		def onListSelChanged(self, evt):
 			self._updateButtonStates()
 
 		def _getSelectedData(self):
-			selection = self.labelsTree.GetSelection()
+			"""Return (appName, fingerprint or None) for the focused tree item or selected virtual list row."""
+			selection = self.labelsTree.GetFocusedItem()
 			if not selection.IsOk():
 				return None
-			return self._itemData.get(selection)
+			data = self._itemData.get(selection)
+			if data and data[1] is None and self.appLabelsList.appName == data[0]:
+				entry = self.appLabelsList.getSelectedEntry()
+				if entry:
+					return (data[0], entry[0])
+			return data
+
+		def _getSelectedLabels(self):
+			"""Return (appName, fingerprint) for every selected label, in the tree and the virtual list."""
+			selected = []
+			for item in self.labelsTree.GetSelections():
+				data = self._itemData.get(item)
+				if data and data[1] is not None:
+					selected.append(data)
+			appName = self.appLabelsList.appName
+			if appName is not None:
+				selected.extend((appName, fp) for fp, label in self.appLabelsList.getSelectedEntries())
+			return selected
 
 		def onEdit(self, evt):
 			data = self._getSelectedData()
@@ -309,14 +672,14 @@ def makeSettingsPanel(labelStore):
 			currentLabel = self._store.get(fp)
 			fpDict = dict(fp)
 
-			identifier = fpDict.get("automationId") or fpDict.get("windowClassName") or fpDict.get("htmlId") or ""
+			identifier = getFingerprintIdentifier(fp)
 			roleValue = fpDict.get("role", 0)
 			roleName = getRoleDisplayString(roleValue)
 
 			controlInfo = {
 				'name': fpDict.get("name", _("(not available from saved data)")),
 				'role': roleName,
-				'app': fpDict.get("app", ""),
+				'app': getAppDisplayName(fpDict.get("app", "")),
 				'identifier': identifier,
 			}
 
@@ -329,65 +692,299 @@ def makeSettingsPanel(labelStore):
 					elif dlg.result:
 						self._store.set(fp, dlg.result)
 						log.debug(f"CustomLabels: label updated for '{appName}' via settings panel")
-					self._populateTree(restoreAppName=appName)
-					self._updateButtonStates()
 			except Exception:
 				log.error("CustomLabels: unexpected error in settings panel onEdit", exc_info=True)
 			finally:
 				dlg.Destroy()
 
 		def onRemove(self, evt):
-			data = self._getSelectedData()
-			if not data or data[1] is None:
-				return
-
-			appName, fp = data
-			label = self._store.get(fp)
+			selected = self._getSelectedLabels()
+			if not selected:
+				data = self._getSelectedData()
+				if not data or data[1] is None:
+					return
+				selected = [data]
+
+			if len(selected) == 1:
+				appName, fp = selected[0]
+				label = self._store.get(fp)
+				message = _("Remove label '{label}'?").format(label=label)
+			else:
+				# Translators: Confirmation when removing several selected labels
+				message = _("Remove {count} selected labels?").format(count=len(selected))
 
 			if gui.messageBox(
-				_("Remove label '{label}'?").format(label=label),
+				message,
 				_("Confirm Removal"),
 				wx.YES_NO | wx.ICON_QUESTION
 			) == wx.YES:
-				self._store.remove(fp)
-				log.debug(f"CustomLabels: label '{label}' removed for '{appName}' via settings panel")
-				self._populateTree(restoreAppName=appName)
-				self._updateButtonStates()
+				# One batch: each affected app file is written once, and caches are flushed once.
+				removed = self._store.removeMany([fp for appName, fp in selected])
+				log.debug(f"CustomLabels: {removed} labels removed via settings panel")
 
 		def onRemoveApp(self, evt):
 			appName = self._getSelectedAppName()
 			if not appName:
 				return
 
-			labels = self._store.getLabelsForApp(appName)
-			count = len(labels)
+			count = self._appCounts.get(appName, 0)
 
 			if gui.messageBox(
-				_("Remove all {count} labels for '{app}'?").format(count=count, app=appName),
+				_("Remove all {count} labels for '{app}'?").format(
+					count=count, app=getAppDisplayName(appName),
+				),
 				_("Confirm Removal"),
 				wx.YES_NO | wx.ICON_WARNING
 			) == wx.YES:
 				self._store.removeApp(appName)
 				log.debug(f"CustomLabels: all {count} labels removed for '{appName}' via settings panel")
-				self._populateTree()
-				self._updateButtonStates()
 
 		def onRemoveAll(self, evt):
-			allLabels = self._store.getAll()
-			if not allLabels:
+			count = sum(self._appCounts.values())
+			if not count:
 				return
 
 			if gui.messageBox(
-				_("Remove all {count} custom labels?").format(count=len(allLabels)),
+				_("Remove all {count} custom labels?").format(count=count),
 				_("Confirm Removal"),
 				wx.YES_NO | wx.ICON_WARNING
 			) == wx.YES:
 				self._store.clear()
-				log.debug(f"CustomLabels: all {len(allLabels)} labels cleared via settings panel")
-				self._populateTree()
-				self._updateButtonStates()
+				log.debug(f"CustomLabels: all {count} labels cleared via settings panel")
+
+		def onExport(self, evt):
+			with wx.FileDialog(
+				self,
+				# Translators: Title of the dialog for choosing where to export labels
+				message=_("Export custom labels"),
+				defaultFile="customLabels.zip",
+				# Translators: File type of label packs in the import and export dialogs
+				wildcard=_("Label packs (*.zip)|*.zip"),
+				style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
+			) as fileDialog:
+				if fileDialog.ShowModal() != wx.ID_OK:
+					return
+				path = fileDialog.GetPath()
+
+			progress = wx.ProgressDialog(
+				# Translators: Title of the progress dialog shown while exporting labels
+				_("Exporting custom labels"),
+				# Translators: Message of the progress dialog before the first app is exported
+				_("Preparing..."),
+				parent=self,
+				style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE,
+			)
+
+			def onProgress(index, total, appName):
+				progress.Update(index * 100 // total, appName)
+
+			try:
+				exported = exportPack(path, self._store, onProgress=onProgress)
+			except Exception as e:
+				log.error(f"CustomLabels: failed to export labels to '{path}'", exc_info=True)
+				gui.messageBox(
+					# Translators: Message when exporting labels fails
+					_("Could not export custom labels: {error}").format(error=e),
+					_("Error"),
+					wx.OK | wx.ICON_ERROR
+				)
+				return
+			finally:
+				progress.Destroy()
+			gui.messageBox(
+				# Translators: Message after labels were exported
+				_("{count} custom labels exported.").format(count=exported),
+				# Translators: Title of the message after labels were exported
+				_("Export Complete"),
+				wx.OK | wx.ICON_INFORMATION
+			)
+
+		def onPrune(self, evt):
+			dlg = PruneLabelsDialog(self)
+			try:
+				if dlg.ShowModal() != wx.ID_OK:
+					return
+				days, sinceAppUpdate, archive = dlg.getOptions()
+			finally:
+				dlg.Destroy()
+
+			unused = findUnusedLabels(self._store, days, sinceAppUpdate)
+			count = sum(len(labels) for labels in unused.values())
+			if not count:
+				gui.messageBox(
+					# Translators: Message when no label is unused
+					_("All custom labels have been used recently."),
+					# Translators: Title of the dialog for removing unused labels
+					_("Remove Unused Labels"),
+					wx.OK | wx.ICON_INFORMATION
+				)
+				return
+			if gui.messageBox(
+				# Translators: Confirmation before removing unused labels
+				_("Remove {count} unused labels of {apps} applications?").format(count=count, apps=len(unused)),
+				_("Confirm Removal"),
+				wx.YES_NO | wx.ICON_QUESTION
+			) != wx.YES:
+				return
+
+			try:
+				removed, archivePath = pruneLabels(self._store, unused, archive)
+			except Exception as e:
+				log.error("CustomLabels: failed to remove unused labels", exc_info=True)
+				gui.messageBox(
+					# Translators: Message when removing unused labels fails
+					_("Could not remove unused labels: {error}").format(error=e),
+					_("Error"),
+					wx.OK | wx.ICON_ERROR
+				)
+				return
+			if archivePath:
+				# Translators: Message after unused labels were removed and archived
+				message = _(
+					"{count} unused labels removed. A copy was saved to {path}, which can be imported to restore them."
+				).format(count=removed, path=archivePath)
+			else:
+				# Translators: Message after unused labels were removed
+				message = _("{count} unused labels removed.").format(count=removed)
+			gui.messageBox(
+				message,
+				_("Remove Unused Labels"),
+				wx.OK | wx.ICON_INFORMATION
+			)
+
+		def onImport(self, evt):
+			with wx.FileDialog(
+				self,
+				# Translators: Title of the dialog for choosing a label pack to import
+				message=_("Import custom labels"),
+				wildcard=_("Label packs (*.zip)|*.zip"),
+				style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST,
+			) as fileDialog:
+				if fileDialog.ShowModal() != wx.ID_OK:
+					return
+				path = fileDialog.GetPath()
+
+			policies = (MERGE_KEEP_EXISTING, MERGE_OVERWRITE, MERGE_REPLACE_APP)
+			choices = (
+				# Translators: Import option keeping labels that already exist
+				_("Keep my existing labels"),
+				# Translators: Import option replacing existing labels with those from the pack
+				_("Replace existing labels with those from the pack"),
+				# Translators: Import option removing all labels of each app in the pack first
+				_("Remove all my labels for each app in the pack first"),
+			)
+			with wx.SingleChoiceDialog(
+				self,
+				# Translators: Question asked before importing a label pack
+				_("When a control already has a custom label:"),
+				# Translators: Title of the dialog asking how to import a label pack
+				_("Import custom labels"),
+				choices,
+			) as policyDialog:
+				if policyDialog.ShowModal() != wx.ID_OK:
+					return
+				policy = policies[policyDialog.GetSelection()]
+
+			progress = wx.ProgressDialog(
+				# Translators: Title of the progress dialog shown while importing labels
+				_("Importing custom labels"),
+				# Translators: Message of the progress dialog before the first app is imported
+				_("Reading label pack..."),
+				parent=self,
+				style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT,
+			)
+			# [added, updated, skipped, apps]
+			totals = [0, 0, 0, 0]
+			threading.Thread(
+				target=self._importWorker,
+				args=(path, policy, progress, totals),
+				name="CustomLabels pack import",
+				daemon=True,
+			).start()
+
+		def _importWorker(self, path, policy, progress, totals):
+			"""Read a label pack in the background, one app at a time.
+
+			Each app is merged on the main thread, and the next app is only read once
+			that is done, so at most one app's labels are held in memory.
+			"""
+			error = None
+			try:
+				for index, total, appName, labels in iterPackApps(path, self._store):
+					merged = threading.Event()
+					state = {"cancelled": False}
+					wx.CallAfter(
+						self._importApp, progress, index, total, appName, labels, policy, totals, state, merged
+					)
+					if not merged.wait(_IMPORT_APP_TIMEOUT):
+						# The main thread has not merged the app: stop, and skip the merge if it runs later.
+						state["cancelled"] = True
+						log.error(
+							f"CustomLabels: importing '{path}' stopped: merging '{appName}' "
+							f"took more than {_IMPORT_APP_TIMEOUT} seconds"
+						)
+						# Translators: Error when importing a label pack stops because NVDA did not respond
+						error = _("Timed out while importing the labels of {app}").format(app=appName)
+						break
+					if state["cancelled"]:
+						break
+			except LabelPackError as e:
+				error = str(e)
+			except Exception as e:
+				log.error(f"CustomLabels: failed to import labels from '{path}'", exc_info=True)
+				error = str(e)
+			wx.CallAfter(self._onImportDone, progress, totals, error)
+
+		def _importApp(self, progress, index, total, appName, labels, policy, totals, state, merged):
+			try:
+				if state["cancelled"]:
+					# The import timed out waiting for this call.
+					return
+				# Translators: Progress message while importing the labels of an application
+				message = _("Importing {app} ({index} of {total})").format(app=appName, index=index + 1, total=total)
+				keepGoing = progress.Update(index * 100 // total, message)[0]
+				if not keepGoing:
+					state["cancelled"] = True
+					return
+				added, updated, skipped = mergeAppLabels(self._store, appName, labels, policy)
+				totals[0] += added
+				totals[1] += updated
+				totals[2] += skipped
+				totals[3] += 1
+			except Exception:
+				log.error(f"CustomLabels: failed to import labels for '{appName}'", exc_info=True)
+			finally:
+				merged.set()
+
+		def _onImportDone(self, progress, totals, error):
+			progress.Destroy()
+			if error:
+				gui.messageBox(
+					# Translators: Message when a label pack cannot be imported
+					_("Could not import custom labels: {error}").format(error=error),
+					_("Error"),
+					wx.OK | wx.ICON_ERROR
+				)
+				return
+			added, updated, skipped, apps = totals
+			log.debug(f"CustomLabels: imported {apps} apps: {added} added, {updated} updated, {skipped} kept")
+			# Translators: Message after a label pack was imported
+			message = _("Imported labels for {apps} applications: {added} added, {updated} replaced, {skipped} unchanged.")
+			gui.messageBox(
+				message.format(apps=apps, added=added, updated=updated, skipped=skipped),
+				# Translators: Title of the message after a label pack was imported
+				_("Import Complete"),
+				wx.OK | wx.ICON_INFORMATION
+			)
+
+		def onDiscard(self):
+			self._unregisterStoreEvents()
 
 		def onSave(self):
+			self._unregisterStoreEvents()
 			config.conf["customLabels"]["autoDescribe"] = self.autoDescribeCheckbox.GetValue()
+			labelListItems = self.labelListItemsCheckbox.GetValue()
+			config.conf["customLabels"]["labelListItems"] = labelListItems
+			setRowLabelingEnabled(labelListItems)
 
 	return CustomLabelsSettingsPanel
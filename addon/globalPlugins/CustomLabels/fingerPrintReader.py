@@ -6,9 +6,37 @@
 # See the file COPYING.txt for details.
 # This module provides functions to generate a stable fingerprint for an NVDAObject based on its properties.
 
+import sys
+import time
+from collections import OrderedDict
+import controlTypes
+import winUser
 from logHandler import log
-from NVDAObjects.UIA import UIA
-from NVDAObjects.JAB import JAB
+# Small, and needed to strip HTML from JAB names as NVDA does: imported with the add-on.
+from NVDAObjects import JAB as _JABModule
+
+from .circuitBreaker import breaker
+from .trace import dumpOnError, trace
+
+
+def _getLoadedClass(moduleName, className):
+	"""Return a class of an NVDA module if the module is loaded, else None.
+
+	An object can only be an instance of a class whose module was loaded, so
+	UIA objects are told apart this way instead of importing NVDAObjects.UIA,
+	and UI Automation with it, when the add-on starts.
+	"""
+	module = sys.modules.get(moduleName)
+	return getattr(module, className, None) if module is not None else None
+
+
+def isUIAObject(obj):
+	UIA = _getLoadedClass("NVDAObjects.UIA", "UIA")
+	return UIA is not None and isinstance(obj, UIA)
+
+
+def isJABObject(obj):
+	return isinstance(obj, _JABModule.JAB)
 
 
 class FingerprintHandler:
@@ -27,6 +55,20 @@ class FingerprintHandler:
 		"""Return the framework-specific fields to include in the fingerprint."""
 		raise NotImplementedError
 
+	@classmethod
+	def get_snapshot(cls, obj):
+		"""Fetch everything the handler builds the fingerprint from in as few calls as possible.
+
+		Return None (the default) if the handler reads properties from obj directly.
+		A non-None snapshot is passed to get_shared_field() and get_fields().
+		"""
+		return None
+
+	@classmethod
+	def get_shared_field(cls, obj, field, snapshot):
+		"""Return the value of a shared field (name, description or parentName)."""
+		return _FIELD_READERS[field](obj)
+
 	@classmethod
 	def needs_disambiguation(cls, fields: dict) -> bool:
 		"""Return True if the primary fields are too weak to uniquely identify the control."""
@@ -109,7 +151,7 @@ class UIAHandler(FingerprintHandler):
 
 	@classmethod
 	def can_handle(cls, obj):
-		return isinstance(obj, UIA)
+		return isUIAObject(obj)
 
 	@classmethod
 	def get_fields(cls, obj):
@@ -168,15 +210,75 @@ class UIAHandler(FingerprintHandler):
 		return True
 
 
+class _JABSnapshot:
+	"""Context info of a JAB object and its parent, fetched once per fingerprint."""
+
+	def __init__(self, info, parentInfo, windowClassName, windowControlID):
+		self.info = info
+		self.parentInfo = parentInfo
+		self.windowClassName = windowClassName
+		self.windowControlID = windowControlID
+
+
+# NVDA strips HTML from JAB names and descriptions; use the same function so
+# snapshot values match what obj.name and obj.description return.
+_processJABHtml = getattr(_JABModule, "_processHtml", None) or (lambda text: text)
+
+
 class JABHandler(FingerprintHandler):
+	"""Handler for Java Access Bridge objects.
+
+	Every property read on a JAB object is a separate round trip over the bridge,
+	which makes labeling laggy in large Swing apps. The handler fetches the
+	object's and its parent's context info once, and builds all fields from that.
+	"""
 	backend_name = "JAB"
 
 	@classmethod
 	def can_handle(cls, obj):
-		return isinstance(obj, JAB)
+		return isJABObject(obj)
 
 	@classmethod
-	def get_fields(cls, obj):
+	def get_snapshot(cls, obj):
+		try:
+			jabContext = obj.jabContext
+			info = jabContext.getAccessibleContextInfo()
+			parentContext = jabContext.getAccessibleParentFromContext()
+			parentInfo = parentContext.getAccessibleContextInfo() if parentContext else None
+		except Exception:
+			log.debugWarning("CustomLabels [JAB]: failed to get context info", exc_info=True)
+			return None
+		return _JABSnapshot(
+			info,
+			parentInfo,
+			cls._safeGet(obj, "windowClassName", "", "windowClassName"),
+			cls._safeGet(obj, "windowControlID", 0, "windowControlID"),
+		)
+
+	@classmethod
+	def get_shared_field(cls, obj, field, snapshot):
+		if snapshot is None:
+			# The bridge calls failed: read the properties from NVDA, one at a time.
+			return super().get_shared_field(obj, field, snapshot)
+		if field == "name":
+			return _processJABHtml(snapshot.info.name or "")
+		if field == "description":
+			return _processJABHtml(snapshot.info.description or "")
+		if field == "parentName":
+			parentInfo = snapshot.parentInfo
+			if parentInfo is None:
+				# A top-level Java control, whose parent is a native window the bridge does not give.
+				return _readParentName(obj)
+			return _processJABHtml(parentInfo.name or "")
+		return super().get_shared_field(obj, field, snapshot)
+
+	@classmethod
+	def get_fields(cls, obj, snapshot=None):
+		if snapshot is not None:
+			return {
+				"windowClassName": snapshot.windowClassName,
+				"windowControlID": snapshot.windowControlID,
+			}
 		return {
 			"windowClassName": cls._safeGet(obj, "windowClassName", "", "windowClassName"),
 			"windowControlID": cls._safeGet(obj, "windowControlID", 0, "windowControlID"),
@@ -242,14 +344,181 @@ def _isIa2Web(obj):
 		return False
 
 
-def getObjectFingerprint(obj):
+# Fingerprint strategy profiles
+
+# Shared fields collected by getObjectFingerprint, independent of the backend.
+SHARED_FIELDS = ("name", "description", "parentName")
+
+# Name of the profile used when an app has no profile assigned.
+# Fingerprints built with it carry no "profile" field, so labels saved before
+# profiles existed keep matching.
+DEFAULT_PROFILE = "default"
+
+
+class FingerprintProfile:
+	"""Declares which shared fields are collected for an app, and in what order.
+
+	Fields listed in ``optional`` are dropped once collecting the fingerprint has
+	taken longer than ``budgetMs`` milliseconds. Required fields are always read.
+	"""
+
+	def __init__(self, name, fields=SHARED_FIELDS, optional=(), budgetMs=None):
+		unknown = set(fields) - set(SHARED_FIELDS)
+		if unknown:
+			raise ValueError(f"Unknown fingerprint fields: {sorted(unknown)}")
+		self.name = name
+		self.fields = tuple(fields)
+		self.optional = frozenset(optional) & frozenset(fields)
+		self.budgetMs = budgetMs
+
+	def __repr__(self):
+		return f"FingerprintProfile({self.name!r}, fields={self.fields!r}, budgetMs={self.budgetMs!r})"
+
+
+_profiles: dict[str, FingerprintProfile] = {}
+
+# appName -> profile name
+_appProfiles: dict[str, str] = {}
+
+
+def registerProfile(profile: FingerprintProfile):
+	"""Register a fingerprint profile so apps can be assigned to it by name."""
+	_profiles[profile.name] = profile
+
+
+def getProfile(name):
+	"""Return the profile registered under name, or the default profile."""
+	return _profiles.get(name) or _profiles[DEFAULT_PROFILE]
+
+
+def setAppProfile(appName, profileName):
+	"""Assign a profile to an app. Passing None or the default profile name removes the assignment."""
+	if not profileName or profileName == DEFAULT_PROFILE:
+		_appProfiles.pop(appName, None)
+		return
+	if profileName not in _profiles:
+		raise ValueError(f"Unknown fingerprint profile: {profileName!r}")
+	_appProfiles[appName] = profileName
+
+
+def getProfileForApp(appName):
+	"""Return the profile used to fingerprint objects of the given app."""
+	return getProfile(_appProfiles.get(appName, DEFAULT_PROFILE))
+
+
+def loadAppProfiles(entries):
+	"""Apply app profile assignments from config entries of the form "appName=profileName"."""
+	_appProfiles.clear()
+	for entry in entries:
+		appName, sep, profileName = entry.partition("=")
+		appName = appName.strip()
+		profileName = profileName.strip()
+		if not sep or not appName:
+			log.debugWarning(f"CustomLabels: ignoring malformed app profile entry {entry!r}")
+			continue
+		try:
+			setAppProfile(appName, profileName)
+		except ValueError:
+			log.debugWarning(f"CustomLabels: ignoring app profile entry {entry!r}", exc_info=True)
+
+
+# Collects everything, as fingerprints always did.
+registerProfile(FingerprintProfile(DEFAULT_PROFILE))
+# For apps whose controls are identified by their name and backend fields alone.
+registerProfile(FingerprintProfile("minimal", fields=("name",)))
+# For apps where description and parent reads are slow (some Java and Electron apps):
+# those fields are skipped once the fingerprint has taken 30 ms.
+registerProfile(FingerprintProfile(
+	"slow",
+	fields=("name", "parentName", "description"),
+	optional=("parentName", "description"),
+	budgetMs=30,
+))
+
+
+def _readName(obj):
+	# Prefer _get_name() to bypass any custom label overlay, but fall back to
+	# obj.name if _get_name() returns empty — during chooseNVDAObjectOverlayClasses
+	# the IAccessible COM call may not be ready yet for partially constructed objects,
+	# while NVDA's cached obj.name (populated from the focus event) is reliable.
+	name = ""
+	if hasattr(obj, '_get_name'):
+		try:
+			name = obj._get_name() or ""
+		except Exception:
+			pass
+	if not name:
+		name = obj.name or ""
+	return name
+
+
+def _readDescription(obj):
+	# Helps differentiate controls with the same name
+	# (e.g., multiple "Filter Options" buttons in Java apps like Ghidra)
+	return obj.description or ""
+
+
+def _readParentName(obj):
+	# Helps differentiate controls in different toolbars/panels
+	# that otherwise have identical properties
+	parent = obj.parent
+	return parent.name or "" if parent else ""
+
+
+_FIELD_READERS = {
+	"name": _readName,
+	"description": _readDescription,
+	"parentName": _readParentName,
+}
+
+# Shared fields the circuit breaker may skip for a slow app on their own.
+# A slow read of any other field trips the whole app instead.
+_SKIPPABLE_FIELDS = frozenset({"description", "parentName"})
+
+
+def getMissingFields(fp):
+	"""Return the shared fields the fingerprint's profile declares but the fingerprint lacks.
+
+	A non-empty result means optional fields were dropped while the fingerprint was built,
+	so it can only be matched against saved labels on the fields it does have.
+	"""
+	fpDict = dict(fp)
+	if isRowFingerprint(fpDict):
+		return frozenset()
+	profile = getProfile(fpDict.get("profile", DEFAULT_PROFILE))
+	return frozenset(f for f in profile.fields if f not in fpDict)
+
+
+def getObjectFingerprint(obj, enforceBudget=True):
+	"""Return a stable fingerprint for an NVDAObject.
+
+	Rows of lists, trees and tables get a row fingerprint when row labeling is enabled.
+	See _buildObjectFingerprint() and getRowFingerprint().
+	"""
+	if _rowLabelingEnabled:
+		try:
+			isRow = obj.role in ROW_ROLES
+		except Exception:
+			isRow = False
+		if isRow:
+			return getRowFingerprint(obj)
+	return _buildObjectFingerprint(obj, enforceBudget)
+
+
+def _buildObjectFingerprint(obj, enforceBudget=True):
 	"""
 	Return a stable fingerprint for an NVDAObject.
-	Uses backend-specific properties plus the original name for differentiation.
-	When primary identifiers are weak (e.g. empty automationId, or web content
-	where controlID is shared), positional disambiguation fields are added.
+	Uses backend-specific properties plus the shared fields declared by the app's
+	fingerprint profile. When primary identifiers are weak (e.g. empty automationId,
+	or web content where controlID is shared), positional disambiguation fields are added.
+
+	Every read is timed and reported to the circuit breaker. Fields the breaker has
+	tripped for the app are skipped, like fields over the profile's budget.
+	Pass enforceBudget=False when the fingerprint is going to be saved with a label,
+	so it always carries every field its profile declares.
 	"""
 	try:
+		startTime = time.perf_counter()
 		fp = {}
 
 		# App name
@@ -259,6 +528,10 @@ def getObjectFingerprint(obj):
 			log.debugWarning("CustomLabels: failed to get appName", exc_info=True)
 			fp["app"] = "unknown"
 
+		profile = getProfileForApp(fp["app"])
+		if profile.name != DEFAULT_PROFILE:
+			fp["profile"] = profile.name
+
 		# Role
 		try:
 			fp["role"] = int(obj.role)
@@ -266,50 +539,45 @@ def getObjectFingerprint(obj):
 			log.debugWarning("CustomLabels: failed to get role", exc_info=True)
 			fp["role"] = 0
 
-		# Original name - helps differentiate controls with different names.
-		# Prefer _get_name() to bypass any custom label overlay, but fall back to
-		# obj.name if _get_name() returns empty — during chooseNVDAObjectOverlayClasses
-		# the IAccessible COM call may not be ready yet for partially constructed objects,
-		# while NVDA's cached obj.name (populated from the focus event) is reliable.
-		try:
-			name = ""
-			if hasattr(obj, '_get_name'):
-				try:
-					name = obj._get_name() or ""
-				except Exception:
-					pass
-			if not name:
-				name = obj.name or ""
-			fp["name"] = name
-		except Exception:
-			log.debugWarning("CustomLabels: failed to get name", exc_info=True)
-			fp["name"] = ""
-
-		# Description - helps differentiate controls with the same name
-		# (e.g., multiple "Filter Options" buttons in Java apps like Ghidra)
-		try:
-			fp["description"] = obj.description or ""
-		except Exception:
-			log.debugWarning("CustomLabels: failed to get description", exc_info=True)
-			fp["description"] = ""
-
-		# Parent name - helps differentiate controls in different
-		# toolbars/panels that otherwise have identical properties
-		try:
-			parent = obj.parent
-			fp["parentName"] = parent.name or "" if parent else ""
-		except Exception:
-			log.debugWarning("CustomLabels: failed to get parentName", exc_info=True)
-			fp["parentName"] = ""
-
-		# Framework-specific fields
 		handler = _getHandler(obj)
 		if handler is None:
 			log.debugWarning("CustomLabels: no fingerprint handler matched for object")
 			return None
-
 		fp["backend"] = handler.backend_name
-		backendFields = handler.get_fields(obj)
+		appName = fp["app"]
+
+		# Handlers for backends where each read is a round trip (e.g. JAB) fetch
+		# everything up front; the fields below are then built from the snapshot.
+		snapshotStart = time.perf_counter()
+		snapshot = handler.get_snapshot(obj)
+		if snapshot is not None:
+			breaker.record(appName, handler.backend_name, (time.perf_counter() - snapshotStart) * 1000)
+
+		# Shared fields, in the order the profile declares them.
+		# Optional fields are left out entirely once the budget is spent.
+		for field in profile.fields:
+			skippable = field in _SKIPPABLE_FIELDS
+			if enforceBudget:
+				if field in profile.optional and profile.budgetMs is not None:
+					if (time.perf_counter() - startTime) * 1000 > profile.budgetMs:
+						continue
+				if skippable and breaker.isTripped(appName, field):
+					continue
+			fieldStart = time.perf_counter()
+			try:
+				fp[field] = handler.get_shared_field(obj, field, snapshot)
+			except Exception:
+				log.debugWarning(f"CustomLabels: failed to get {field}", exc_info=True)
+				fp[field] = ""
+			breaker.record(appName, field, (time.perf_counter() - fieldStart) * 1000, skippable)
+
+		# Framework-specific fields
+		fieldStart = time.perf_counter()
+		if snapshot is None:
+			backendFields = handler.get_fields(obj)
+		else:
+			backendFields = handler.get_fields(obj, snapshot)
+		breaker.record(appName, handler.backend_name, (time.perf_counter() - fieldStart) * 1000)
 		# Strip private keys (prefixed with _) before updating fp —
 		# they are for internal handler logic only and must not enter the fingerprint.
 		fp.update({k: v for k, v in backendFields.items() if not k.startswith("_")})
@@ -317,19 +585,257 @@ def getObjectFingerprint(obj):
 		# Add positional disambiguation when primary IDs are too weak.
 		# Each handler's needs_disambiguation() decides based on what fields it collected.
 		if handler.needs_disambiguation(backendFields):
-			log.debug(f"CustomLabels: weak fingerprint for '{fp.get('app')}', adding disambiguation")
+			trace("weakFingerprint", appName)
 			_addDisambiguation(obj, fp)
 
+		breaker.recordTotal(appName, (time.perf_counter() - startTime) * 1000)
+
 		# Convert to hashable tuple
 		return tuple(sorted(fp.items()))
 
 	except Exception:
 		log.debugWarning("CustomLabels: unexpected error building fingerprint", exc_info=True)
+		dumpOnError("a fingerprint error")
+		return None
+
+
+# Row fingerprints
+
+# Roles of rows in lists, trees and tables, which can be labeled when row labeling is enabled.
+ROW_ROLES = frozenset({
+	controlTypes.Role.LISTITEM,
+	controlTypes.Role.TREEVIEWITEM,
+	controlTypes.Role.TABLECELL,
+})
+
+# Roles of the containers whose structure identifies a row.
+_CONTAINER_ROLES = frozenset({
+	controlTypes.Role.LIST,
+	controlTypes.Role.TREEVIEW,
+	controlTypes.Role.TABLE,
+})
+
+# Prefix of the container's fields in a row fingerprint.
+_CONTAINER_PREFIX = "container."
+
+_rowLabelingEnabled = False
+
+# Per-container index: _getContainerKey() -> container fields for row fingerprints.
+# Fingerprinting the container once, rather than per row, keeps the cost of
+# a row fingerprint the same however long the list is.
+_containerIndex = OrderedDict()
+_CONTAINER_INDEX_SIZE = 64
+
+
+def setRowLabelingEnabled(enabled):
+	"""Turn row fingerprints for list items, tree items and table cells on or off."""
+	global _rowLabelingEnabled
+	_rowLabelingEnabled = bool(enabled)
+	_containerIndex.clear()
+
+
+def isRowFingerprint(fpDict):
+	"""Return True if a fingerprint was built by getRowFingerprint().
+
+	fpDict may be the fingerprint as a dict, or the set of its field names.
+	"""
+	return _CONTAINER_PREFIX + "role" in fpDict
+
+
+def _getContainer(obj):
+	"""Return the list, tree or table a row belongs to.
+
+	Only a fixed number of ancestors is checked, so deeply nested tree items
+	use their parent item as the container rather than walking to the tree root.
+	"""
+	parent = obj.parent
+	candidate = parent
+	for _hop in range(2):
+		if candidate is None:
+			break
+		if candidate.role in _CONTAINER_ROLES:
+			return candidate
+		candidate = candidate.parent
+	return parent
+
+
+def _getContainerKey(container):
+	"""Return the key of a container in the container index, or None.
+
+	Lists and trees rarely have the event IDs or automation id of getObjectCacheKey():
+	those without are told apart by their window, role and name instead.
+	"""
+	cacheKey = getObjectCacheKey(container)
+	if cacheKey is not None:
+		return cacheKey
+	try:
+		return (container.appModule.appName, container.windowHandle, int(container.role), container.name)
+	except Exception:
+		return None
+
+
+def _getContainerFields(container):
+	cacheKey = _getContainerKey(container)
+	if cacheKey is not None:
+		fields = _containerIndex.get(cacheKey)
+		if fields is not None:
+			_containerIndex.move_to_end(cacheKey)
+			return fields
+	containerFp = _buildObjectFingerprint(container, enforceBudget=False)
+	if not containerFp:
+		return None
+	fields = {}
+	for key, value in containerFp:
+		if key == "app":
+			continue
+		fields[_CONTAINER_PREFIX + key] = value
+	if cacheKey is not None:
+		_containerIndex[cacheKey] = fields
+		if len(_containerIndex) > _CONTAINER_INDEX_SIZE:
+			_containerIndex.popitem(last=False)
+	return fields
+
+
+def getRowFingerprint(obj):
+	"""Return a fingerprint for a list item, tree item or table cell.
+
+	The fingerprint is built from the container's fingerprint plus the row's own
+	structure: its name, column, tree level, and its position when it has no name.
+	Rows of virtualized lists are created and destroyed as the list scrolls, so
+	this avoids any per-row work that grows with the length of the list.
+	"""
+	try:
+		container = _getContainer(obj)
+		if container is None:
+			return None
+		containerFields = _getContainerFields(container)
+		if containerFields is None:
+			return None
+
+		fp = dict(containerFields)
+		fp["app"] = obj.appModule.appName
+		fp["role"] = int(obj.role)
+		try:
+			fp["name"] = _readName(obj)
+		except Exception:
+			log.debugWarning("CustomLabels [row]: failed to get name", exc_info=True)
+			fp["name"] = ""
+
+		fp["column"] = -1
+		fp["level"] = -1
+		fp["index"] = -1
+		if obj.role == controlTypes.Role.TABLECELL:
+			try:
+				fp["column"] = obj.columnNumber or -1
+			except Exception:
+				pass
+		try:
+			positionInfo = obj.positionInfo or {}
+		except Exception:
+			positionInfo = {}
+		if obj.role == controlTypes.Role.TREEVIEWITEM:
+			fp["level"] = positionInfo.get("level", -1)
+		# Position is only used when there is no name, since it changes when the list is sorted.
+		if not fp["name"]:
+			fp["index"] = positionInfo.get("indexInGroup", -1)
+
+		return tuple(sorted(fp.items()))
+
+	except Exception:
+		log.debugWarning("CustomLabels: unexpected error building row fingerprint", exc_info=True)
+		dumpOnError("a fingerprint error")
 		return None
 
 
+def getObjectCacheKey(obj):
+	"""Return a key identifying obj from properties NVDA already holds, or None.
+
+	Unlike getObjectFingerprint this makes no calls into the app, so it is cheap
+	enough to use when fingerprinting is too expensive. It is only meaningful for
+	as long as the object exists; None is returned when obj has no such identity.
+	"""
+	try:
+		key = (obj.appModule.appName, obj.windowHandle, int(obj.role))
+	except Exception:
+		return None
+	if isUIAObject(obj):
+		try:
+			automationId = obj.UIAElement.cachedAutomationId
+		except Exception:
+			return None
+		return key + ("UIA", automationId) if automationId else None
+	objectID = getattr(obj, "event_objectID", None)
+	childID = getattr(obj, "event_childID", None)
+	if objectID is None or childID is None:
+		return None
+	return key + ("acc", objectID, childID)
+
+
+def getFingerprintIdentifier(fp):
+	"""Return the identifier shown to users for a fingerprint, or an empty string."""
+	fpDict = dict(fp)
+	return fpDict.get("automationId") or fpDict.get("windowClassName") or fpDict.get("htmlId") or ""
+
+
 def fingerprintToDict(fp):
 	"""Convert a fingerprint tuple back to a dict."""
 	if fp:
 		return dict(fp)
 	return {}
+
+
+# Label scopes
+# A label is saved for one window of an app, for the whole app, or for all apps.
+# App-scoped fingerprints are the live fingerprints. Window-scoped ones add the
+# top-level window they were saved in, and global ones carry GLOBAL_APP as their app,
+# so each scope's labels are found by exact dict lookups of their own.
+
+SCOPE_WINDOW = "window"
+SCOPE_APP = "app"
+SCOPE_GLOBAL = "global"
+SCOPES = (SCOPE_WINDOW, SCOPE_APP, SCOPE_GLOBAL)
+
+# App name global labels are saved under.
+GLOBAL_APP = "(global)"
+# Fingerprint field holding the top-level window of window-scoped labels.
+WINDOW_FIELD = "window"
+
+
+def scopeFingerprint(fp, scope, window=None):
+	"""Return the fingerprint a label of the given scope is saved under for a live fingerprint."""
+	items = [item for item in fp if item[0] != WINDOW_FIELD]
+	if scope == SCOPE_WINDOW:
+		if not window:
+			raise ValueError("A window-scoped fingerprint needs a window")
+		items.append((WINDOW_FIELD, window))
+	elif scope == SCOPE_GLOBAL:
+		items = [item for item in items if item[0] != "app"]
+		items.append(("app", GLOBAL_APP))
+	elif scope != SCOPE_APP:
+		raise ValueError(f"Unknown label scope: {scope!r}")
+	return tuple(sorted(items))
+
+
+def getFingerprintScope(fp):
+	"""Return the scope of a saved fingerprint."""
+	fpDict = dict(fp)
+	if fpDict.get("app") == GLOBAL_APP:
+		return SCOPE_GLOBAL
+	if WINDOW_FIELD in fpDict:
+		return SCOPE_WINDOW
+	return SCOPE_APP
+
+
+def getObjectWindow(obj):
+	"""Return the title of obj's top-level window, or its class name if it has no title.
+
+	Returns an empty string when the window cannot be found.
+	"""
+	try:
+		root = winUser.getAncestor(obj.windowHandle, winUser.GA_ROOT)
+		if not root:
+			return ""
+		return winUser.getWindowText(root) or winUser.getClassName(root) or ""
+	except Exception:
+		log.debugWarning("CustomLabels: could not read the top-level window", exc_info=True)
+		return ""
@@ -0,0 +1,144 @@
+# labelFiles
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# The compact format of the app files in the labels folder.
+
+# How this works:
+# App files were first written with every fingerprint as a JSON string key, which
+# repeats every field name for every label and must be parsed again, one key at a
+# time, when loading. Those files (format 1) are still read, and label packs use them.
+#
+# Format 2 stores the labels of an app column by column:
+# {"appName": name, "count": number of labels, "format": 2,
+#  "fields": [field names, sorted],
+#  "shapes": [[indexes in fields of the fields of a fingerprint], ...],
+#  "columns": [one column per field: the field's value for every label, null where a
+#   label's fingerprint has no such field],
+#  "shape": column of the index in shapes of every label's fields,
+#  "labels": column of the labels}
+# A column whose values are all the same, such as the app name, is stored once as
+# {"value": value}. Fingerprints are rebuilt straight from the columns: field names
+# are shared, and shapes list the fields in sorted order, so no key string is parsed
+# and no fingerprint is sorted.
+#
+# Files of apps with COMPRESS_THRESHOLD labels or more are also gzip-compressed.
+# They keep their name, and are recognised by the gzip header when read.
+# This module does not depend on NVDA.
+
+import gzip
+import json
+
+COMPACT_FORMAT = 2
+# Apps with at least this many labels are saved compressed.
+COMPRESS_THRESHOLD = 1000
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def isCompact(data):
+	"""Return True if parsed app file content is in the compact format."""
+	return data.get("format") == COMPACT_FORMAT
+
+
+def _packColumn(values, present):
+	"""Return a column as stored: {"value": v} if every label that has the field has value v."""
+	first = values[present[0]]
+	for index in present:
+		if values[index] != first:
+			return values
+	return {"value": first}
+
+
+def _unpackColumn(column, count):
+	if isinstance(column, dict):
+		return [column["value"]] * count
+	if len(column) != count:
+		raise ValueError("A column of the labels file does not match its label count")
+	return column
+
+
+def dumpCompact(appName, labels):
+	"""Return the compact, JSON-serializable app file content for {fingerprint: label}."""
+	count = len(labels)
+	fields = sorted({item[0] for fingerprint in labels for item in fingerprint})
+	fieldIndexes = {name: index for index, name in enumerate(fields)}
+	columns = [[None] * count for _name in fields]
+	# The entries of each field, to tell constant columns
+	present = [[] for _name in fields]
+	shapes = {}
+	shapeColumn = []
+	for entry, fingerprint in enumerate(labels):
+		shape = []
+		for name, value in fingerprint:
+			index = fieldIndexes[name]
+			columns[index][entry] = value
+			present[index].append(entry)
+			shape.append(index)
+		shape = tuple(sorted(shape))
+		shapeIndex = shapes.get(shape)
+		if shapeIndex is None:
+			shapeIndex = shapes[shape] = len(shapes)
+		shapeColumn.append(shapeIndex)
+	# appName and count come first so the header can be read without parsing the labels.
+	return {
+		"appName": appName,
+		"count": count,
+		"format": COMPACT_FORMAT,
+		"fields": fields,
+		"shapes": [list(shape) for shape in shapes],
+		"columns": [_packColumn(column, entries) for column, entries in zip(columns, present)],
+		"shape": _packColumn(shapeColumn, range(count)) if count else [],
+		"labels": list(labels.values()),
+	}
+
+
+def iterCompact(data):
+	"""Yield (fingerprint, label) for every label of compact app file content."""
+	count = data["count"]
+	fields = data["fields"]
+	columns = [_unpackColumn(column, count) for column in data["columns"]]
+	labels = _unpackColumn(data["labels"], count)
+	# For each shape, the (field name, column) pairs of its fields, in sorted order
+	shapes = [[(fields[index], columns[index]) for index in shape] for shape in data["shapes"]]
+	if len(shapes) == 1 and shapes[0]:
+		# All fingerprints have the same fields: built by zip, without a loop per field.
+		names = [name for name, column in shapes[0]]
+		for values, label in zip(zip(*[column for name, column in shapes[0]]), labels):
+			yield tuple(zip(names, values)), label
+		return
+	for entry, shapeIndex in enumerate(_unpackColumn(data["shape"], count)):
+		yield tuple([(name, column[entry]) for name, column in shapes[shapeIndex]]), labels[entry]
+
+
+def encodeAppFile(data, compress=False):
+	"""Return the bytes of an app file holding parsed app file content."""
+	encoded = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+	if compress:
+		# No time stamp, so the same labels always give the same file.
+		return gzip.compress(encoded, compresslevel=6, mtime=0)
+	return encoded
+
+
+def readAppFileBytes(filePath):
+	"""Return the JSON bytes of an app file, decompressed if it is compressed."""
+	with open(filePath, "rb") as f:
+		encoded = f.read()
+	if encoded[:2] == _GZIP_MAGIC:
+		encoded = gzip.decompress(encoded)
+	return encoded
+
+
+def readAppFile(filePath):
+	"""Return the parsed content of an app file, compressed or not."""
+	return json.loads(readAppFileBytes(filePath))
+
+
+def openAppFileText(filePath):
+	"""Open an app file as text, decompressing it as it is read if it is compressed."""
+	with open(filePath, "rb") as f:
+		magic = f.read(2)
+	if magic == _GZIP_MAGIC:
+		return gzip.open(filePath, "rt", encoding="utf-8")
+	return open(filePath, "r", encoding="utf-8")
@@ -0,0 +1,151 @@
+# labelPacks
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Export and import of label packs for sharing labels.
+
+# A label pack is a zip file containing:
+# - manifest.json: {"format": "customLabelsPack", "version": 1, "apps": [{"appName", "file", "count"}]}
+# - one file per app under apps/, in the first app file format (see labelFiles), which
+#   every version of the add-on reads. Compact app files are read too.
+#
+# Packs are imported one app at a time: each app file is read from the zip, parsed,
+# migrated to the current fingerprint format and merged, before the next one is read.
+# Memory use therefore depends on the largest app in the pack, not on the pack size.
+
+import json
+import zipfile
+from logHandler import log
+
+from .labeler import sanitizeAppName
+
+PACK_FORMAT = "customLabelsPack"
+PACK_VERSION = 1
+_MANIFEST_NAME = "manifest.json"
+_APPS_FOLDER = "apps/"
+
+# Conflict policies for labels that exist both in the pack and in the store.
+# Keep the label already in the store.
+MERGE_KEEP_EXISTING = "keepExisting"
+# Use the label from the pack.
+MERGE_OVERWRITE = "overwrite"
+# Remove all labels of each app in the pack before importing that app.
+MERGE_REPLACE_APP = "replaceApp"
+
+MERGE_POLICIES = (MERGE_KEEP_EXISTING, MERGE_OVERWRITE, MERGE_REPLACE_APP)
+
+
+class LabelPackError(Exception):
+	"""Raised when a file is not a valid label pack."""
+
+
+def exportPack(path, store, appNames=None, onProgress=None, labelsByApp=None):
+	"""Write the labels of appNames (all apps by default) to a label pack at path.
+
+	labelsByApp, if given, is {appName: {fingerprint: label}} to export instead of
+	the store's labels, for exporting some labels only.
+	onProgress, if given, is called as onProgress(index, total, appName) before each app.
+	Returns the number of labels exported.
+	"""
+	if appNames is None:
+		appNames = sorted(labelsByApp if labelsByApp is not None else store.getAppCounts().keys())
+	manifestApps = []
+	usedFiles = set()
+	exported = 0
+	with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+		for index, appName in enumerate(appNames):
+			if onProgress:
+				onProgress(index, len(appNames), appName)
+			if labelsByApp is not None:
+				labels = labelsByApp.get(appName)
+			else:
+				labels = store.getLabelsForApp(appName)
+			if not labels:
+				continue
+			fileName = _uniqueFileName(sanitizeAppName(appName), usedFiles)
+			data = store.dumpAppData(appName, labels)
+			z.writestr(fileName, json.dumps(data, ensure_ascii=False))
+			manifestApps.append({"appName": appName, "file": fileName, "count": len(labels)})
+			exported += len(labels)
+		manifest = {"format": PACK_FORMAT, "version": PACK_VERSION, "apps": manifestApps}
+		z.writestr(_MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+	log.debug(f"CustomLabels: exported {exported} labels for {len(manifestApps)} apps")
+	return exported
+
+
+def _uniqueFileName(safeName, usedFiles):
+	fileName = f"{_APPS_FOLDER}{safeName}.json"
+	suffix = 2
+	while fileName in usedFiles:
+		fileName = f"{_APPS_FOLDER}{safeName}_{suffix}.json"
+		suffix += 1
+	usedFiles.add(fileName)
+	return fileName
+
+
+def readManifest(z):
+	"""Return the list of app entries of an open label pack zip."""
+	try:
+		with z.open(_MANIFEST_NAME) as f:
+			manifest = json.load(f)
+	except KeyError:
+		raise LabelPackError("The file has no label pack manifest")
+	except ValueError:
+		raise LabelPackError("The label pack manifest is not valid JSON")
+	if manifest.get("format") != PACK_FORMAT:
+		raise LabelPackError("The file is not a custom labels pack")
+	if manifest.get("version", 0) > PACK_VERSION:
+		raise LabelPackError("The label pack was made by a newer version of Custom Labels")
+	return [entry for entry in manifest.get("apps", []) if isinstance(entry, dict) and entry.get("file")]
+
+
+def iterPackApps(path, store):
+	"""Yield (index, total, appName, {fingerprint: label}) for each app in a label pack.
+
+	Only one app's labels are held at a time. Fingerprints are migrated
+	through the store's current key normalization. Raises LabelPackError
+	if path is not a label pack.
+	"""
+	try:
+		z = zipfile.ZipFile(path)
+	except (zipfile.BadZipFile, OSError) as e:
+		raise LabelPackError(str(e))
+	with z:
+		entries = readManifest(z)
+		for index, entry in enumerate(entries):
+			try:
+				with z.open(entry["file"]) as f:
+					data = json.load(f)
+				appName = data.get("appName") or entry.get("appName")
+				labels = store.loadAppData(data)
+			except Exception:
+				log.error(f"CustomLabels: failed to read '{entry['file']}' from label pack", exc_info=True)
+				continue
+			yield index, len(entries), appName, labels
+
+
+def mergeAppLabels(store, appName, labels, policy=MERGE_KEEP_EXISTING):
+	"""Merge imported labels of one app into the store in one batch.
+
+	Returns (added, updated, skipped) label counts.
+	"""
+	if policy not in MERGE_POLICIES:
+		raise ValueError(f"Unknown merge policy: {policy!r}")
+	added = updated = skipped = 0
+	with store.batch():
+		if policy == MERGE_REPLACE_APP:
+			store.removeApp(appName)
+		existing = store.getLabelsForApp(appName)
+		for fingerprint, label in labels.items():
+			current = existing.get(fingerprint)
+			if current is None:
+				added += 1
+			elif current == label or policy == MERGE_KEEP_EXISTING:
+				skipped += 1
+				continue
+			else:
+				updated += 1
+			store.set(fingerprint, label)
+	return added, updated, skipped
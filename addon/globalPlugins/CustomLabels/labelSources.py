@@ -0,0 +1,162 @@
+# labelSources
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Read-only label sources in a compact, memory-mapped format.
+
+# How this works:
+# A read-only source holds a base set of labels distributed to many users,
+# layered underneath each user's own labels by LabelStore.
+# The file is memory-mapped and never parsed as a whole: lookups search a
+# fixed-size sorted index in place, so only the pages they touch become resident.
+#
+# File layout (little-endian):
+# - header: magic, version, bucket bits, entry count, offsets of the directory and index,
+#   offset and length of the app list
+# - app list: UTF-8 JSON list of the app names that have labels, checked before searching
+# - directory: 2**bits + 1 entry positions; bucket b holds the index entries from
+#   directory[b] up to directory[b + 1]
+# - index: one (hash, keyOffset, keyLength, labelOffset, labelLength) entry per label,
+#   sorted by (hash, key bytes)
+# - strings: UTF-8 fingerprint keys and labels
+#
+# Keys are the fingerprint serialization used by the app files. The hash is the
+# CRC-32 of the key, and its top bits select the bucket. There are about as many
+# buckets as labels, so a lookup reads two directory entries and compares
+# one or two index entries, whatever the size of the source.
+# This module does not depend on NVDA, so sources can be built outside of it.
+
+import json
+import mmap
+import os
+import struct
+import zlib
+
+SOURCE_EXTENSION = ".cldb"
+_MAGIC = b"CLDB"
+_VERSION = 1
+# magic, version, bits, count, directoryOffset, indexOffset, appsOffset, appsLength
+_HEADER = struct.Struct("<4sHHIIIII")
+_POSITION = struct.Struct("<I")
+# hash, keyOffset, keyLength, labelOffset, labelLength
+_ENTRY = struct.Struct("<IIIII")
+_MAX_BITS = 24
+# Two consecutive directory entries: the start and end of a bucket
+_BUCKET = struct.Struct("<II")
+
+
+class LabelSourceError(Exception):
+	"""Raised when a file is not a valid read-only label source."""
+
+
+def fingerprintToKeyString(fingerprint):
+	"""Return the string a fingerprint is stored under in app files and label sources."""
+	return json.dumps(list(fingerprint), ensure_ascii=False)
+
+
+def writeLabelSource(path, labels):
+	"""Write {fingerprint: label} to a read-only label source at path."""
+	entries = []
+	for fingerprint, label in labels.items():
+		key = fingerprintToKeyString(fingerprint).encode("utf-8")
+		entries.append((zlib.crc32(key), key, label.encode("utf-8")))
+	entries.sort()
+	bits = min(max(len(entries) - 1, 0).bit_length(), _MAX_BITS)
+	apps = sorted({str(dict(fingerprint).get("app", "unknown")) for fingerprint in labels})
+	appsData = json.dumps(apps, ensure_ascii=False).encode("utf-8")
+	appsOffset = _HEADER.size
+	directoryOffset = appsOffset + len(appsData)
+	indexOffset = directoryOffset + _POSITION.size * ((1 << bits) + 1)
+	stringsOffset = indexOffset + _ENTRY.size * len(entries)
+	directory = bytearray()
+	index = bytearray()
+	strings = bytearray()
+	bucket = 0
+	for position, (keyHash, key, label) in enumerate(entries):
+		# Start every bucket up to and including this entry's at this position.
+		while bucket <= keyHash >> (32 - bits):
+			directory += _POSITION.pack(position)
+			bucket += 1
+		keyOffset = stringsOffset + len(strings)
+		strings += key
+		labelOffset = stringsOffset + len(strings)
+		strings += label
+		index += _ENTRY.pack(keyHash, keyOffset, len(key), labelOffset, len(label))
+	while bucket <= 1 << bits:
+		directory += _POSITION.pack(len(entries))
+		bucket += 1
+	with open(path, "wb") as f:
+		f.write(_HEADER.pack(
+			_MAGIC, _VERSION, bits, len(entries), directoryOffset, indexOffset, appsOffset, len(appsData)
+		))
+		f.write(appsData)
+		f.write(directory)
+		f.write(index)
+		f.write(strings)
+
+
+class MappedLabelSource:
+	"""A read-only label source, memory-mapped and searched in place."""
+
+	def __init__(self, path):
+		self.path = path
+		self.name = os.path.basename(path)
+		with open(path, "rb") as f:
+			if os.fstat(f.fileno()).st_size < _HEADER.size:
+				raise LabelSourceError(f"{self.name} is too short to be a label source")
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			(
+				magic, version, bits, count, directoryOffset, indexOffset, appsOffset, appsLength
+			) = _HEADER.unpack_from(self._map)
+			if magic != _MAGIC:
+				raise LabelSourceError(f"{self.name} is not a label source")
+			if version > _VERSION:
+				raise LabelSourceError(f"{self.name} was made by a newer version of Custom Labels")
+			if bits > _MAX_BITS or indexOffset + _ENTRY.size * count > len(self._map):
+				raise LabelSourceError(f"{self.name} is truncated")
+			self._apps = frozenset(json.loads(self._map[appsOffset:appsOffset + appsLength].decode("utf-8")))
+		except Exception:
+			self._map.close()
+			raise
+		self._count = count
+		self._shift = 32 - bits
+		self._directoryOffset = directoryOffset
+		self._indexOffset = indexOffset
+
+	def __len__(self):
+		return self._count
+
+	def getApps(self):
+		"""Return the names of the apps this source has labels for."""
+		return self._apps
+
+	def hasApp(self, appName):
+		return appName in self._apps
+
+	def get(self, fingerprint, keyString=None):
+		"""Return the label for fingerprint, or None.
+
+		keyString, if given, is the fingerprint already serialized with fingerprintToKeyString.
+		"""
+		if keyString is None:
+			keyString = fingerprintToKeyString(fingerprint)
+		key = keyString.encode("utf-8")
+		keyHash = zlib.crc32(key)
+		data = self._map
+		bucketOffset = self._directoryOffset + (keyHash >> self._shift) * _POSITION.size
+		start, end = _BUCKET.unpack_from(data, bucketOffset)
+		entryOffset = self._indexOffset + start * _ENTRY.size
+		for _position in range(start, end):
+			entryHash, keyOffset, keyLength, labelOffset, labelLength = _ENTRY.unpack_from(data, entryOffset)
+			if entryHash > keyHash:
+				break
+			if entryHash == keyHash and data[keyOffset:keyOffset + keyLength] == key:
+				return data[labelOffset:labelOffset + labelLength].decode("utf-8")
+			entryOffset += _ENTRY.size
+		return None
+
+	def close(self):
+		self._map.close()
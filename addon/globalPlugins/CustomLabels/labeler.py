@@ -8,12 +8,33 @@
 # This module manages the storage of custom labels using per-app JSON files.
 
 import os
+import contextlib
 import re
 import json
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+import extensionPoints
 import globalVars
 from logHandler import log
 from NVDAObjects import NVDAObject
 
+from .fingerPrintReader import (
+	DEFAULT_PROFILE,
+	GLOBAL_APP,
+	SCOPE_GLOBAL,
+	SCOPE_WINDOW,
+	WINDOW_FIELD,
+	getMissingFields,
+	isRowFingerprint,
+	scopeFingerprint,
+)
+from .trace import dumpOnError, trace
+# labelFiles and labelSources are imported where they are used, as they are
+# not needed until labels are first read or sources found.
+
 
 # Storage location
 def getLabelsFolder():
@@ -52,92 +73,301 @@ def sanitizeAppName(appName):
 	return name or "unknown"
 
 
+def getLabelSourcesFolder():
+	"""Returns the path to the folder of read-only label sources."""
+	return os.path.join(getLabelsFolder(), "sources")
+
+
 def getAppFilePath(appName):
 	"""Get the JSON file path for an app, ensuring the labels folder exists."""
 	safeName = sanitizeAppName(appName)
 	return os.path.join(_ensureLabelsFolder(), f"{safeName}.json")
 
 
+# Seconds between checks of a loaded app's file for changes made outside the add-on
+CHANGE_CHECK_INTERVAL = 2.0
+_monotonic = time.monotonic
+_getThreadId = threading.get_ident
+
+# Loading all apps at once, as the settings panel does, reads the files on up to LOAD_THREADS
+# threads when there are at least PARALLEL_LOAD_MIN_FILES of them to read.
+LOAD_THREADS = 8
+PARALLEL_LOAD_MIN_FILES = 4
+
+# The published labels of an app that has none
+_NO_LABELS = types.MappingProxyType({})
+
+
+def _getFileSignature(filePath):
+	"""Return (modification time, size) of a file, or None if it does not exist."""
+	try:
+		stat = os.stat(filePath)
+	except OSError:
+		return None
+	return (stat.st_mtime_ns, stat.st_size)
+
+
 # Per-app label storage
 class LabelStore:
 	"""
 	Manages custom labels with per-app JSON files.
 	Labels are cached in memory and saved per-app.
+
+	Lookups may be made from any thread and take no lock. Changes, loading and
+	saving are serialized by a lock, and made to copies of the labels of each app,
+	which replace the published ones when the change is committed: lookups see
+	the labels as of the last commit, never part of a change.
 	"""
 
 	def __init__(self):
-		# Cache: {appName: {fingerprint: label}}
+		# Notified after labels change, on the thread that changed them, with the keyword
+		# arguments: appName; fingerprint, or None when all labels of the app were removed;
+		# label, or None when the label was removed; previousLabel, or None when the label
+		# was added.
+		self.labelChanged = extensionPoints.Action()
+		# Cache: {appName: {fingerprint: label}}. Each app's dict is never changed once
+		# published here: it is replaced.
 		self._cache = {}
 		self._loadedApps = set()
+		# Files of loaded apps, to notice changes made by other programs:
+		# {appName: [file path, file signature when read or saved, time of the next check]}
+		self._fileStates = {}
+		# Per-app indexes used to match fingerprints on a subset of their fields:
+		# {appName: {"labels": the labels indexed, "profiles": set, "windowScoped": bool,
+		# "projections": {fieldNames: {projectedKey: saved fingerprint}}}}
+		self._fieldIndexes = {}
+		# Read-only label sources under the user's labels, highest priority first
+		self._sources = []
+		# Serializes changes, loading and saving. Reentrant, as batches nest.
+		self._lock = threading.RLock()
+		# Batched changes, committed when the outermost batch() ends
+		self._batchDepth = 0
+		self._dirtyApps = set()
+		self._pendingChanges = []
+		# Copies of the app dicts changed in the open batch, published when it is committed,
+		# and the thread making the batch, which sees them meanwhile.
+		self._working = {}
+		self._batchThread = None
 
 	def _loadApp(self, appName):
-		"""Load labels for a specific app from disk."""
-		if appName in self._loadedApps:
-			return
-		self._loadedApps.add(appName)
-
-		filePath = getAppFilePath(appName)
-		if not os.path.exists(filePath):
-			self._cache[appName] = {}
+		"""Load labels for a specific app from disk, or reload them if another program changed its file."""
+		# Every loaded app has a file state: one lookup on this frequent path.
+		state = self._fileStates.get(appName)
+		if state is not None:
+			if _monotonic() >= state[2]:
+				self._checkAppFile(appName, state)
 			return
+		with self._lock:
+			if appName in self._fileStates:
+				# Loaded by another thread meanwhile.
+				return
+			filePath = getAppFilePath(appName)
+			# Taken before reading, so a change made while reading is noticed at the next check.
+			signature = _getFileSignature(filePath)
+			labels = {} if signature is None else self._readAppFile(filePath, appName) or {}
+			self._cache[appName] = labels
+			self._loadedApps.add(appName)
+			# Last, as other threads take the app as loaded once it has a file state.
+			self._fileStates[appName] = [filePath, signature, time.monotonic() + CHANGE_CHECK_INTERVAL]
+
+	def _getLabels(self, appName):
+		"""Return the labels of a loaded app as this thread sees them. Callers must not change them.
+
+		This is the published dict, or, for the thread making a batch, the batch's copy.
+		"""
+		if self._working and self._batchThread == _getThreadId():
+			labels = self._working.get(appName)
+			if labels is not None:
+				return labels
+		return self._cache.get(appName, _NO_LABELS)
+
+	def _getAllLabels(self):
+		"""Return {appName: labels} for all loaded apps, as this thread sees them."""
+		# Copied in one step, as other threads may add apps.
+		result = dict(self._cache)
+		if self._working and self._batchThread == _getThreadId():
+			result.update(self._working)
+		return result
 
+	def _getWritableLabels(self, appName):
+		"""Return the open batch's copy of an app's labels, to change, copying them if needed."""
+		labels = self._working.get(appName)
+		if labels is None:
+			self._loadApp(appName)
+			labels = self._working[appName] = dict(self._cache.get(appName, _NO_LABELS))
+		return labels
+
+	def _readAppFile(self, filePath, appName):
+		"""Return {fingerprint: label} from an app's file, or None if it cannot be read."""
+		from .labelFiles import readAppFile
 		try:
-			with open(filePath, "r", encoding="utf-8") as f:
-				data = json.load(f)
-			# Convert string keys back to tuples
-			self._cache[appName] = {
-				self._keyFromString(k): v
-				for k, v in data.get("labels", {}).items()
-			}
-			log.debug(f"CustomLabels: loaded {len(self._cache[appName])} labels for '{appName}'")
+			labels = self.loadAppData(readAppFile(filePath))
+			trace("loadApp", appName, len(labels))
+			return labels
 		except Exception:
 			log.error(f"CustomLabels: failed to load labels for '{appName}'", exc_info=True)
-			self._cache[appName] = {}
-
-	def _saveApp(self, appName):
-		"""Save labels for a specific app to disk."""
+			dumpOnError("failing to load labels")
+			return None
+
+	def checkForChanges(self):
+		"""Reload the loaded apps whose files were changed by other programs.
+
+		Each app's file is checked at most once every CHANGE_CHECK_INTERVAL seconds.
+		Only the changed files are read again.
+		"""
+		now = time.monotonic()
+		for appName, state in list(self._fileStates.items()):
+			if now >= state[2]:
+				self._checkAppFile(appName, state)
+
+	def _checkAppFile(self, appName, state):
+		"""Reload an app whose file changed since it was read or saved."""
+		if not self._lock.acquire(blocking=False):
+			# Another thread is changing labels: checked at the next use instead of waiting.
+			return
+		try:
+			filePath, knownSignature, _nextCheck = state
+			state[2] = time.monotonic() + CHANGE_CHECK_INTERVAL
+			signature = _getFileSignature(filePath)
+			if signature == knownSignature or appName in self._dirtyApps:
+				# Unsaved changes are merged with the file when they are saved.
+				return
+			labels = {} if signature is None else self._readAppFile(filePath, appName)
+			if labels is None:
+				# Possibly being written: tried again at the next check.
+				return
+			state[1] = signature
+			changes = self._replaceAppLabels(appName, labels)
+			log.debug(f"CustomLabels: reloaded labels for '{appName}', changed on disk: {len(changes)} changes")
+			if self._batchDepth:
+				self._pendingChanges.extend(changes)
+			else:
+				self._notify(changes)
+		finally:
+			self._lock.release()
+
+	def _replaceAppLabels(self, appName, labels):
+		"""Publish labels read from an app's file in place of its labels. Returns the changes."""
+		old = self._cache.get(appName, _NO_LABELS)
+		changes = [(appName, fp, label, old.get(fp)) for fp, label in labels.items() if old.get(fp) != label]
+		changes.extend((appName, fp, None, label) for fp, label in old.items() if fp not in labels)
+		self._cache[appName] = labels
+		self._fieldIndexes.pop(appName, None)
+		return changes
+
+	def _mergeWithFile(self, appName, filePath, changes):
+		"""Apply changes to the labels in an app's file, which changed since it was read.
+
+		Changes are (appName, fingerprint, label, previousLabel) tuples, in the order they were made.
+		Returns the changes this brings in from the file.
+		"""
+		labels = {} if not os.path.exists(filePath) else self._readAppFile(filePath, appName)
+		if labels is None:
+			log.warning(f"CustomLabels: unreadable labels file of '{appName}' changed on disk, replacing it")
+			return []
+		log.warning(f"CustomLabels: labels file of '{appName}' changed on disk since it was read, merging")
+		for _appName, fingerprint, label, _previousLabel in changes:
+			if fingerprint is None:
+				labels.clear()
+			elif label is None:
+				labels.pop(fingerprint, None)
+			else:
+				labels[fingerprint] = label
+		return self._replaceAppLabels(appName, labels)
+
+	def _saveApp(self, appName, changes=()):
+		"""Save labels for a specific app to disk.
+
+		If another program changed the file since it was read, changes, the
+		(appName, fingerprint, label, previousLabel) tuples made since, are applied to the file's
+		labels and those are saved. Returns the changes brought in from the file.
+		"""
+		# Called with the lock held, after the batch's changes are published.
 		filePath = getAppFilePath(appName)
-		labels = self._cache.get(appName, {})
+		externalChanges = []
+		state = self._fileStates.get(appName)
+		if state is not None and _getFileSignature(filePath) != state[1]:
+			externalChanges = self._mergeWithFile(appName, filePath, changes)
+		self._writeAppFile(appName, filePath)
+		signature = _getFileSignature(filePath)
+		self._fileStates[appName] = [filePath, signature, time.monotonic() + CHANGE_CHECK_INTERVAL]
+		return externalChanges
+
+	def _writeAppFile(self, appName, filePath):
+		labels = self._cache.get(appName, _NO_LABELS)
 
 		if not labels:
 			# Delete file if no labels remain
 			if os.path.exists(filePath):
 				try:
 					os.remove(filePath)
-					log.debug(f"CustomLabels: removed empty labels file for '{appName}'")
+					trace("removeAppFile", appName)
 				except Exception:
 					log.error(f"CustomLabels: failed to remove labels file for '{appName}'", exc_info=True)
 			return
 
 		try:
-			data = {
-				"appName": appName,
-				"labels": {
-					self._keyToString(k): v
-					for k, v in labels.items()
-				}
-			}
-			with open(filePath, "w", encoding="utf-8") as f:
-				json.dump(data, f, indent=2, ensure_ascii=False)
-			log.debug(f"CustomLabels: saved {len(labels)} labels for '{appName}'")
+			encoded = self.encodeAppFile(appName, labels)
+			with open(filePath, "wb") as f:
+				f.write(encoded)
+			trace("saveApp", appName, len(labels))
 		except Exception:
 			log.error(f"CustomLabels: failed to save labels for '{appName}'", exc_info=True)
+			dumpOnError("failing to save labels")
+
+	def dumpAppData(self, appName, labels):
+		"""Return the JSON-serializable content for {fingerprint: label} in the first app file format.
+
+		Label packs use this format, which every version of the add-on reads.
+		"""
+		# appName and count come first so getAppCounts() can read them
+		# from the start of the file without parsing the labels.
+		return {
+			"appName": appName,
+			"count": len(labels),
+			"labels": {
+				self._keyToString(k): v
+				for k, v in labels.items()
+			}
+		}
+
+	def encodeAppFile(self, appName, labels):
+		"""Return the bytes of the file {fingerprint: label} is saved to, in the compact format."""
+		from .labelFiles import COMPRESS_THRESHOLD, dumpCompact, encodeAppFile
+		return encodeAppFile(dumpCompact(appName, labels), compress=len(labels) >= COMPRESS_THRESHOLD)
+
+	def loadAppData(self, data):
+		"""Return {fingerprint: label} from parsed app file content, migrating old fingerprints."""
+		return dict(self.iterAppData(data))
+
+	def iterAppData(self, data):
+		"""Yield (fingerprint, label) for every label of parsed app file content, in either format."""
+		from .labelFiles import isCompact, iterCompact
+		if isCompact(data):
+			# Written by this version, from fingerprints already migrated.
+			return iterCompact(data)
+		return ((self._keyFromString(k), v) for k, v in data.get("labels", {}).items())
 
 	def _keyToString(self, key):
 		"""Convert fingerprint tuple to JSON string."""
-		return json.dumps(list(key), ensure_ascii=False)
+		from .labelSources import fingerprintToKeyString
+		return fingerprintToKeyString(key)
 
 	def _keyFromString(self, s):
 		"""Convert JSON string back to fingerprint tuple."""
 		items = [tuple(item) for item in json.loads(s)]
-		# Migration: add fields missing from older fingerprint versions
+		# Migration: add fields missing from older fingerprint versions.
+		# Fingerprints built with a non-default profile only carry the fields
+		# their profile declares, and row fingerprints have their own fields,
+		# so they are left as they are.
 		keys = {item[0] for item in items}
-		if "name" not in keys:
-			items.append(("name", ""))
-		if "description" not in keys:
-			items.append(("description", ""))
-		if "parentName" not in keys:
-			items.append(("parentName", ""))
+		if "profile" not in keys and not isRowFingerprint(keys):
+			if "name" not in keys:
+				items.append(("name", ""))
+			if "description" not in keys:
+				items.append(("description", ""))
+			if "parentName" not in keys:
+				items.append(("parentName", ""))
 		# Remove obsolete fields from older fingerprint versions
 		_OBSOLETE_FIELDS = {"parentDesc", "ia2Class", "ia2Tag"}
 		items = [item for item in items if item[0] not in _OBSOLETE_FIELDS]
@@ -154,113 +384,531 @@ class LabelStore:
 		fpDict = dict(fingerprint)
 		return fpDict.get("app", "unknown")
 
-	def get(self, fingerprint):
-		"""Get a label for a fingerprint."""
+	def get(self, fingerprint, window=None):
+		"""Get a label for a fingerprint. See lookup()."""
+		return self._lookup(fingerprint, window, True)[0]
+
+	def lookup(self, fingerprint, window=None):
+		"""Return (label, key) for a live fingerprint, or (None, None) if it has no label.
+
+		Scopes are checked most specific first: labels of the object's top-level window,
+		given as window (a string, or a callable returning it, only called when the app
+		has window-scoped labels), then labels of its app, then global labels.
+		In the app and global scopes, the user's labels are checked first, then the
+		read-only sources in priority order, which match exact fingerprints only.
+		Window-scoped labels only match exactly too.
+
+		key is the fingerprint the user's label is saved under, or the scoped fingerprint
+		a source's label was found for. A saved fingerprint is its own key.
+		"""
+		return self._lookup(fingerprint, window, True)
+
+	def _lookup(self, fingerprint, window, withSources):
 		appName = self._getAppFromFingerprint(fingerprint)
 		self._loadApp(appName)
-		return self._cache.get(appName, {}).get(fingerprint)
+		labels = self._getLabels(appName) if self._working else self._cache.get(appName, _NO_LABELS)
+		index = self._fieldIndexes.get(appName)
+		if index is None or index["labels"] is not labels:
+			index = self._getFieldIndex(appName, labels)
+		if index["windowScoped"]:
+			if callable(window):
+				window = window()
+			if window:
+				key = scopeFingerprint(fingerprint, SCOPE_WINDOW, window)
+				label = labels.get(key)
+				if label is not None:
+					return label, key
+		label = labels.get(fingerprint)
+		if label is not None:
+			return label, fingerprint
+		if self._needsFieldMatch(appName, fingerprint, labels):
+			key = self._getKeyByFields(appName, fingerprint, labels)
+			if key is not None:
+				return labels[key], key
+		if withSources and self._sources:
+			label = self._getFromSources(appName, fingerprint)
+			if label is not None:
+				return label, fingerprint
+		if appName == GLOBAL_APP:
+			return None, None
+		return self._lookupGlobal(fingerprint, withSources)
+
+	def _lookupGlobal(self, fingerprint, withSources):
+		self._loadApp(GLOBAL_APP)
+		labels = self._getLabels(GLOBAL_APP) if self._working else self._cache.get(GLOBAL_APP, _NO_LABELS)
+		sources = self._sources if withSources else ()
+		hasSources = bool(sources) and any(source.hasApp(GLOBAL_APP) for source in sources)
+		if not labels and not hasSources:
+			return None, None
+		key = scopeFingerprint(fingerprint, SCOPE_GLOBAL)
+		label = labels.get(key)
+		if label is not None:
+			return label, key
+		if labels and self._needsFieldMatch(GLOBAL_APP, key, labels):
+			savedKey = self._getKeyByFields(GLOBAL_APP, key, labels)
+			if savedKey is not None:
+				return labels[savedKey], savedKey
+		if hasSources:
+			label = self._getFromSources(GLOBAL_APP, key)
+			if label is not None:
+				return label, key
+		return None, None
+
+	def _getFromSources(self, appName, fingerprint):
+		from .labelSources import fingerprintToKeyString
+		keyString = None
+		for source in self._sources:
+			if not source.hasApp(appName):
+				continue
+			if keyString is None:
+				keyString = fingerprintToKeyString(fingerprint)
+			label = source.get(fingerprint, keyString)
+			if label is not None:
+				return label
+		return None
+
+	def addSource(self, source):
+		"""Add a read-only label source below the user's labels and any sources added before it."""
+		self._sources.append(source)
+		_invalidateLookupCaches()
+
+	def removeSource(self, source):
+		"""Remove a read-only label source. The caller closes it."""
+		self._sources.remove(source)
+		_invalidateLookupCaches()
+
+	def getSources(self):
+		"""Return the read-only label sources, highest priority first."""
+		return list(self._sources)
+
+	def loadSources(self):
+		"""Open the read-only label sources in the sources folder, in file name order."""
+		folder = getLabelSourcesFolder()
+		if not os.path.isdir(folder):
+			return
+		try:
+			filenames = sorted(os.listdir(folder))
+		except Exception:
+			log.error("CustomLabels: failed to list label sources folder", exc_info=True)
+			return
+		from .labelSources import SOURCE_EXTENSION, MappedLabelSource
+		for filename in filenames:
+			if not filename.endswith(SOURCE_EXTENSION):
+				continue
+			try:
+				source = MappedLabelSource(os.path.join(folder, filename))
+			except Exception:
+				log.error(f"CustomLabels: failed to open label source '{filename}'", exc_info=True)
+				continue
+			self.addSource(source)
+			log.debug(f"CustomLabels: opened label source '{filename}' with {len(source)} labels")
+
+	def closeSources(self):
+		"""Remove and close all read-only label sources."""
+		sources = self._sources
+		self._sources = []
+		for source in sources:
+			source.close()
+		_invalidateLookupCaches()
+
+	def _getFieldIndex(self, appName, labels):
+		index = self._fieldIndexes.get(appName)
+		# An index built from labels that were replaced since is not used.
+		if index is None or index["labels"] is not labels:
+			profiles = set()
+			windowScoped = False
+			for fp in labels:
+				fpDict = dict(fp)
+				profiles.add(fpDict.get("profile", DEFAULT_PROFILE))
+				windowScoped = windowScoped or WINDOW_FIELD in fpDict
+			index = {"labels": labels, "profiles": profiles, "windowScoped": windowScoped, "projections": {}}
+			self._fieldIndexes[appName] = index
+		return index
+
+	def _needsFieldMatch(self, appName, fingerprint, labels):
+		"""Return True if an exact miss may still match a label on a subset of fields.
+
+		This is the case when optional fields were dropped while building the fingerprint,
+		or when the app has labels that were saved under a different fingerprint profile.
+		"""
+		if getMissingFields(fingerprint):
+			return True
+		profiles = self._getFieldIndex(appName, labels)["profiles"]
+		return bool(profiles - {dict(fingerprint).get("profile", DEFAULT_PROFILE)})
+
+	def _getKeyByFields(self, appName, fingerprint, labels):
+		"""Match a fingerprint against saved labels on the fields it has, returning the saved one or None.
+
+		Saved fingerprints are projected onto the live fingerprint's field names
+		(ignoring the profile), and only those that have all of the fields take part.
+		Projections shared by more than one label are ambiguous and never match.
+		Window-scoped labels take no part unless the fingerprint has a window.
+		"""
+		liveKey = tuple(item for item in fingerprint if item[0] != "profile")
+		fieldNames = frozenset(item[0] for item in liveKey)
+		projections = self._getFieldIndex(appName, labels)["projections"]
+		projected = projections.get(fieldNames)
+		if projected is None:
+			projected = {}
+			for fp in labels:
+				savedNames = {item[0] for item in fp}
+				if not fieldNames <= savedNames:
+					continue
+				if WINDOW_FIELD in savedNames and WINDOW_FIELD not in fieldNames:
+					continue
+				key = tuple(item for item in fp if item[0] in fieldNames)
+				projected[key] = None if key in projected else fp
+			projections[fieldNames] = projected
+		return projected.get(liveKey)
+
+	def getLabelKey(self, fingerprint, window=None):
+		"""Return the fingerprint a user's label is saved under for a live fingerprint, or None.
+
+		This is the fingerprint itself, its window-scoped or global fingerprint, or the
+		saved one it matches on a subset of fields, in the order of lookup().
+		Labels from read-only sources have no saved fingerprint.
+		"""
+		return self._lookup(fingerprint, window, False)[1]
+
+	def mayHaveLabels(self, appName):
+		"""Return False if no label can match an object of an app.
+
+		That is when neither the app nor the global scope has labels, the user's or
+		a source's. Labels of any scope of the app, window-scoped ones included, make
+		this True.
+		"""
+		for name in (appName, GLOBAL_APP):
+			self._loadApp(name)
+			if self._getLabels(name):
+				return True
+		return any(source.hasApp(appName) or source.hasApp(GLOBAL_APP) for source in self._sources)
 
 	def set(self, fingerprint, label):
 		"""Set a label for a fingerprint."""
 		appName = self._getAppFromFingerprint(fingerprint)
-		self._loadApp(appName)
-
-		if appName not in self._cache:
-			self._cache[appName] = {}
-		self._cache[appName][fingerprint] = label
-		self._saveApp(appName)
-		_overlayCache.clear()
-		_invalidateBrowseModeCache()
+		with self.batch():
+			labels = self._getWritableLabels(appName)
+			previousLabel = labels.get(fingerprint)
+			labels[fingerprint] = label
+			self._changed(appName, fingerprint, label, previousLabel)
 
 	def remove(self, fingerprint):
 		"""Remove a label for a fingerprint."""
 		appName = self._getAppFromFingerprint(fingerprint)
-		self._loadApp(appName)
-
-		if appName in self._cache and fingerprint in self._cache[appName]:
-			del self._cache[appName][fingerprint]
-			self._saveApp(appName)
-			_overlayCache.clear()
-			_invalidateBrowseModeCache()
+		with self.batch():
+			self._loadApp(appName)
+			if fingerprint not in self._getLabels(appName):
+				return False
+			previousLabel = self._getWritableLabels(appName).pop(fingerprint)
+			self._changed(appName, fingerprint, None, previousLabel)
 			return True
-		return False
+
+	def setMany(self, items):
+		"""Set labels for many fingerprints, given as (fingerprint, label) pairs, in one batch."""
+		with self.batch():
+			for fingerprint, label in items:
+				self.set(fingerprint, label)
+
+	def removeMany(self, fingerprints):
+		"""Remove the labels of many fingerprints in one batch. Returns how many were removed."""
+		removed = 0
+		with self.batch():
+			for fingerprint in fingerprints:
+				if self.remove(fingerprint):
+					removed += 1
+		return removed
+
+	@contextlib.contextmanager
+	def batch(self):
+		"""Group changes so each touched app file is written once and caches are flushed once.
+
+		Every change is made in a batch, which holds the store's lock: changes from
+		other threads wait for it to end. Changes are seen at once by the thread
+		making them, and by other threads when the outermost batch ends, all together.
+		Saving, cache invalidation and labelChanged notifications happen then too.
+		"""
+		with self._lock:
+			self._batchDepth += 1
+			if self._batchDepth == 1:
+				self._batchThread = _getThreadId()
+			try:
+				yield self
+			finally:
+				self._batchDepth -= 1
+				if not self._batchDepth:
+					try:
+						self._commit()
+					finally:
+						self._batchThread = None
+
+	def _changed(self, appName, fingerprint, label, previousLabel=None):
+		"""Record a change to an app's labels, made in the open batch."""
+		self._fieldIndexes.pop(appName, None)
+		self._dirtyApps.add(appName)
+		self._pendingChanges.append((appName, fingerprint, label, previousLabel))
+
+	def _commit(self):
+		# Publish the changed apps in one step.
+		working = self._working
+		self._working = {}
+		self._cache.update(working)
+		dirtyApps = self._dirtyApps
+		changes = self._pendingChanges
+		self._dirtyApps = set()
+		self._pendingChanges = []
+		externalChanges = []
+		for appName in sorted(dirtyApps):
+			appChanges = [change for change in changes if change[0] == appName]
+			externalChanges.extend(self._saveApp(appName, appChanges))
+		self._notify(changes + externalChanges)
+
+	def _notify(self, changes):
+		if changes:
+			_invalidateLookupCaches()
+		for appName, fingerprint, label, previousLabel in changes:
+			self.labelChanged.notify(
+				appName=appName, fingerprint=fingerprint, label=label, previousLabel=previousLabel,
+			)
 
 	def has(self, fingerprint):
 		"""Check if a label exists."""
 		appName = self._getAppFromFingerprint(fingerprint)
 		self._loadApp(appName)
-		return fingerprint in self._cache.get(appName, {})
+		return fingerprint in self._getLabels(appName)
 
 	def getAll(self):
 		"""Get all labels from all apps."""
 		self._loadAllApps()
 		result = {}
-		for appName, labels in self._cache.items():
+		for appName, labels in self._getAllLabels().items():
 			result.update(labels)
 		return result
 
 	def getAllByApp(self):
-		"""Get all labels grouped by app. Returns {appName: {fingerprint: label}}."""
+		"""Get all labels grouped by app. Returns {appName: {fingerprint: label}}.
+
+		The labels of each app are shared with the store and must not be changed.
+		"""
 		self._loadAllApps()
-		return dict(self._cache)
+		return self._getAllLabels()
 
 	def getApps(self):
 		"""Get list of apps that have labels."""
 		self._loadAllApps()
-		return [app for app, labels in self._cache.items() if labels]
+		return [app for app, labels in self._getAllLabels().items() if labels]
 
 	def getLabelsForApp(self, appName):
 		"""Get all labels for a specific app."""
 		self._loadApp(appName)
-		return dict(self._cache.get(appName, {}))
+		return dict(self._getLabels(appName))
 
 	def removeApp(self, appName):
 		"""Remove all labels for an app."""
-		self._loadApp(appName)
-		if appName in self._cache:
-			self._cache[appName] = {}
-			self._saveApp(appName)
-			_overlayCache.clear()
-			return True
-		return False
+		with self.batch():
+			self._loadApp(appName)
+			self._working[appName] = {}
+			self._changed(appName, None, None)
+		return True
 
 	def clear(self):
 		"""Remove all labels for all apps."""
 		self._loadAllApps()
-		for appName in list(self._cache.keys()):
-			self._cache[appName] = {}
-			self._saveApp(appName)
-		_overlayCache.clear()
+		with self.batch():
+			for appName, labels in self._getAllLabels().items():
+				hadLabels = bool(labels)
+				self._working[appName] = {}
+				if hadLabels:
+					self._changed(appName, None, None)
+				else:
+					# Still rewrite (delete) the file, as clear() always did.
+					self._dirtyApps.add(appName)
+
+	def getAppCounts(self):
+		"""Return {appName: number of labels} for all apps with labels.
+
+		Apps that are not loaded yet are counted from the header of their file,
+		so this does not parse their labels. Files saved by older versions have no
+		count in their header, and are loaded instead.
+		"""
+		self.checkForChanges()
+		counts = {appName: len(labels) for appName, labels in self._getAllLabels().items() if labels}
+		folder = getLabelsFolder()
+		if not os.path.isdir(folder):
+			return counts
+		try:
+			filenames = os.listdir(folder)
+		except Exception:
+			log.error("CustomLabels: failed to list labels folder", exc_info=True)
+			return counts
+		for filename in filenames:
+			if not filename.endswith(".json"):
+				continue
+			stemName = filename[:-5]
+			if stemName in self._loadedApps:
+				continue
+			filePath = os.path.join(folder, filename)
+			appName, count = _readAppFileHeader(filePath)
+			if appName is not None and appName in self._loadedApps:
+				continue
+			if appName is None or count is None:
+				self._loadAppFile(filePath, stemName)
+				appName = _appNameForFile(self._getAllLabels(), stemName, appName)
+				count = len(self._cache.get(appName, _NO_LABELS))
+			if count:
+				counts[appName] = count
+		return counts
+
+	def _loadAppFile(self, filePath, stemName):
+		"""Load one app file found in the labels folder, unless its app is already loaded."""
+		signature, encoded, error = _readAppFileForLoad(filePath)
+		if error is None:
+			appName, labels, error = _parseAppFile(encoded, stemName)
+		if error is not None:
+			log.error(f"CustomLabels: failed to load labels file '{os.path.basename(filePath)}'", exc_info=error)
+			dumpOnError("failing to load labels")
+			return
+		self._publishAppFile(filePath, signature, appName, labels)
+
+	def _publishAppFile(self, filePath, signature, appName, labels):
+		"""Publish the labels read from an app file, unless its app is already loaded."""
+		with self._lock:
+			if appName not in self._loadedApps:
+				self._cache[appName] = labels
+				self._loadedApps.add(appName)
+				self._fileStates[appName] = [filePath, signature, time.monotonic() + CHANGE_CHECK_INTERVAL]
+				trace("loadAppFile", appName, len(labels))
 
 	def _loadAllApps(self):
-		"""Load all app label files from disk."""
+		"""Load all app label files from disk, and reload those changed since."""
+		self.checkForChanges()
 		folder = getLabelsFolder()
 		try:
-			for filename in os.listdir(folder):
-				if not filename.endswith(".json"):
-					continue
-				# Use the filename stem as a cheap pre-check before opening the file.
-				# The real appName inside the JSON may differ, but this avoids I/O for
-				# apps whose sanitized name is already loaded.
-				stemName = filename[:-5]
-				if stemName in self._loadedApps:
-					continue
-				filePath = os.path.join(folder, filename)
-				try:
-					with open(filePath, "r", encoding="utf-8") as f:
-						data = json.load(f)
-					appName = data.get("appName", stemName)
-					if appName not in self._loadedApps:
-						self._loadedApps.add(appName)
-						self._cache[appName] = {
-							self._keyFromString(k): v
-							for k, v in data.get("labels", {}).items()
-						}
-						log.debug(f"CustomLabels: loaded {len(self._cache[appName])} labels for '{appName}' (bulk load)")
-				except Exception:
-					log.error(f"CustomLabels: failed to load labels file '{filename}'", exc_info=True)
+			filenames = sorted(os.listdir(folder))
 		except Exception:
 			log.error("CustomLabels: failed to list labels folder", exc_info=True)
+			return
+		files = []
+		for filename in filenames:
+			if not filename.endswith(".json"):
+				continue
+			# Use the filename stem as a cheap pre-check before opening the file.
+			# The real appName inside the JSON may differ, but this avoids I/O for
+			# apps whose sanitized name is already loaded.
+			stemName = filename[:-5]
+			if stemName in self._loadedApps:
+				continue
+			files.append((os.path.join(folder, filename), stemName))
+		if len(files) < PARALLEL_LOAD_MIN_FILES:
+			for filePath, stemName in files:
+				self._loadAppFile(filePath, stemName)
+			return
+		self._loadAppFiles(files)
+
+	def _loadAppFiles(self, files):
+		"""Load many app files, given as (file path, stem name) in file name order.
+
+		Files are read and decompressed by a pool of threads, as that waits on the disk
+		and releases the GIL. They are parsed on this thread. Labels are published
+		in file name order whatever order the reads end in, so when two files hold the
+		same app, the first one by name is loaded, as when loading one file at a time.
+		"""
+		# Imported here, as most sessions never load all apps.
+		from concurrent.futures import ThreadPoolExecutor
+		threadCount = min(LOAD_THREADS, len(files))
+		filePaths = [filePath for filePath, stemName in files]
+		# One run of consecutive files per thread, rather than a task per file, which costs more
+		# than reading a small file from a local disk.
+		runLength = -(-len(filePaths) // threadCount)
+		runs = [filePaths[start:start + runLength] for start in range(0, len(filePaths), runLength)]
+		with ThreadPoolExecutor(threadCount, thread_name_prefix="CustomLabels") as executor:
+			reads = [read for runReads in executor.map(_readAppFilesForLoad, runs) for read in runReads]
+		loaded = []
+		for (filePath, stemName), (signature, encoded, error) in zip(files, reads):
+			if error is not None:
+				fileName = os.path.basename(filePath)
+				log.error(f"CustomLabels: failed to read labels file '{fileName}'", exc_info=error)
+				continue
+			loaded.append((filePath, stemName, signature, encoded))
+		for filePath, stemName, signature, encoded in loaded:
+			appName, labels, error = _parseAppFile(encoded, stemName)
+			if error is not None:
+				fileName = os.path.basename(filePath)
+				log.error(f"CustomLabels: failed to load labels file '{fileName}'", exc_info=error)
+				dumpOnError("failing to load labels")
+				continue
+			self._publishAppFile(filePath, signature, appName, labels)
+
+
+# Loading all apps
+
+def _readAppFileForLoad(filePath):
+	"""Return (signature, JSON bytes, None) of an app file, or (None, None, error).
+
+	Run by the loading threads.
+	"""
+	try:
+		# Taken before reading, so a change made while reading is noticed at the next check.
+		signature = _getFileSignature(filePath)
+		from .labelFiles import readAppFileBytes
+		return signature, readAppFileBytes(filePath), None
+	except Exception as e:
+		return None, None, e
+
+
+def _readAppFilesForLoad(filePaths):
+	return [_readAppFileForLoad(filePath) for filePath in filePaths]
+
+
+def _parseAppFile(encoded, stemName):
+	"""Return (appName, {fingerprint: label}, None) from the bytes of an app file, or (None, None, error)."""
+	try:
+		data = json.loads(encoded)
+		return data.get("appName", stemName), labelStore.loadAppData(data), None
+	except Exception as e:
+		return None, None, e
+
+
+# Matches the "appName" and "count" entries at the start of an app file.
+_HEADER_APP_NAME_RE = re.compile(r'"appName"\s*:\s*("(?:[^"\\]|\\.)*")')
+_HEADER_COUNT_RE = re.compile(r'"count"\s*:\s*(\d+)')
+_HEADER_SIZE = 1024
+
+
+def _readAppFileHeader(filePath):
+	"""Return (appName, count) from the start of an app file.
+
+	Either value is None when the header does not contain it.
+	"""
+	from .labelFiles import openAppFileText
+	try:
+		with openAppFileText(filePath) as f:
+			head = f.read(_HEADER_SIZE)
+	except Exception:
+		log.debugWarning(f"CustomLabels: failed to read header of '{filePath}'", exc_info=True)
+		return None, None
+	# Only look before the labels, so label text cannot be mistaken for the header.
+	head = head.split('"labels"', 1)[0]
+	appName = count = None
+	match = _HEADER_APP_NAME_RE.search(head)
+	if match:
+		try:
+			appName = json.loads(match.group(1))
+		except ValueError:
+			pass
+	match = _HEADER_COUNT_RE.search(head)
+	if match:
+		count = int(match.group(1))
+	return appName, count
+
+
+def _appNameForFile(cache, stemName, appName):
+	"""Return the app name a file was loaded under, given its stem and header app name."""
+	if appName is not None:
+		return appName
+	for name in cache:
+		if sanitizeAppName(name) == stemName:
+			return name
+	return stemName
 
 
 # Global label store instance
@@ -268,14 +916,16 @@ labelStore = LabelStore()
 
 
 # Overlay class cache
+# Replaced, never emptied, when labels change, as that may happen on another thread.
 
 _overlayCache = {}
 
 
 def makeLabelOverlay(labelText):
 	"""Create or retrieve a cached overlay class."""
-	if labelText in _overlayCache:
-		return _overlayCache[labelText]
+	overlay = _overlayCache.get(labelText)
+	if overlay is not None:
+		return overlay
 
 	class LabelOverlay(NVDAObject):
 		# Use a property so instance-level assignment cannot shadow the label.
@@ -291,13 +941,61 @@ def makeLabelOverlay(labelText):
 	return LabelOverlay
 
 
+# Lookup result cache: object cache key -> label or None.
+# Filled by normal overlay lookups, and used on its own while lookups are throttled.
+# Like the overlay cache, it is replaced when labels change: a thread still using
+# the old one then only changes the dropped dict.
+
+_lookupCache = OrderedDict()
+_LOOKUP_CACHE_SIZE = 2000
+# Told apart from a cached None
+_NOT_CACHED = object()
+
+
+def getCachedLabel(cacheKey):
+	"""Return (found, label) for an object cache key from the lookup cache."""
+	cache = _lookupCache
+	label = cache.get(cacheKey, _NOT_CACHED)
+	if label is _NOT_CACHED:
+		return False, None
+	try:
+		cache.move_to_end(cacheKey)
+	except KeyError:
+		# Evicted meanwhile: the label read is still the cached result.
+		pass
+	return True, label
+
+
+def cacheLabel(cacheKey, label):
+	"""Remember the result of a lookup for an object cache key."""
+	cache = _lookupCache
+	cache[cacheKey] = label
+	try:
+		cache.move_to_end(cacheKey)
+		if len(cache) > _LOOKUP_CACHE_SIZE:
+			cache.popitem(last=False)
+	except KeyError:
+		pass
+
+
+def _invalidateLookupCaches():
+	"""Forget cached lookup results after labels change."""
+	global _overlayCache, _lookupCache
+	_overlayCache = {}
+	_lookupCache = OrderedDict()
+	_invalidateBrowseModeCache()
+
+
 def _invalidateBrowseModeCache():
 	"""Notify virtualBufferSupport to clear its label caches.
 
-	Imported lazily to avoid a circular import (virtualBufferSupport imports labeler).
+	It is only loaded once a document gained focus, and has no caches before, so
+	it is looked up in sys.modules rather than imported (it also imports labeler).
 	"""
+	virtualBufferSupport = sys.modules.get(f"{__package__}.virtualBufferSupport")
+	if virtualBufferSupport is None:
+		return
 	try:
-		from . import virtualBufferSupport
 		virtualBufferSupport.invalidateCacheForLabel(None)
 	except Exception:
 		pass
@@ -305,8 +1003,8 @@ def _invalidateBrowseModeCache():
 
 # Convenience functions
 
-def getLabel(fingerprint):
-	return labelStore.get(fingerprint)
+def getLabel(fingerprint, window=None):
+	return labelStore.get(fingerprint, window)
 
 
 def setLabel(fingerprint, label):
@@ -0,0 +1,226 @@
+# recorder
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Records focus events and browse mode reads for replaying outside NVDA.
+
+# How this works:
+# While recording, every focus event and every _getFieldsInRange call of a patched
+# browse mode document is written to a JSON Lines file in the recordings folder,
+# together with the properties of the objects involved: everything the fingerprint
+# handlers read, plus the parents they walk to.
+# tools/replay.py rebuilds fake objects and documents from a recording and drives
+# the add-on with them under cProfile, outside NVDA.
+#
+# Recordings contain the names and descriptions of the controls that were visited,
+# and the text of browse mode documents. Recording stops by itself after
+# MAX_EVENTS events, and costs nothing while it is off.
+
+import json
+import os
+import time
+import textInfos
+from logHandler import log
+
+from .fingerPrintReader import isJABObject, isUIAObject
+from .labeler import getLabelsFolder
+
+RECORDING_VERSION = 1
+MAX_EVENTS = 20000
+# Parents described for each object: enough for parentName, disambiguation and row containers.
+_PARENT_DEPTH = 3
+
+# Checked by the hooks before doing anything, so they cost one global lookup while off.
+active = False
+
+_file = None
+_path = None
+_events = 0
+# id(treeInterceptor) -> small number identifying the document in the recording
+_documents = {}
+# (document, docHandle, ID) of the controls whose object and offsets were recorded
+_recordedNodes = set()
+
+
+def getRecordingsFolder():
+	return os.path.join(getLabelsFolder(), "recordings")
+
+
+def start():
+	"""Start a new recording. Returns its path."""
+	global active, _file, _path, _events
+	if active:
+		return _path
+	folder = getRecordingsFolder()
+	os.makedirs(folder, exist_ok=True)
+	_path = os.path.join(folder, time.strftime("%Y%m%d-%H%M%S") + ".jsonl")
+	_file = open(_path, "w", encoding="utf-8")
+	_events = 0
+	_documents.clear()
+	_recordedNodes.clear()
+	active = True
+	_write({"type": "header", "version": RECORDING_VERSION, "time": time.time()})
+	log.info(f"CustomLabels: recording to {_path}")
+	return _path
+
+
+def stop():
+	"""Stop recording. Returns the path of the recording, or None if not recording."""
+	global active, _file
+	if not active:
+		return None
+	active = False
+	try:
+		_file.close()
+	except Exception:
+		log.error("CustomLabels: failed to close recording", exc_info=True)
+	_file = None
+	_documents.clear()
+	_recordedNodes.clear()
+	log.info(f"CustomLabels: recorded {_events} events to {_path}")
+	return _path
+
+
+def _write(event):
+	global _events
+	# Recording may have stopped part way through a call.
+	if not active:
+		return
+	try:
+		_file.write(json.dumps(event, ensure_ascii=False, default=str))
+		_file.write("\n")
+	except Exception:
+		log.error("CustomLabels: failed to write recording, stopping", exc_info=True)
+		stop()
+		return
+	_events += 1
+	if _events >= MAX_EVENTS:
+		stop()
+
+
+def _read(obj, attr):
+	try:
+		return getattr(obj, attr)
+	except Exception:
+		return None
+
+
+def describeObject(obj, depth=_PARENT_DEPTH):
+	"""Return the properties of obj that the add-on reads, as a JSON-serializable dict."""
+	if obj is None:
+		return None
+	role = _read(obj, "role")
+	appModule = _read(obj, "appModule")
+	desc = {
+		"appName": _read(appModule, "appName") if appModule is not None else None,
+		"role": int(role) if role is not None else None,
+		"roleName": getattr(role, "name", None),
+		"name": _read(obj, "name"),
+		"description": _read(obj, "description"),
+		"windowClassName": _read(obj, "windowClassName"),
+		"windowControlID": _read(obj, "windowControlID"),
+		"windowHandle": _read(obj, "windowHandle"),
+		"indexInParent": _read(obj, "indexInParent"),
+		"columnNumber": _read(obj, "columnNumber"),
+		"positionInfo": _read(obj, "positionInfo"),
+		"event_objectID": getattr(obj, "event_objectID", None),
+		"event_childID": getattr(obj, "event_childID", None),
+	}
+	if isUIAObject(obj):
+		element = _read(obj, "UIAElement")
+		desc["kind"] = "UIA"
+		desc["uia"] = {
+			prop: _read(element, prop)
+			for prop in (
+				"currentAutomationId",
+				"cachedAutomationId",
+				"currentFrameworkId",
+				"currentAriaProperties",
+				"currentAriaRole",
+			)
+		}
+	elif isJABObject(obj):
+		desc["kind"] = "JAB"
+		try:
+			info = obj.jabContext.getAccessibleContextInfo()
+			desc["jab"] = {"name": info.name, "description": info.description}
+		except Exception:
+			desc["jab"] = None
+	else:
+		desc["kind"] = "IA2"
+	if depth > 0:
+		desc["parent"] = describeObject(_read(obj, "parent"), depth - 1)
+	return desc
+
+
+def _documentId(treeInterceptor):
+	return _documents.setdefault(id(treeInterceptor), len(_documents))
+
+
+def recordFocus(obj):
+	_write({"type": "focus", "time": time.time(), "obj": describeObject(obj)})
+
+
+def recordFields(textInfo, treeInterceptor, start, end, commandList):
+	"""Record a _getFieldsInRange call.
+
+	The first time a control appears in a document, its object and buffer offsets
+	are recorded with a node event written before the call.
+	"""
+	document = _documentId(treeInterceptor)
+	items = []
+	for item in commandList:
+		if isinstance(item, str):
+			items.append(item)
+		elif isinstance(item, textInfos.FieldCommand):
+			field = item.field
+			fieldData = None
+			if field:
+				fieldData = {
+					key: field.get(key)
+					for key in ("controlIdentifier_docHandle", "controlIdentifier_ID", "role")
+					if key in field
+				}
+			items.append({"command": item.command, "field": fieldData})
+			if item.command == "controlStart" and fieldData:
+				_recordNode(textInfo, treeInterceptor, document, fieldData)
+		else:
+			items.append(None)
+	_write({
+		"type": "fields",
+		"time": time.time(),
+		"document": document,
+		"start": start,
+		"end": end,
+		"items": items,
+	})
+
+
+def _recordNode(textInfo, treeInterceptor, document, fieldData):
+	try:
+		docHandle = int(fieldData["controlIdentifier_docHandle"])
+		ID = int(fieldData["controlIdentifier_ID"])
+	except (KeyError, TypeError, ValueError):
+		return
+	key = (document, docHandle, ID)
+	if key in _recordedNodes:
+		return
+	_recordedNodes.add(key)
+	try:
+		offsets = list(textInfo._getOffsetsFromFieldIdentifier(docHandle, ID))
+	except Exception:
+		offsets = None
+	try:
+		obj = treeInterceptor.getNVDAObjectFromIdentifier(docHandle, ID)
+	except Exception:
+		obj = None
+	_write({
+		"type": "node",
+		"document": document,
+		"docHandle": docHandle,
+		"ID": ID,
+		"offsets": offsets,
+		"obj": describeObject(obj),
+	})
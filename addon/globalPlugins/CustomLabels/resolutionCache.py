@@ -0,0 +1,230 @@
+# resolutionCache
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Remembers, across sessions, which browse mode nodes of a document have no label.
+
+# How this works:
+# The buffer identifiers (docHandle, ID) of a document change every time it is loaded,
+# so virtualBufferSupport's per-document cache starts empty on every visit, and every
+# control met is fingerprinted again. This cache keys documents by app and URL (or
+# title), and nodes by attributes of their controlStart field that stay the same
+# between loads: role, name, description, tag, id and class, and by the name of the
+# control they are in, usually their parent. The fields a fingerprint reads from a
+# node's object and its parent are then all in its key, so a node whose content
+# changed between visits has a new key and is fingerprinted again.
+#
+# Each node key is recorded as labeled or unlabeled. On a later visit, nodes known to
+# be unlabeled are skipped without fetching their object or fingerprinting them.
+# Node keys are not unique: when any node with a key has a label, the key is
+# recorded as labeled, and its nodes are always fingerprinted.
+# Unlabeled keys learned in a document are only trusted once that document is
+# closed, so that every node of the first visit is fingerprinted and such
+# collisions are found.
+#
+# Any change to labels or label sources clears the cache. The cache is saved with a
+# signature of the label files, and is discarded when loaded if they changed
+# meanwhile. At most MAX_DOCUMENTS documents are kept, the least recently visited
+# being dropped first, and at most MAX_NODES node keys per document.
+
+import json
+import os
+from collections import OrderedDict
+from logHandler import log
+
+from .labeler import getLabelsFolder, getLabelSourcesFolder
+from .labelSources import SOURCE_EXTENSION
+
+CACHE_VERSION = 2
+MAX_DOCUMENTS = 100
+MAX_NODES = 20000
+
+# Node states
+UNLABELED = 0
+LABELED = 1
+# Unlabeled in a document that is still open: not trusted yet.
+_PENDING = 2
+
+# Attributes of a controlStart field that identify a node between loads of a document.
+_NODE_ATTRIBUTES = (
+	"role",
+	"name",
+	"description",
+	"IAccessible2::attribute_tag",
+	"IAccessible2::attribute_id",
+	"IAccessible2::attribute_class",
+	"IAccessible2::attribute_xml-roles",
+	"IHTMLDOMNode::nodeName",
+	"HTMLAttrib::id",
+	"HTMLAttrib::class",
+)
+
+# documentKey -> {nodeKey: state}, least recently opened first
+_documents = OrderedDict()
+_loaded = False
+_dirty = False
+
+
+def getCacheFilePath():
+	return os.path.join(getLabelsFolder(), "cache", "browseResolutions.json")
+
+
+def getDocumentKey(treeInterceptor):
+	"""Return the key of a browse mode document: its app and URL or title. None if it has neither."""
+	try:
+		root = treeInterceptor.rootNVDAObject
+		appName = root.appModule.appName
+	except Exception:
+		return None
+	try:
+		identifier = treeInterceptor.documentConstantIdentifier
+	except Exception:
+		identifier = None
+	if identifier:
+		# The fragment changes as single page apps navigate, not the document.
+		identifier = identifier.split("#", 1)[0]
+	else:
+		try:
+			identifier = root.name
+		except Exception:
+			identifier = None
+	if not appName or not identifier:
+		return None
+	return f"{appName}\n{identifier}"
+
+
+def getNodeKey(field, parentName=None):
+	"""Return the key of the node of a controlStart field, in a control named parentName."""
+	attributes = [str(field.get(attribute, "")) for attribute in _NODE_ATTRIBUTES]
+	attributes.append(parentName or "")
+	return "\x1f".join(attributes)
+
+
+def openDocument(documentKey):
+	"""Return the node states of a document, creating them if needed, and mark it as recently visited."""
+	_load()
+	nodes = _documents.get(documentKey)
+	if nodes is None:
+		nodes = _documents[documentKey] = {}
+		if len(_documents) > MAX_DOCUMENTS:
+			_documents.popitem(last=False)
+	else:
+		_documents.move_to_end(documentKey)
+	return nodes
+
+
+def closeDocument(nodes):
+	"""Trust the unlabeled node keys learned while the document was open."""
+	for nodeKey, state in nodes.items():
+		if state == _PENDING:
+			nodes[nodeKey] = UNLABELED
+
+
+def isKnownUnlabeled(nodes, nodeKey):
+	return nodes.get(nodeKey) == UNLABELED
+
+
+def record(nodes, nodeKey, labeled):
+	"""Record whether a fingerprinted node has a label."""
+	global _dirty
+	state = nodes.get(nodeKey)
+	if state == LABELED:
+		return
+	if labeled:
+		nodes[nodeKey] = LABELED
+	elif state is None:
+		if len(nodes) >= MAX_NODES:
+			return
+		nodes[nodeKey] = _PENDING
+	else:
+		return
+	_dirty = True
+
+
+def invalidate():
+	"""Forget all node states, after labels changed.
+
+	The node dicts of open documents are emptied rather than dropped, as
+	virtualBufferSupport holds them.
+	"""
+	global _dirty
+	for nodes in list(_documents.values()):
+		nodes.clear()
+	_dirty = True
+
+
+def _getLabelsSignature():
+	"""Return the names, sizes and modification times of the label files and sources."""
+	signature = []
+	for folder, extension in ((getLabelsFolder(), ".json"), (getLabelSourcesFolder(), SOURCE_EXTENSION)):
+		try:
+			entries = list(os.scandir(folder))
+		except OSError:
+			continue
+		for entry in entries:
+			if not entry.name.endswith(extension) or not entry.is_file():
+				continue
+			stat = entry.stat()
+			signature.append([entry.name, stat.st_size, stat.st_mtime_ns])
+	signature.sort()
+	return signature
+
+
+def _load():
+	global _loaded
+	if _loaded:
+		return
+	_loaded = True
+	filePath = getCacheFilePath()
+	if not os.path.exists(filePath):
+		return
+	try:
+		with open(filePath, "r", encoding="utf-8") as f:
+			data = json.load(f)
+		if data.get("version") != CACHE_VERSION or data.get("labels") != _getLabelsSignature():
+			log.debug("CustomLabels: labels changed since the browse mode cache was saved, discarding it")
+			return
+		for documentKey, nodes in data.get("documents", []):
+			_documents[documentKey] = {
+				nodeKey: state for nodeKey, state in nodes.items() if state in (UNLABELED, LABELED)
+			}
+	except Exception:
+		log.error("CustomLabels: failed to load browse mode cache", exc_info=True)
+		_documents.clear()
+
+
+def save():
+	"""Save the cache if it changed, trusting what open documents learned."""
+	global _dirty
+	if not _dirty:
+		return
+	_dirty = False
+	documents = []
+	for documentKey, nodes in _documents.items():
+		if nodes:
+			documents.append([documentKey, {
+				nodeKey: UNLABELED if state == _PENDING else state
+				for nodeKey, state in nodes.items()
+			}])
+	filePath = getCacheFilePath()
+	try:
+		if not documents:
+			if os.path.exists(filePath):
+				os.remove(filePath)
+			return
+		os.makedirs(os.path.dirname(filePath), exist_ok=True)
+		data = {"version": CACHE_VERSION, "labels": _getLabelsSignature(), "documents": documents}
+		with open(filePath, "w", encoding="utf-8") as f:
+			json.dump(data, f, ensure_ascii=False)
+	except Exception:
+		log.error("CustomLabels: failed to save browse mode cache", exc_info=True)
+
+
+def clear():
+	"""Forget the cache and reload it from disk when next used."""
+	global _loaded, _dirty
+	_documents.clear()
+	_loaded = False
+	_dirty = False
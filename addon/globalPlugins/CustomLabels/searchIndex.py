@@ -0,0 +1,115 @@
+# searchIndex
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# In-memory trigram index for searching labels in the settings panel.
+
+# How this works:
+# Each label is a document made of its label text, original name, app name and
+# identifier, lowercased. Every trigram (three character substring) of the
+# document maps to the set of documents containing it. A query of three or more
+# characters is answered by intersecting the sets of its trigrams, smallest first,
+# and then checking the few remaining candidates for the full substring.
+# Shorter queries are checked against every document directly.
+# Once built, the index is updated from the store's labelChanged notifications.
+
+from .fingerPrintReader import getFingerprintIdentifier
+
+_GRAM_SIZE = 3
+
+
+def _grams(text):
+	return {text[i:i + _GRAM_SIZE] for i in range(len(text) - _GRAM_SIZE + 1)}
+
+
+class LabelSearchIndex:
+	"""Trigram index over the labels of a LabelStore."""
+
+	def __init__(self, store):
+		self._store = store
+		# (appName, fingerprint) -> document text
+		self._docs = {}
+		# trigram -> set of (appName, fingerprint)
+		self._grams = {}
+		# appName -> set of (appName, fingerprint)
+		self._appDocs = {}
+		self._built = False
+
+	def _makeDocument(self, appName, fingerprint, label):
+		fpDict = dict(fingerprint)
+		return "\n".join((
+			label,
+			str(fpDict.get("name", "")),
+			appName,
+			str(getFingerprintIdentifier(fingerprint)),
+		)).lower()
+
+	def _add(self, appName, fingerprint, label):
+		key = (appName, fingerprint)
+		text = self._makeDocument(appName, fingerprint, label)
+		self._docs[key] = text
+		self._appDocs.setdefault(appName, set()).add(key)
+		for gram in _grams(text):
+			self._grams.setdefault(gram, set()).add(key)
+
+	def _remove(self, appName, fingerprint):
+		key = (appName, fingerprint)
+		text = self._docs.pop(key, None)
+		if text is None:
+			return
+		appDocs = self._appDocs.get(appName)
+		if appDocs is not None:
+			appDocs.discard(key)
+		for gram in _grams(text):
+			keys = self._grams.get(gram)
+			if keys is not None:
+				keys.discard(key)
+				if not keys:
+					del self._grams[gram]
+
+	def ensureBuilt(self):
+		"""Index every label in the store, the first time only."""
+		if self._built:
+			return
+		for appName, labels in self._store.getAllByApp().items():
+			for fingerprint, label in labels.items():
+				self._add(appName, fingerprint, label)
+		self._built = True
+		self._store.labelChanged.register(self._onLabelChanged)
+
+	def _onLabelChanged(self, appName, fingerprint, label):
+		if fingerprint is None:
+			for key in list(self._appDocs.pop(appName, ())):
+				self._remove(*key)
+			return
+		self._remove(appName, fingerprint)
+		if label is not None:
+			self._add(appName, fingerprint, label)
+
+	def search(self, query):
+		"""Return {appName: set of fingerprints} of the labels matching query, case insensitively."""
+		self.ensureBuilt()
+		query = query.strip().lower()
+		if len(query) < _GRAM_SIZE:
+			candidates = self._docs.keys()
+		else:
+			gramSets = []
+			for gram in _grams(query):
+				keys = self._grams.get(gram)
+				if not keys:
+					return {}
+				gramSets.append(keys)
+			gramSets.sort(key=len)
+			candidates = set(gramSets[0])
+			for keys in gramSets[1:]:
+				candidates &= keys
+				if not candidates:
+					return {}
+		result = {}
+		for key in candidates:
+			if query in self._docs[key]:
+				appName, fingerprint = key
+				result.setdefault(appName, set()).add(fingerprint)
+		return result
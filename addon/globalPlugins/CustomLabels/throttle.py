@@ -0,0 +1,112 @@
+# throttle
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Adaptive rate control for overlay lookups during event storms.
+
+# How this works:
+# Live regions, populating lists and progress dialogs can make NVDA call
+# chooseNVDAObjectOverlayClasses for thousands of objects per second.
+# Every call is recorded per app with its cost, in a sliding time window.
+# When either the number of calls or their accumulated cost in the window
+# exceeds its limit, the app is degraded: lookups are served from the lookup
+# cache only, and auto-describe is skipped. Once both fall below a fraction
+# of their limits the app recovers on its own.
+
+import time
+from collections import deque
+from logHandler import log
+
+
+class _AppWindow:
+	"""Sliding window of calls for one app, plus its counters."""
+
+	def __init__(self):
+		# (monotonic time, costMs)
+		self.calls = deque()
+		self.costMs = 0.0
+		self.degraded = False
+		self.totalCalls = 0
+		self.degradedCalls = 0
+		self.degradeCount = 0
+		self.lastDegraded = None
+		self.lastRecovered = None
+
+
+class RateController:
+	"""Tracks overlay lookup rate and cost per app, and degrades apps during storms."""
+
+	def __init__(self, windowSec=1.0, maxCalls=300, maxCostMs=150, recoverFraction=0.5):
+		self.windowSec = windowSec
+		self.maxCalls = maxCalls
+		self.maxCostMs = maxCostMs
+		self.recoverFraction = recoverFraction
+		self._apps = {}
+
+	def _prune(self, window, now):
+		calls = window.calls
+		cutoff = now - self.windowSec
+		while calls and calls[0][0] < cutoff:
+			window.costMs -= calls.popleft()[1]
+
+	def record(self, appName, costMs):
+		"""Record one overlay lookup for appName that took costMs milliseconds."""
+		window = self._apps.get(appName)
+		if window is None:
+			window = self._apps[appName] = _AppWindow()
+		now = time.monotonic()
+		window.calls.append((now, costMs))
+		window.costMs += costMs
+		window.totalCalls += 1
+		if window.degraded:
+			window.degradedCalls += 1
+			return
+		self._prune(window, now)
+		if len(window.calls) > self.maxCalls or window.costMs > self.maxCostMs:
+			window.degraded = True
+			window.degradeCount += 1
+			window.lastDegraded = time.time()
+			log.info(
+				f"CustomLabels: lookups degraded for '{appName}' "
+				f"({len(window.calls)} calls, {window.costMs:.0f} ms in {self.windowSec} s)",
+			)
+
+	def isDegraded(self, appName):
+		"""Return True if lookups for appName should be served from the cache only."""
+		window = self._apps.get(appName)
+		if window is None or not window.degraded:
+			return False
+		self._prune(window, time.monotonic())
+		if (
+			len(window.calls) <= self.maxCalls * self.recoverFraction
+			and window.costMs <= self.maxCostMs * self.recoverFraction
+		):
+			window.degraded = False
+			window.lastRecovered = time.time()
+			log.info(f"CustomLabels: lookups recovered for '{appName}'")
+			return False
+		return True
+
+	def getStats(self):
+		"""Return counters per app: {appName: {counter: value}}."""
+		return {
+			appName: {
+				"degraded": window.degraded,
+				"totalCalls": window.totalCalls,
+				"degradedCalls": window.degradedCalls,
+				"degradeCount": window.degradeCount,
+				"lastDegraded": window.lastDegraded,
+				"lastRecovered": window.lastRecovered,
+			}
+			for appName, window in self._apps.items()
+		}
+
+	def reset(self):
+		"""Forget all windows and counters."""
+		self._apps.clear()
+
+
+# Global rate controller instance
+rateController = RateController()
@@ -0,0 +1,96 @@
+# trace
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Low-overhead event tracing for hot paths.
+
+# How this works:
+# trace(code, *args) stores (sequence, timestamp, code, args) in a fixed-size ring buffer.
+# Nothing is formatted when an event is recorded: the arguments are kept as they
+# are, and only turned into text when the buffer is dumped, either on request
+# (the "write trace to log" script) or by dumpOnError() when something fails.
+# Arguments should be small values (names, counts, ids), as the buffer keeps them alive.
+#
+# Recording is safe from any thread: the slot comes from an itertools.count,
+# whose next() is atomic under the GIL. A dump racing with recording may show
+# the newest event in place of the oldest one; events are ordered by sequence on dump.
+
+import itertools
+import time
+from logHandler import log
+
+_SIZE = 4096
+
+# Event code -> format string; arguments are passed positionally.
+_FORMATS = {
+	"loadApp": "loaded {1} labels for '{0}'",
+	"loadAppFile": "loaded {1} labels for '{0}' (bulk load)",
+	"saveApp": "saved {1} labels for '{0}'",
+	"removeAppFile": "removed empty labels file for '{0}'",
+	"weakFingerprint": "weak fingerprint for '{0}', adding disambiguation",
+	"browseLabel": "cached label '{0}' for browse mode node ({1}, {2})",
+}
+
+# Event number n is stored in slot n % _SIZE.
+_buffer = [None] * _SIZE
+_counter = itertools.count()
+# Sequence number of the last event dumped, so dumpOnError() only writes new events.
+_lastDumped = -1
+
+
+def trace(code, *args):
+	"""Record an event. code is a key of _FORMATS, args its arguments."""
+	sequence = next(_counter)
+	_buffer[sequence % _SIZE] = (sequence, time.time(), code, args)
+
+
+def getEvents(after=-1):
+	"""Return the buffered (sequence, time, code, args) events with a sequence above after, oldest first."""
+	events = [event for event in list(_buffer) if event is not None and event[0] > after]
+	return sorted(events, key=lambda event: event[0])
+
+
+def formatEvent(event):
+	_sequence, timestamp, code, args = event
+	fmt = _FORMATS.get(code)
+	try:
+		text = fmt.format(*args) if fmt else f"{code} {args!r}"
+	except (IndexError, KeyError, ValueError):
+		text = f"{code} {args!r}"
+	clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+	return f"{clock}.{int(timestamp * 1000) % 1000:03d} {text}"
+
+
+def formatEvents(events):
+	return "\n".join(formatEvent(event) for event in events)
+
+
+def dump(reason="requested"):
+	"""Write the whole buffer to the NVDA log. Returns the number of events written."""
+	global _lastDumped
+	events = getEvents()
+	if events:
+		_lastDumped = events[-1][0]
+	log.info(f"CustomLabels: trace ({reason}), {len(events)} events:\n{formatEvents(events)}")
+	return len(events)
+
+
+def dumpOnError(reason, maxEvents=200):
+	"""Write the events recorded since the last dump, at most maxEvents, to the NVDA log.
+
+	Call this from error handlers, so the log shows what led up to the error.
+	"""
+	global _lastDumped
+	events = getEvents(_lastDumped)[-maxEvents:]
+	if events:
+		_lastDumped = events[-1][0]
+		log.info(f"CustomLabels: trace before {reason}, last {len(events)} events:\n{formatEvents(events)}")
+
+
+def clear():
+	global _counter, _lastDumped
+	_buffer[:] = [None] * _SIZE
+	_counter = itertools.count()
+	_lastDumped = -1
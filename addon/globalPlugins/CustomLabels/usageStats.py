@@ -0,0 +1,234 @@
+# usageStats
+# A part of Custom Labels addon for NVDA
+# The addon Allows users to assign custom labels to unlabeled controls and edit and manage them.
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Counts how often each label is used, to find and prune labels that are no longer used.
+
+# How this works:
+# recordHit() is called whenever a label is applied, by the overlay hook and in
+# browse mode. It only updates an in-memory entry for the label's key, the saved
+# fingerprint LabelStore.lookup() found it under (which may be window-scoped or
+# global): hit count, time and the version of the app. The first hit after a flush
+# schedules the next one, FLUSH_DELAY later on the main thread, so the statistics
+# file is written at most once per FLUSH_DELAY however many labels are used.
+#
+# When flushing, keys of labels that were removed since, or that came from read-only
+# sources, are dropped, and the hits are added to the statistics file,
+# stats/usage.json in the labels folder:
+# {"version": 1, "since": time, "apps": {appName: {"version": last app version seen,
+# "labels": {key string: [hits, last used time, app version when last used]}}}}
+#
+# Labels that were never used count as last used when they were created, or when
+# statistics started ("since") for labels older than that.
+
+import json
+import os
+import time
+import wx
+from logHandler import log
+
+from .labeler import getLabelsFolder
+from .labelSources import fingerprintToKeyString
+
+STATS_VERSION = 1
+# Milliseconds between the first hit after a flush and the next flush.
+FLUSH_DELAY = 5 * 60 * 1000
+
+# Label key -> [hits, last used time, app version], since the last flush
+_pending = {}
+_flushTimer = None
+# The statistics file's contents, loaded when first needed
+_stats = None
+_store = None
+
+
+def getStatsFilePath():
+	return os.path.join(getLabelsFolder(), "stats", "usage.json")
+
+
+def getArchiveFolder():
+	"""Returns the folder where pruned labels are archived as label packs."""
+	return os.path.join(getLabelsFolder(), "archive")
+
+
+def initialize(store):
+	global _store
+	_store = store
+
+
+def terminate():
+	global _flushTimer, _store
+	if _flushTimer is not None:
+		_flushTimer.Stop()
+		_flushTimer = None
+	flush()
+	_store = None
+
+
+def getAppVersion(obj):
+	"""Return the version of obj's application, or None."""
+	try:
+		return obj.appModule.productVersion or None
+	except Exception:
+		return None
+
+
+def recordHit(fingerprint, appVersion=None):
+	"""Count a use of a label, given by the key LabelStore.lookup() returned with it."""
+	entry = _pending.get(fingerprint)
+	if entry is None:
+		_pending[fingerprint] = [1, time.time(), appVersion]
+		if _flushTimer is None:
+			_scheduleFlush()
+	else:
+		entry[0] += 1
+		entry[1] = time.time()
+		if appVersion:
+			entry[2] = appVersion
+
+
+def noteLabelChanged(appName, fingerprint, label):
+	"""Called for each change of the store's labels, as its labelChanged notification."""
+	# A new or edited label counts as used now, so it is not pruned before it had a chance.
+	if fingerprint is not None and label is not None:
+		entry = _pending.get(fingerprint)
+		if entry is None:
+			_pending[fingerprint] = [0, time.time(), None]
+			if _flushTimer is None:
+				_scheduleFlush()
+		else:
+			entry[1] = time.time()
+
+
+def _scheduleFlush():
+	global _flushTimer
+	try:
+		_flushTimer = wx.CallLater(FLUSH_DELAY, _onFlushTimer)
+	except Exception:
+		log.debugWarning("CustomLabels: could not schedule usage statistics flush", exc_info=True)
+
+
+def _onFlushTimer():
+	global _flushTimer
+	_flushTimer = None
+	flush()
+
+
+def _load():
+	global _stats
+	if _stats is not None:
+		return _stats
+	_stats = {"version": STATS_VERSION, "since": time.time(), "apps": {}}
+	filePath = getStatsFilePath()
+	if os.path.exists(filePath):
+		try:
+			with open(filePath, "r", encoding="utf-8") as f:
+				data = json.load(f)
+			if data.get("version") == STATS_VERSION:
+				_stats = data
+		except Exception:
+			log.error("CustomLabels: failed to load usage statistics", exc_info=True)
+	return _stats
+
+
+def _save():
+	filePath = getStatsFilePath()
+	try:
+		os.makedirs(os.path.dirname(filePath), exist_ok=True)
+		with open(filePath, "w", encoding="utf-8") as f:
+			json.dump(_stats, f, ensure_ascii=False)
+	except Exception:
+		log.error("CustomLabels: failed to save usage statistics", exc_info=True)
+
+
+def flush():
+	"""Add the hits recorded since the last flush to the statistics file."""
+	global _pending
+	if not _pending or _store is None:
+		return
+	pending = _pending
+	_pending = {}
+	stats = _load()
+	apps = stats["apps"]
+	for fingerprint, (hits, lastUsed, appVersion) in pending.items():
+		key = _store.getLabelKey(fingerprint)
+		if key is None:
+			# A label from a read-only source, or removed since.
+			continue
+		appName = dict(key).get("app", "unknown")
+		app = apps.setdefault(appName, {"version": None, "labels": {}})
+		keyString = fingerprintToKeyString(key)
+		entry = app["labels"].get(keyString)
+		if entry is None:
+			app["labels"][keyString] = [hits, lastUsed, appVersion]
+		else:
+			entry[0] += hits
+			entry[1] = max(entry[1], lastUsed)
+			if appVersion:
+				entry[2] = appVersion
+		if appVersion:
+			app["version"] = appVersion
+	_save()
+
+
+def findUnusedLabels(store, days=None, sinceAppUpdate=False, now=None):
+	"""Return {appName: {fingerprint: label}} of the user's labels that are no longer used.
+
+	A label is unused if it was not used for days days, or, with sinceAppUpdate,
+	if it was not used with the latest version of its app that was seen.
+	"""
+	flush()
+	stats = _load()
+	now = time.time() if now is None else now
+	cutoff = now - days * 86400 if days is not None else None
+	unused = {}
+	allLabels = store.getAllByApp()
+	# Forget the statistics of labels removed since.
+	for appName in list(stats["apps"]):
+		if not allLabels.get(appName):
+			del stats["apps"][appName]
+	for appName, labels in allLabels.items():
+		app = stats["apps"].get(appName, {})
+		appLabels = app.get("labels", {})
+		currentVersion = app.get("version")
+		keyStrings = set()
+		for fingerprint, label in labels.items():
+			keyString = fingerprintToKeyString(fingerprint)
+			keyStrings.add(keyString)
+			entry = appLabels.get(keyString)
+			lastUsed = entry[1] if entry else stats["since"]
+			lastVersion = entry[2] if entry else None
+			if (
+				(cutoff is not None and lastUsed < cutoff)
+				or (sinceAppUpdate and currentVersion and lastVersion != currentVersion)
+			):
+				unused.setdefault(appName, {})[fingerprint] = label
+		for keyString in set(appLabels) - keyStrings:
+			del appLabels[keyString]
+	return unused
+
+
+def pruneLabels(store, labelsByApp, archive=True):
+	"""Remove labels, given as {appName: {fingerprint: label}}, archiving them first.
+
+	Returns (number removed, path of the archive or None).
+	"""
+	archivePath = None
+	if archive and labelsByApp:
+		from .labelPacks import exportPack
+		folder = getArchiveFolder()
+		os.makedirs(folder, exist_ok=True)
+		archivePath = os.path.join(folder, time.strftime("unused-%Y%m%d-%H%M%S.zip"))
+		exportPack(archivePath, store, labelsByApp=labelsByApp)
+	fingerprints = [fp for labels in labelsByApp.values() for fp in labels]
+	removed = store.removeMany(fingerprints)
+	stats = _load()
+	for appName, labels in labelsByApp.items():
+		appLabels = stats["apps"].get(appName, {}).get("labels", {})
+		for fingerprint in labels:
+			appLabels.pop(fingerprintToKeyString(fingerprint), None)
+	_save()
+	log.debug(f"CustomLabels: pruned {removed} unused labels, archive {archivePath}")
+	return removed, archivePath
@@ -25,18 +25,51 @@
 # character stop speaks the label; the remaining internal offsets are silent.
 #
 # A per-interceptor cache keyed on (docHandle, ID) -> label|None avoids
-# re-fingerprinting the same object on every arrow key press.
+# re-fingerprinting the same object on every arrow key press, and another keeps the
+# first offsets of labeled controls. Identifiers change between loads of a document;
+# resolutionCache remembers, across loads and sessions, which nodes of a document
+# have no label.
+#
+# Pages that update in place are followed without dropping the whole cache:
+# nameChange and reorder events only note the changed node. When the buffer's
+# _handleUpdate runs, once it holds the new content however many events came, the
+# entries of each changed subtree are dropped, read once, and the offsets after the
+# first change, which shift. An update reads at most MAX_PENDING_NODES subtrees of at
+# most MAX_SUBTREE_LENGTH characters; past that, the document's entries are all
+# dropped instead, and found again as it is read.
+#
+# Most ranges contain no labeled control. They are detected with a pass over the
+# FieldCommand items alone and returned as NVDA built them; otherwise the items of
+# the labeled controls are replaced in the same list.
+# Most documents have none either: those of an app without labels in any scope are
+# known unlabeled until labels change, and their ranges are returned without a pass.
 
 import api
 import textInfos
 import treeInterceptorHandler
 from logHandler import log
 
-from .fingerPrintReader import getObjectFingerprint
-from .labeler import getLabel
+from .fingerPrintReader import getObjectFingerprint, getObjectWindow
+from .labeler import labelStore
+from .trace import dumpOnError, trace
+from . import recorder
+from . import resolutionCache
+from . import usageStats
+
 
+_MISSING = object()
+# Noted for a document instead of its changed nodes when there are too many of them
+_MANY_CHANGES = object()
 
-# id(treeInterceptor) -> {(docHandle, ID): label or None}
+# Changed nodes noted per document until its buffer updates
+MAX_PENDING_NODES = 20
+# Changed subtrees with more text than this are not read: the document's entries are dropped.
+MAX_SUBTREE_LENGTH = 20000
+
+# Called by filter() in C for each command list item, so text items cost no Python code.
+_isFieldCommand = textInfos.FieldCommand.__instancecheck__
+
+# id(treeInterceptor) -> {_fieldKey(): label or None}
 _interceptorCaches: dict = {}
 
 # id(treeInterceptor) -> (TextInfoClass, original__getFieldsInRange)
@@ -45,21 +78,69 @@ _patches: dict = {}
 # id(treeInterceptor) -> treeInterceptor
 _activeInterceptors: dict = {}
 
+# id(treeInterceptor) -> node states from resolutionCache, for documents it can identify
+_documentNodes: dict = {}
+
+# id(treeInterceptor) -> {_fieldKey(): first buffer offset of the labeled control's text}
+_offsetCaches: dict = {}
 
-def _lookupLabel(treeInterceptor, tiId, docHandle, ID):
+# id(treeInterceptor) -> {(docHandle, ID)} of the nodes changed since the buffer last updated,
+# or _MANY_CHANGES
+_pendingUpdates: dict = {}
+
+# id(treeInterceptor) of the documents whose _handleUpdate is wrapped
+_hookedUpdates: set = set()
+
+# id(treeInterceptor) -> whether labels may match in the document. Emptied when labels change.
+_documentsWithLabels: dict = {}
+
+
+def _fieldKey(field):
+	"""Return the cache key of a controlStart field: its identifier as the buffer gives it.
+
+	The values are not converted to int here, so that the pass over a range that
+	finds nothing labeled costs only dictionary lookups.
+	"""
+	return (field.get("controlIdentifier_docHandle"), field.get("controlIdentifier_ID"))
+
+
+def _parseFieldKey(cacheKey):
+	"""Return the (docHandle, ID) ints of a cache key, or None if it has none."""
+	try:
+		return (int(cacheKey[0]), int(cacheKey[1]))
+	except (ValueError, TypeError):
+		return None
+
+
+def _lookupLabel(treeInterceptor, tiId, cacheKey, field, parentName):
 	"""Look up the custom label for a buffer node, using the per-interceptor cache.
 
-	Returns the label string if one exists, or None.
-	Populates the cache on first access for each (docHandle, ID) pair.
+	cacheKey is from _fieldKey(field), and parentName the name of the control the
+	node is in, if any. Returns the label string if one exists, or None.
+	Populates the cache on first access for each (docHandle, ID) pair. Nodes that
+	resolutionCache knows to be unlabeled from earlier visits are not fingerprinted.
 	"""
 	cache = _interceptorCaches.get(tiId)
 	if cache is None:
 		return None
 
-	cacheKey = (docHandle, ID)
 	if cacheKey in cache:
 		return cache[cacheKey]
 
+	identifier = _parseFieldKey(cacheKey)
+	if identifier is None:
+		cache[cacheKey] = None
+		return None
+	docHandle, ID = identifier
+
+	nodes = _documentNodes.get(tiId)
+	nodeKey = None
+	if nodes is not None:
+		nodeKey = resolutionCache.getNodeKey(field, parentName)
+		if resolutionCache.isKnownUnlabeled(nodes, nodeKey):
+			cache[cacheKey] = None
+			return None
+
 	# Cache miss — reconstruct NVDAObject and fingerprint it
 	try:
 		obj = treeInterceptor.getNVDAObjectFromIdentifier(docHandle, ID)
@@ -71,19 +152,130 @@ def _lookupLabel(treeInterceptor, tiId, docHandle, ID):
 		cache[cacheKey] = None
 		return None
 
+	fp = key = label = None
 	try:
 		fp = getObjectFingerprint(obj)
-		label = getLabel(fp) if fp else None
+		if fp:
+			label, key = labelStore.lookup(fp, lambda: getObjectWindow(obj))
 	except Exception:
 		log.debugWarning("CustomLabels: error fingerprinting browse mode object", exc_info=True)
+		dumpOnError("a browse mode fingerprint error")
 		label = None
 
 	cache[cacheKey] = label
+	if nodeKey is not None and fp:
+		resolutionCache.record(nodes, nodeKey, bool(label))
 	if label:
-		log.debug(f"CustomLabels [browse]: cached label '{label}' for node ({docHandle}, {ID})")
+		trace("browseLabel", label, docHandle, ID)
+		usageStats.recordHit(key, usageStats.getAppVersion(obj))
 	return label
 
 
+def _documentMayHaveLabels(treeInterceptor):
+	"""Return False if the app of a document has no labels in any scope."""
+	try:
+		appName = treeInterceptor.rootNVDAObject.appModule.appName
+	except Exception:
+		# Read as any document, control by control.
+		return True
+	return labelStore.mayHaveLabels(appName)
+
+
+def _hasLabeledControl(treeInterceptor, tiId, cache, commandList):
+	"""Return whether any control starting in commandList has a custom label.
+
+	Only the FieldCommand items are visited: the text items, most of the list, are
+	skipped by filter() without running any Python code for them.
+	"""
+	# Names of the controls the current item is in, for resolutionCache's node keys
+	parentNames = []
+	for item in filter(_isFieldCommand, commandList):
+		command = item.command
+		if command == "controlEnd":
+			if parentNames:
+				parentNames.pop()
+			continue
+		if command != "controlStart":
+			continue
+		field = item.field
+		if not field:
+			parentNames.append(None)
+			continue
+		# _fieldKey(field), inlined.
+		cacheKey = (field.get("controlIdentifier_docHandle"), field.get("controlIdentifier_ID"))
+		label = cache.get(cacheKey, _MISSING)
+		if label is _MISSING:
+			parentName = parentNames[-1] if parentNames else None
+			label = _lookupLabel(treeInterceptor, tiId, cacheKey, field, parentName)
+		if label:
+			return True
+		parentNames.append(field.get("name"))
+	return False
+
+
+def _applyLabels(textInfo, treeInterceptor, tiId, start, commandList):
+	"""Replace, in place, the text of the labeled controls in commandList.
+
+	The buffer offset of a text item is only needed inside a labeled control, so
+	lengths are summed from the last known offset when such an item is reached,
+	instead of for every item.
+	"""
+	offsets = _offsetCaches.get(tiId)
+	# labelStack entries, one per controlStart met, as _hasLabeledControl keeps its names:
+	# [label or None, first buffer offset of the control's text or None, the control's name]
+	labelStack = []
+	# commandList[offsetIndex] starts at buffer offset knownOffset.
+	knownOffset = start
+	offsetIndex = 0
+	for index, item in enumerate(commandList):
+		if isinstance(item, textInfos.FieldCommand):
+			command = item.command
+			if command == "controlStart" and item.field:
+				label = None
+				controlTextStart = None
+				cacheKey = _fieldKey(item.field)
+				parentName = labelStack[-1][2] if labelStack else None
+				label = _lookupLabel(treeInterceptor, tiId, cacheKey, item.field, parentName)
+				if label:
+					controlTextStart = offsets.get(cacheKey) if offsets is not None else None
+					if controlTextStart is None:
+						# Get the full offset range for this control in the buffer.
+						# This tells us where its text content begins.
+						try:
+							controlTextStart, _ = textInfo._getOffsetsFromFieldIdentifier(*_parseFieldKey(cacheKey))
+						except (LookupError, ValueError):
+							controlTextStart = None
+						else:
+							if offsets is not None:
+								offsets[cacheKey] = controlTextStart
+				labelStack.append([label, controlTextStart, item.field.get("name")])
+			elif command == "controlStart":
+				# No field: its text is the enclosing control's, but it has no name.
+				labelStack.append(labelStack[-1][:2] + [None] if labelStack else [None, None, None])
+			elif command == "controlEnd" and labelStack:
+				labelStack.pop()
+		elif isinstance(item, str) and labelStack:
+			entry = labelStack[-1]
+			if not entry[0] or entry[1] is None:
+				continue
+			for position in range(offsetIndex, index):
+				previous = commandList[position]
+				if isinstance(previous, str):
+					knownOffset += len(previous)
+			if knownOffset == entry[1]:
+				# First character stop of this control: speak the full label.
+				commandList[index] = entry[0]
+				# Neutralise so inner nested text is not also replaced.
+				entry[0] = None
+			else:
+				# Subsequent character stops within the same control: silence.
+				commandList[index] = ""
+			# The replacement still stands for the original text's buffer offsets.
+			knownOffset += len(item)
+			offsetIndex = index + 1
+	return commandList
+
+
 def _makeGetFieldsInRange(originalMethod, treeInterceptor):
 	"""Return a patched _getFieldsInRange that replaces buffer text for labeled controls.
 
@@ -96,6 +288,12 @@ def _makeGetFieldsInRange(originalMethod, treeInterceptor):
 	This makes character-by-character and word-by-word navigation work correctly:
 	the first character stop inside a labeled control speaks the full label, and
 	subsequent stops within the same control are silent (like embedded objects).
+
+	Most ranges contain no labeled control; for those the list built by the original
+	method is returned as it is, after a pass over its FieldCommand items only, or
+	without one in a document known to have none.
+	Otherwise the affected items are replaced in the same list: NVDA builds a new
+	list for every call, so nothing else holds it.
 	"""
 	tiId = id(treeInterceptor)
 
@@ -106,77 +304,176 @@ def _makeGetFieldsInRange(originalMethod, treeInterceptor):
 		if treeInterceptor.passThrough:
 			return commandList
 
-		# labelStack entries: (label_or_None, controlStart_offset)
-		# controlStart_offset is the first buffer offset of the control's text content.
-		# We use it to decide whether to emit the full label or silence.
-		labelStack = []
-		result = []
-		# Track the running buffer offset so we know where each text string sits.
-		currentOffset = start
-
-		for item in commandList:
-			if isinstance(item, textInfos.FieldCommand):
-				field = item.field
-				if item.command == "controlStart" and field:
-					docHandleStr = field.get("controlIdentifier_docHandle")
-					IDStr = field.get("controlIdentifier_ID")
-					label = None
-					controlTextStart = None
-					if docHandleStr is not None and IDStr is not None:
-						try:
-							docHandle = int(docHandleStr)
-							ID = int(IDStr)
-							label = _lookupLabel(treeInterceptor, tiId, docHandle, ID)
-							if label:
-								# Get the full offset range for this control in the buffer.
-								# This tells us where its text content begins.
-								try:
-									controlTextStart, _ = self._getOffsetsFromFieldIdentifier(
-										docHandle, ID
-									)
-								except (LookupError, ValueError):
-									controlTextStart = None
-						except (ValueError, TypeError):
-							pass
-					labelStack.append((label, controlTextStart))
-					result.append(item)
-
-				elif item.command == "controlEnd":
-					if labelStack:
-						labelStack.pop()
-					result.append(item)
-				else:
-					result.append(item)
-
-			elif isinstance(item, str):
-				replaced = False
-				if labelStack:
-					label, controlTextStart = labelStack[-1]
-					if label and controlTextStart is not None:
-						if currentOffset == controlTextStart:
-							# First character stop of this control: speak the full label.
-							result.append(label)
-							# Consume the same number of buffer offsets as the original text.
-							currentOffset += len(item)
-							# Neutralise so inner nested text is not also replaced.
-							labelStack[-1] = (None, controlTextStart)
-							replaced = True
-						else:
-							# Subsequent character stops within the same control: silence.
-							result.append("")
-							currentOffset += len(item)
-							replaced = True
-				if not replaced:
-					result.append(item)
-					currentOffset += len(item)
-			else:
-				result.append(item)
+		if recorder.active:
+			recorder.recordFields(self, treeInterceptor, start, end, commandList)
 
-		return result
+		# Taken first: what is learned from labels replaced meanwhile goes into the dropped dict.
+		documentsWithLabels = _documentsWithLabels
+		hasLabels = documentsWithLabels.get(tiId)
+		if hasLabels is None:
+			hasLabels = documentsWithLabels[tiId] = _documentMayHaveLabels(treeInterceptor)
+		if not hasLabels:
+			return commandList
+		cache = _interceptorCaches.get(tiId)
+		if cache is None or not _hasLabeledControl(treeInterceptor, tiId, cache, commandList):
+			return commandList
+		return _applyLabels(self, treeInterceptor, tiId, start, commandList)
 
 	return _patchedGetFieldsInRange
 
 
+# Dynamic content
+
+def _getSubtree(treeInterceptor, tiId, docHandle, ID):
+	"""Return the first buffer offset of a node and the _fieldKey() of every control in its subtree.
+
+	The subtree is read from the buffer as it is now, with the original
+	_getFieldsInRange. Its controls include the node's ancestors, which enclose
+	the range. The keys are None if the subtree holds more than MAX_SUBTREE_LENGTH
+	characters, and it is not read. Returns None if the node is no longer in the buffer.
+	"""
+	TextInfoClass, origGetFields = _patches[tiId]
+	try:
+		textInfo = treeInterceptor.makeTextInfo(textInfos.POSITION_FIRST)
+		start, end = textInfo._getOffsetsFromFieldIdentifier(docHandle, ID)
+		if end - start > MAX_SUBTREE_LENGTH:
+			return start, None
+		commandList = origGetFields(textInfo, start, end)
+	except Exception:
+		return None
+	keys = [
+		_fieldKey(item.field)
+		for item in filter(_isFieldCommand, commandList)
+		if item.command == "controlStart" and item.field
+	]
+	return start, keys
+
+
+def _invalidateSubtree(treeInterceptor, tiId, docHandle, ID):
+	"""Forget the labels of the controls in a node's subtree. Returns the node's first offset or None.
+
+	The labels of the whole document are forgotten if the subtree is too large to read.
+	"""
+	subtree = _getSubtree(treeInterceptor, tiId, docHandle, ID)
+	if subtree is None:
+		return None
+	start, keys = subtree
+	cache = _interceptorCaches.get(tiId)
+	offsets = _offsetCaches.get(tiId)
+	if keys is None:
+		if cache is not None:
+			cache.clear()
+		return start
+	for cacheKey in keys:
+		if cache is not None:
+			cache.pop(cacheKey, None)
+		if offsets is not None:
+			offsets.pop(cacheKey, None)
+	return start
+
+
+def handleNodeChange(obj):
+	"""Note that the name or children of an object changed, to forget what is cached about its subtree.
+
+	Called by the global plugin for nameChange and reorder events. A child's
+	fingerprint includes its parent's name, so the whole subtree is dropped, not
+	only the object. That is done once the buffer has updated, when it holds the
+	new content, for all the events since; documents whose updates are not known
+	drop it at once.
+	"""
+	if not _patches:
+		return
+	treeInterceptor = getattr(obj, "treeInterceptor", None)
+	if treeInterceptor is None:
+		return
+	tiId = id(treeInterceptor)
+	if tiId not in _patches or treeInterceptor.passThrough:
+		return
+	pending = _pendingUpdates.get(tiId)
+	if pending is _MANY_CHANGES:
+		return
+	try:
+		docHandle, ID = treeInterceptor.getIdentifierFromNVDAObject(obj)
+	except Exception:
+		return
+	if tiId not in _hookedUpdates:
+		_invalidateSubtree(treeInterceptor, tiId, docHandle, ID)
+		return
+	if pending is None:
+		pending = _pendingUpdates[tiId] = set()
+	elif len(pending) >= MAX_PENDING_NODES and (docHandle, ID) not in pending:
+		_pendingUpdates[tiId] = _MANY_CHANGES
+		return
+	pending.add((docHandle, ID))
+
+
+def _onBufferUpdated(treeInterceptor, tiId):
+	"""Drop the cached entries a buffer update may have made stale.
+
+	Labels are dropped for the changed subtrees reported by handleNodeChange(),
+	or for the whole document when there were too many. Offsets shift for every
+	control after a change, so cached offsets are dropped from the first changed
+	subtree on, or all of them when the change is unknown.
+	"""
+	if tiId not in _patches:
+		return
+	pending = _pendingUpdates.pop(tiId, None)
+	offsets = _offsetCaches.get(tiId)
+	firstChange = None
+	if pending is _MANY_CHANGES:
+		cache = _interceptorCaches.get(tiId)
+		if cache is not None:
+			cache.clear()
+		firstChange = 0
+	elif pending:
+		for docHandle, ID in pending:
+			start = _invalidateSubtree(treeInterceptor, tiId, docHandle, ID)
+			if start is None:
+				# Removed from the buffer: where the change was is unknown.
+				firstChange = 0
+			elif firstChange is None or start < firstChange:
+				firstChange = start
+	if not offsets:
+		return
+	if firstChange is None or firstChange == 0:
+		offsets.clear()
+		return
+	for cacheKey, controlTextStart in list(offsets.items()):
+		if controlTextStart >= firstChange:
+			del offsets[cacheKey]
+
+
+def _patchHandleUpdate(treeInterceptor):
+	"""Wrap the buffer's update handler on the instance, to learn when its content changed."""
+	originalMethod = getattr(treeInterceptor, "_handleUpdate", None)
+	if originalMethod is None:
+		return
+	tiId = id(treeInterceptor)
+
+	def _patchedHandleUpdate(*args, **kwargs):
+		result = originalMethod(*args, **kwargs)
+		try:
+			_onBufferUpdated(treeInterceptor, tiId)
+		except Exception:
+			log.debugWarning("CustomLabels: error updating browse mode caches", exc_info=True)
+		return result
+
+	try:
+		treeInterceptor._handleUpdate = _patchedHandleUpdate
+	except Exception:
+		log.debugWarning("CustomLabels: could not hook browse mode buffer updates", exc_info=True)
+		return
+	_hookedUpdates.add(tiId)
+
+
+def _unpatchHandleUpdate(treeInterceptor):
+	_hookedUpdates.discard(id(treeInterceptor))
+	try:
+		vars(treeInterceptor).pop("_handleUpdate", None)
+	except TypeError:
+		pass
+
+
 def _getTextInfoClass(treeInterceptor):
 	"""Return the TextInfo class used by this TreeInterceptor, or None."""
 	TextInfoClass = getattr(type(treeInterceptor), "TextInfo", None)
@@ -209,8 +506,13 @@ def _patchInterceptor(treeInterceptor):
 		return
 
 	_interceptorCaches[tiId] = {}
+	_offsetCaches[tiId] = {}
 	_patches[tiId] = (TextInfoClass, origGetFields)
 	_activeInterceptors[tiId] = treeInterceptor
+	_patchHandleUpdate(treeInterceptor)
+	documentKey = resolutionCache.getDocumentKey(treeInterceptor)
+	if documentKey is not None:
+		_documentNodes[tiId] = resolutionCache.openDocument(documentKey)
 
 	TextInfoClass._getFieldsInRange = _makeGetFieldsInRange(origGetFields, treeInterceptor)
 	log.debug(f"CustomLabels: browse mode patch applied for {type(treeInterceptor).__name__}")
@@ -221,7 +523,14 @@ def _unpatchInterceptor(treeInterceptor):
 	tiId = id(treeInterceptor)
 	patch = _patches.pop(tiId, None)
 	_interceptorCaches.pop(tiId, None)
+	_offsetCaches.pop(tiId, None)
+	_pendingUpdates.pop(tiId, None)
+	_documentsWithLabels.pop(tiId, None)
 	_activeInterceptors.pop(tiId, None)
+	_unpatchHandleUpdate(treeInterceptor)
+	nodes = _documentNodes.pop(tiId, None)
+	if nodes is not None:
+		resolutionCache.closeDocument(nodes)
 	if patch is None:
 		return
 	TextInfoClass, origGetFields = patch
@@ -255,9 +564,17 @@ def terminate():
 	treeInterceptorHandler.post_browseModeStateChange.unregister(_onBrowseModeStateChange)
 	for tiId, (TextInfoClass, origGetFields) in list(_patches.items()):
 		TextInfoClass._getFieldsInRange = origGetFields
+	for treeInterceptor in _activeInterceptors.values():
+		_unpatchHandleUpdate(treeInterceptor)
 	_patches.clear()
 	_interceptorCaches.clear()
+	_offsetCaches.clear()
+	_pendingUpdates.clear()
+	_hookedUpdates.clear()
+	_documentsWithLabels.clear()
 	_activeInterceptors.clear()
+	_documentNodes.clear()
+	resolutionCache.save()
 	log.debug("CustomLabels: virtualBufferSupport terminated")
 
 
@@ -275,5 +592,19 @@ def ensurePatched(treeInterceptor):
 
 
 def invalidateCacheForLabel(_fingerprint):
-	"""Clear all browse mode label caches after a label is set or removed."""
-	_interceptorCaches.clear()
+	"""Clear all browse mode label caches after a label is set or removed.
+
+	The caches are emptied rather than dropped: patched documents stay patched, and
+	a document without a cache would no longer show labels.
+	"""
+	global _documentsWithLabels
+	# Labels may change on another thread, while documents are added: iterate over copies.
+	for cache in list(_interceptorCaches.values()):
+		cache.clear()
+	# Open documents may hold node states that resolutionCache has since dropped.
+	for nodes in list(_documentNodes.values()):
+		nodes.clear()
+	# Replaced rather than emptied, as labels may change on another thread while a
+	# document is being checked. Checked again at the next read of each document.
+	_documentsWithLabels = {}
+	resolutionCache.invalidate()
@@ -75,7 +75,18 @@ i18nSources: list[str] = pythonSources + ["buildVars.py"]
 # Paths are relative to the addon directory, not to the root directory of your addon sources.
 # You can either list every file (using ""/") as a path separator,
 # or use glob expressions.
-excludedFiles: list[str] = []
+# Translation sources and Markdown documentation are not needed at runtime,
+# as NVDA uses the compiled .mo files and the generated HTML.
+excludedFiles: list[str] = [
+	"locale/*/LC_MESSAGES/*.po",
+	"doc/*/*.md",
+]
+
+# Python version ("major.minor") of the NVDA versions the add-on is mostly used with.
+# Building with `scons bytecode=1` includes precompiled bytecode, which saves compiling the add-on
+# when NVDA first loads it, and on every start where its folder cannot be written.
+# It is only included when building with this Python version; other versions ignore it.
+bytecodePythonVersion: str = "3.13"
 
 # Base language for the NVDA add-on
 # If your add-on is written in a language other than english, modify this variable.
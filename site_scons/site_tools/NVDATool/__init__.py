@@ -4,6 +4,8 @@ This tool generates NVDA extensions.
 Builders:
 
 - NVDAAddon: Creates a .nvda-addon zip file. Requires the `excludePatterns` environment variable.
+  With the `bytecode` environment variable, hash-checked bytecode is included,
+  if the build's Python matches `bytecodePythonVersion`.
 - NVDAManifest: Creates the manifest.ini file.
 - NVDATranslatedManifest: Creates the manifest.ini file with only translated information.
 - md2html: Build HTML from Markdown
@@ -31,15 +33,20 @@ from .docs import md2html
 
 def generate(env: Environment):
 	env.SetDefault(excludePatterns=tuple())
+	env.SetDefault(bytecode=False)
+	env.SetDefault(bytecodePythonVersion=None)
 
 	addonAction = env.Action(
 		lambda target, source, env: createAddonBundleFromPath(
 			source[0].abspath,
 			target[0].abspath,
 			env["excludePatterns"],
+			bytecode=env["bytecode"],
+			bytecodePythonVersion=env["bytecodePythonVersion"],
 		)
 		and None,
 		lambda target, source, env: f"Generating Addon {target[0]}",
+		varlist=["excludePatterns", "bytecode", "bytecodePythonVersion"],
 	)
 	env["BUILDERS"]["NVDAAddon"] = Builder(
 		action=addonAction,
@@ -0,0 +1,165 @@
+# corpus
+# A part of Custom Labels addon for NVDA
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Synthetic, deterministic inputs for the benchmarks.
+
+import json
+import os
+import random
+
+_ROLES = ("BUTTON", "CHECKBOX", "EDITABLETEXT", "COMBOBOX", "MENUITEM", "TAB")
+
+
+def makeObjectDesc(index, kind, appName="app", parentDepth=1):
+	"""Return the description of a control, in offline.makeObject() format.
+
+	Every other control has no automation id or control id, so that weak
+	fingerprints and disambiguation are part of the measurement.
+	"""
+	rng = random.Random(index)
+	desc = {
+		"kind": kind,
+		"appName": appName,
+		"roleName": _ROLES[index % len(_ROLES)],
+		"name": f"Control {index}" if index % 3 else "",
+		"description": f"Does thing {index}" if index % 4 == 0 else "",
+		"windowClassName": "Chrome_RenderWidgetHostHWND" if kind == "IA2" and index % 5 == 0 else "AppWindowClass",
+		"windowControlID": (index % 2) * (1000 + index),
+		"windowHandle": 0x10000 + index % 97,
+		"indexInParent": index % 40,
+		"event_objectID": -4,
+		"event_childID": index,
+	}
+	if kind == "UIA":
+		automationId = f"auto{index}" if index % 2 else ""
+		desc["uia"] = {
+			"currentAutomationId": automationId,
+			"cachedAutomationId": automationId,
+			"currentFrameworkId": "Chrome" if index % 7 == 0 else "WPF",
+			"currentAriaProperties": f"label=Control {index}" if index % 14 == 0 else "",
+			"currentAriaRole": "button" if index % 14 == 0 else "",
+		}
+	elif kind == "JAB":
+		desc["jab"] = {"name": desc["name"], "description": desc["description"]}
+	if parentDepth > 0:
+		parent = makeObjectDesc(rng.randrange(50), kind, appName, parentDepth - 1)
+		parent["roleName"] = "PANE"
+		parent["name"] = f"Panel {index % 50}"
+		if kind == "JAB" and index % 10 == 0:
+			# A top-level Java control, in a native window.
+			parent["kind"] = "IA2"
+			parent["roleName"] = "WINDOW"
+			del parent["jab"]
+		elif kind == "JAB":
+			parent["jab"] = {"name": parent["name"], "description": parent["description"]}
+		desc["parent"] = parent
+	return desc
+
+
+def makeRowDesc(index, appName="app", listName="Messages"):
+	"""Return the description of an item of a large list, with its list as parent."""
+	return {
+		"kind": "IA2",
+		"appName": appName,
+		"roleName": "LISTITEM",
+		"name": f"Item {index}" if index % 10 else "",
+		"windowClassName": "SysListView32",
+		"windowControlID": 0,
+		"windowHandle": 0x20000,
+		"positionInfo": {"indexInGroup": index + 1, "similarItemsInGroup": 50000},
+		"event_objectID": -4,
+		"event_childID": index + 1,
+		"parent": {
+			"kind": "IA2",
+			"appName": appName,
+			"roleName": "LIST",
+			"name": listName,
+			"windowClassName": "SysListView32",
+			"windowControlID": 1001,
+			"windowHandle": 0x20000,
+		},
+	}
+
+
+def makeFingerprint(index, appName="app"):
+	"""Return a fingerprint in the current format, as built for an IA2 control."""
+	return tuple(sorted((
+		("app", appName),
+		("backend", "IA2"),
+		("description", ""),
+		("name", f"Control {index}"),
+		("parentName", f"Panel {index % 50}"),
+		("role", 9),
+		("windowClassName", "AppWindowClass"),
+		("windowControlID", 1000 + index),
+	)))
+
+
+def makeLabels(count, appName="app"):
+	return {makeFingerprint(i, appName): f"Label {i}" for i in range(count)}
+
+
+def makeOldKeyStrings(count):
+	"""Return key strings in older fingerprint formats, which need migration when loaded.
+
+	A third lack description and parentName, a third carry obsolete fields, and a
+	third are Chromium fingerprints with the windowControlID that is now dropped.
+	"""
+	keys = []
+	for i in range(count):
+		items = [["app", "app"], ["role", 9], ["name", f"Control {i}"], ["windowClassName", "AppWindowClass"]]
+		if i % 3 == 0:
+			items.append(["windowControlID", 1000 + i])
+		elif i % 3 == 1:
+			items += [["description", ""], ["parentName", "Panel"], ["ia2Class", "x"], ["parentDesc", ""]]
+		else:
+			items[3] = ["windowClassName", "Chrome_RenderWidgetHostHWND"]
+			items += [["description", ""], ["parentName", ""], ["windowControlID", 5000 + i]]
+		keys.append(json.dumps(items, ensure_ascii=False))
+	return keys
+
+
+def writeAppFiles(folder, appCount, labelsPerApp, store):
+	"""Write appCount app files of labelsPerApp labels each, as the store saves them."""
+	os.makedirs(folder, exist_ok=True)
+	for appIndex in range(appCount):
+		appName = f"app{appIndex}"
+		labels = {makeFingerprint(i, appName): f"Label {i}" for i in range(labelsPerApp)}
+		with open(os.path.join(folder, f"{appName}.json"), "wb") as f:
+			f.write(store.encodeAppFile(appName, labels))
+
+
+def makeCommandList(itemCount, textInfos, controlEvery=3):
+	"""Return a browse mode command list of about itemCount items, and the controls in it.
+
+	Every controlEvery-th segment is a control of three items (controlStart, text,
+	controlEnd); the others are a single text item. Returns (commands, controls) where
+	controls is a list of ((docHandle, ID), startOffset, endOffset).
+	"""
+	commands = []
+	controls = []
+	offset = 0
+	ID = 0
+	segment = 0
+	while len(commands) < itemCount:
+		segment += 1
+		if segment % controlEvery == 0:
+			ID += 1
+			text = f"button {ID}"
+			controls.append(((1, ID), offset, offset + len(text)))
+			commands.append(textInfos.FieldCommand("controlStart", textInfos.ControlField({
+				"controlIdentifier_docHandle": "1",
+				"controlIdentifier_ID": str(ID),
+				"role": 9,
+				"name": text,
+				"IAccessible2::attribute_tag": "button",
+			})))
+			commands.append(text)
+			commands.append(textInfos.FieldCommand("controlEnd", None))
+		else:
+			text = f"paragraph text {len(commands)} "
+			commands.append(text)
+		offset += len(text)
+	return commands, controls
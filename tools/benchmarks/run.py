@@ -0,0 +1,805 @@
+# run
+# A part of Custom Labels addon for NVDA
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Microbenchmarks for the add-on's core operations, run outside NVDA.
+#
+# Usage:
+#   python tools/benchmarks/run.py [--filter TEXT] [--output results.json]
+#       [--compare tools/benchmarks/baseline.json] [--threshold 50] [--fast-threshold 100]
+#
+# Every metric is a cost, so lower is better: times are in microseconds or
+# milliseconds per operation (the best of several repeats), and counters are
+# calls per operation, modules loaded or file sizes in kilobytes. With --compare, the run
+# fails (exit status 1) if a time is more than --threshold percent above the baseline,
+# --fast-threshold for times under FAST_TIME microseconds, or a counter is above it at all.
+#
+# Shared and throttled machines change speed from one second to the next. A fixed
+# pure Python workload is timed right before every measured run, and times are
+# compared relative to it, so that a slower machine or moment does not read as a
+# regression. Times found above the threshold are measured again, up to
+# CONFIRM_RUNS times, and only fail if every run is.
+# Browse mode reads, mostly XML parsing by expat, whose build differs between Python
+# builds, are instead timed relative to the same read without the add-on, which is
+# itself only a reference and never fails, and cold loads, mostly file reads and
+# threads, relative to reading the same files.
+# The workload does not slow down exactly as each metric does: between machines, or
+# builds of Python, times shift by up to about 40% against it, more for times of a few
+# microseconds, which are mostly interpreter overhead. Pure Python workloads resembling
+# each kind of metric (lookups, calls, parsing) did no better. The thresholds allow for
+# that, so the gate catches large regressions on any machine; to measure smaller
+# changes, make the baseline on the same machine first, from the commit compared against.
+# Baselines still depend on the Python version: regenerate baseline.json with --output
+# when it changes.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import offline  # noqa: E402
+import corpus  # noqa: E402
+
+# 2: browse mode reads and cold loads are calibrated with workloads of their own.
+RESULTS_VERSION = 2
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> (function, unit, reference); functions take the add-on package and return a value.
+# References are measured for comparing other metrics with, and never fail.
+_benchmarks = {}
+# Any other unit is a counter.
+_TIME_UNITS = ("us", "ms")
+# Times per operation, in microseconds, under which --fast-threshold applies
+FAST_TIME = 5.0
+# Times over the threshold are measured again this many times at most before failing.
+CONFIRM_RUNS = 2
+
+
+def benchmark(name, unit="us", reference=False):
+	def decorator(func):
+		_benchmarks[name] = (func, unit, reference)
+		return func
+	return decorator
+
+
+_CALIBRATION_KEYS = tuple((("app", "calibrate"), ("name", f"Control {i}"), ("role", i % 20)) for i in range(300))
+
+
+def _calibrationWork(keys=_CALIBRATION_KEYS):
+	table = {}
+	for key in keys:
+		table[key] = str(key[1][1]).lower()
+	for key in keys:
+		table.get(key)
+
+
+def _timeCalibration(work=_calibrationWork):
+	best = None
+	for _run in range(3):
+		start = time.perf_counter()
+		work()
+		elapsed = time.perf_counter() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best * 1e6
+
+
+# Calibration time, in microseconds, paired with the last time returned by bestTime().
+_lastCalibration = None
+
+
+def bestTime(func, operations, repeat=5, setup=None, calibration=None):
+	"""Return the best time per operation, in microseconds, of repeat runs of func().
+
+	func performs operations operations per call. setup, if given, is called before
+	each run, outside the measurement. The garbage collector is off while func runs,
+	as timeit does, so collections triggered by earlier benchmarks are not measured.
+
+	A calibration workload, the fixed one or the calibration function given, is timed
+	right before each run, and its best time is kept in _lastCalibration. Both bests
+	are kept apart: keeping the run fastest relative to its calibration would favour
+	runs whose calibration was slowed down, and give times too low.
+	"""
+	global _lastCalibration
+	best = bestCalibration = None
+	for _run in range(repeat):
+		if setup is not None:
+			setup()
+		gc.collect()
+		gc.disable()
+		try:
+			calibrationTime = _timeCalibration(calibration or _calibrationWork)
+			start = time.perf_counter()
+			func()
+			elapsed = time.perf_counter() - start
+		finally:
+			gc.enable()
+		if best is None or elapsed < best:
+			best = elapsed
+		if bestCalibration is None or calibrationTime < bestCalibration:
+			bestCalibration = calibrationTime
+	_lastCalibration = bestCalibration
+	return best / operations * 1e6
+
+
+# Fingerprints
+
+def _fingerprintBenchmark(kind, count=1000):
+	def run(package):
+		getObjectFingerprint = package.fingerPrintReader.getObjectFingerprint
+		objects = [offline.makeObject(corpus.makeObjectDesc(i, kind, f"fp{kind}")) for i in range(count)]
+
+		def fingerprintAll():
+			for obj in objects:
+				getObjectFingerprint(obj)
+		return bestTime(fingerprintAll, count)
+	return run
+
+
+for _kind in ("UIA", "JAB", "IA2"):
+	benchmark(f"fingerprint.{_kind}")(_fingerprintBenchmark(_kind))
+
+
+def _checkJABFields(objects, fingerprints):
+	for obj, fingerprint in zip(objects, fingerprints):
+		fields = dict(fingerprint)
+		expected = (obj.name or "", obj.description or "", obj.parent.name or "" if obj.parent else "")
+		if (fields.get("name"), fields.get("description"), fields.get("parentName")) != expected:
+			raise AssertionError(f"JAB fingerprint fields differ from the object's: {fingerprint}")
+
+
+@benchmark("fingerprint.JAB.bridgeCalls", unit="calls")
+def _jabBridgeCalls(package, count=100):
+	"""Bridge calls per JAB fingerprint, checking the fields match what the objects give NVDA.
+
+	The fields are also checked, but not counted, for objects whose bridge calls fail.
+	"""
+	getObjectFingerprint = package.fingerPrintReader.getObjectFingerprint
+	objects = [offline.makeObject(corpus.makeObjectDesc(i, "JAB", "fpJAB")) for i in range(count)]
+	before = offline._JABContext.calls
+	fingerprints = [getObjectFingerprint(obj) for obj in objects]
+	calls = offline._JABContext.calls - before
+	_checkJABFields(objects, fingerprints)
+	failing = []
+	for i in range(10):
+		desc = corpus.makeObjectDesc(i, "JAB", "fpJAB")
+		desc["jab"]["fails"] = True
+		failing.append(offline.makeObject(desc))
+	_checkJABFields(failing, [getObjectFingerprint(obj) for obj in failing])
+	return calls / count
+
+
+@benchmark("fingerprint.row.list50k")
+def _rowFingerprints(package, count=50000):
+	fingerPrintReader = package.fingerPrintReader
+	rows = [offline.makeObject(corpus.makeRowDesc(i, "rows")) for i in range(count)]
+
+	def fingerprintAll():
+		for row in rows:
+			fingerPrintReader.getObjectFingerprint(row)
+	fingerPrintReader.setRowLabelingEnabled(True)
+	try:
+		return bestTime(fingerprintAll, count)
+	finally:
+		fingerPrintReader.setRowLabelingEnabled(False)
+
+
+# Label store
+
+def _makeStore(package, size, prefix):
+	"""Return a new LabelStore holding size labels, at most 1000 per app."""
+	store = package.labeler.LabelStore()
+	perApp = min(size, 1000)
+	with store.batch():
+		for appIndex in range(max(size // perApp, 1)):
+			store.setMany(corpus.makeLabels(perApp, f"{prefix}{appIndex}").items())
+	return store
+
+
+_STORE_SIZES = {"10": 10, "1k": 1000, "100k": 100000}
+
+
+def _storeGetBenchmark(size):
+	def run(package):
+		store = _makeStore(package, size, f"get{size}-")
+		perApp = min(size, 1000)
+		keys = list(corpus.makeLabels(perApp, f"get{size}-0"))
+		# As many lookups whatever the size, so the times compare.
+		keys = (keys * (2000 // len(keys) + 1))[:2000]
+
+		def getAll():
+			for key in keys:
+				store.get(key)
+		return bestTime(getAll, len(keys))
+	return run
+
+
+def _storeSetBenchmark(size):
+	def run(package):
+		store = _makeStore(package, size, f"set{size}-")
+		perApp = min(size, 1000)
+		keys = list(corpus.makeLabels(perApp, f"set{size}-0"))[:20]
+		counter = [0]
+
+		def setAll():
+			counter[0] += 1
+			for key in keys:
+				store.set(key, f"Changed {counter[0]}")
+		return bestTime(setAll, len(keys), repeat=3)
+	return run
+
+
+for _name, _size in _STORE_SIZES.items():
+	benchmark(f"store.get.{_name}")(_storeGetBenchmark(_size))
+	benchmark(f"store.set.{_name}")(_storeSetBenchmark(_size))
+
+
+@benchmark("store.get.miss.100k")
+def _storeGetMiss(package):
+	store = _makeStore(package, 100000, "miss-")
+	keys = list(corpus.makeLabels(2000, "miss-0"))[1000:]
+
+	def getAll():
+		for key in keys:
+			store.get(key)
+	return bestTime(getAll, len(keys))
+
+
+# Seconds added to every file read by the slow benchmarks, as on a network drive
+_SLOW_DISK_LATENCY = 0.002
+
+
+def _coldLoadBenchmark(appCount, slowDisk=False, parallel=True):
+	"""Time loading appCount app files of 20 labels each into a new store.
+
+	With slowDisk, every file read waits _SLOW_DISK_LATENCY more; without parallel,
+	files are read one at a time, as before bulk loading used threads. Loads are timed
+	relative to reading and parsing the same files one at a time, as slowly, without
+	the store.
+	"""
+	def run(package):
+		import globalVars
+		labeler = package.labeler
+		labelFiles = package.labelFiles
+		previous = (globalVars.appArgs.configPath, labelFiles.readAppFileBytes, labeler.PARALLEL_LOAD_MIN_FILES)
+		globalVars.appArgs.configPath = tempfile.mkdtemp(prefix="customLabels-bench-")
+		try:
+			folder = labeler.getLabelsFolder()
+			corpus.writeAppFiles(folder, appCount, 20, labeler.labelStore)
+			filePaths = [os.path.join(folder, fileName) for fileName in sorted(os.listdir(folder))]
+
+			def readFiles():
+				for filePath in filePaths:
+					if slowDisk:
+						time.sleep(_SLOW_DISK_LATENCY)
+					with open(filePath, "rb") as f:
+						json.loads(f.read())
+			if slowDisk:
+				readAppFileBytes = labelFiles.readAppFileBytes
+
+				def slowRead(filePath):
+					time.sleep(_SLOW_DISK_LATENCY)
+					return readAppFileBytes(filePath)
+				labelFiles.readAppFileBytes = slowRead
+			if not parallel:
+				labeler.PARALLEL_LOAD_MIN_FILES = appCount + 1
+			stores = []
+
+			def newStore():
+				stores.append(labeler.LabelStore())
+
+			def load():
+				stores[-1]._loadAllApps()
+			return bestTime(load, 1, repeat=3, setup=newStore, calibration=readFiles) / 1000
+		finally:
+			globalVars.appArgs.configPath, labelFiles.readAppFileBytes, labeler.PARALLEL_LOAD_MIN_FILES = previous
+	return run
+
+
+for _count in (10, 100, 500, 1000):
+	benchmark(f"store.coldLoad.{_count}apps", unit="ms")(_coldLoadBenchmark(_count))
+benchmark("store.coldLoad.slow100", unit="ms")(_coldLoadBenchmark(100, slowDisk=True))
+benchmark("store.coldLoad.slow100.serial", unit="ms")(
+	_coldLoadBenchmark(100, slowDisk=True, parallel=False),
+)
+
+
+def _appFileBenchmarks():
+	"""Register the size and load time of an app file of 5000 labels in each file format."""
+	def encodeFormat1(package, appName, labels):
+		data = package.labeler.labelStore.dumpAppData(appName, labels)
+		# As version 1 of the add-on saved app files
+		return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+	def encodeCompact(package, appName, labels):
+		labelFiles = package.labelFiles
+		return labelFiles.encodeAppFile(labelFiles.dumpCompact(appName, labels))
+
+	def encodeCompressed(package, appName, labels):
+		labelFiles = package.labelFiles
+		return labelFiles.encodeAppFile(labelFiles.dumpCompact(appName, labels), compress=True)
+
+	def makeFile(package, encode, count=5000):
+		labels = corpus.makeLabels(count, "appFile")
+		folder = tempfile.mkdtemp(prefix="customLabels-bench-")
+		filePath = os.path.join(folder, "appFile.json")
+		with open(filePath, "wb") as f:
+			f.write(encode(package, "appFile", labels))
+		return filePath
+
+	def sizeBenchmark(encode):
+		def run(package):
+			return os.path.getsize(makeFile(package, encode)) / 1024
+		return run
+
+	def loadBenchmark(encode):
+		def run(package):
+			filePath = makeFile(package, encode)
+			store = package.labeler.LabelStore()
+			readAppFile = package.labelFiles.readAppFile
+
+			def load():
+				store.loadAppData(readAppFile(filePath))
+			return bestTime(load, 1, repeat=5) / 1000
+		return run
+
+	for name, encode in (("format1", encodeFormat1), ("compact", encodeCompact), ("gzip", encodeCompressed)):
+		benchmark(f"store.appFile.{name}.size", unit="KB")(sizeBenchmark(encode))
+		benchmark(f"store.appFile.{name}.load", unit="ms")(loadBenchmark(encode))
+
+
+_appFileBenchmarks()
+
+
+@benchmark("store.keyFromString")
+def _keyFromString(package, count=30000):
+	store = package.labeler.LabelStore()
+	keys = corpus.makeOldKeyStrings(count)
+
+	def migrateAll():
+		for key in keys:
+			store._keyFromString(key)
+	return bestTime(migrateAll, count, repeat=3)
+
+
+@benchmark("usage.recordHit")
+def _recordHit(package, count=2000):
+	recordHit = package.usageStats.recordHit
+	fingerprints = list(corpus.makeLabels(200, "usage"))
+	fingerprints = (fingerprints * (count // len(fingerprints)))[:count]
+
+	def recordAll():
+		for fingerprint in fingerprints:
+			recordHit(fingerprint, "1.0")
+	return bestTime(recordAll, count)
+
+
+# Browse mode
+# Documents parse their content from XML at every read, as NVDA does, so the add-on's
+# share of a read is measured against a realistic original _getFieldsInRange. Reads
+# are timed relative to the same read without the add-on.
+
+def _unpatchedRead(commands, end):
+	"""Return a function reading commands from a document without the add-on."""
+	document = offline.FakeDocument(markup=True)
+	# The markup is built at the first read, not timed.
+	document.getFields(0, end, commands)
+	return lambda: document.getFields(0, end, commands)
+
+
+def _makeDocument(package, controls, appName="browse", url=None):
+	document = offline.FakeDocument(url, appName, markup=True)
+	for (key, start, end) in controls:
+		index = key[1]
+		document.objects[key] = offline.makeObject(corpus.makeObjectDesc(index, "IA2", appName))
+		document.offsets[key] = (start, end)
+	package.virtualBufferSupport.ensurePatched(document)
+	return document
+
+
+def _labelDocument(package, document, every=10):
+	getObjectFingerprint = package.fingerPrintReader.getObjectFingerprint
+	labels = []
+	for key, obj in sorted(document.objects.items()):
+		if key[1] % every == 0:
+			fp = getObjectFingerprint(obj, enforceBudget=False)
+			if fp:
+				labels.append((fp, f"Browse label {key[1]}"))
+	package.labeler.labelStore.setMany(labels)
+
+
+@benchmark("browse.fields100k.cold", unit="ms")
+def _browseCold(package):
+	import textInfos
+	commands, controls = corpus.makeCommandList(100000, textInfos)
+	_labelDocument(package, _makeDocument(package, controls))
+	documents = []
+
+	def newDocument():
+		documents.append(_makeDocument(package, controls))
+
+	def read():
+		documents[-1].getFields(0, controls[-1][2], commands)
+	unpatched = _unpatchedRead(commands, controls[-1][2])
+	return bestTime(read, 1, repeat=3, setup=newDocument, calibration=unpatched) / 1000
+
+
+@benchmark("browse.fields100k.warm", unit="ms")
+def _browseWarm(package):
+	import textInfos
+	commands, controls = corpus.makeCommandList(100000, textInfos)
+	document = _makeDocument(package, controls)
+	_labelDocument(package, document)
+	document.getFields(0, controls[-1][2], commands)
+
+	def read():
+		document.getFields(0, controls[-1][2], commands)
+	return bestTime(read, 1, calibration=_unpatchedRead(commands, controls[-1][2])) / 1000
+
+
+@benchmark("browse.fields100k.revisit", unit="ms")
+def _browseRevisit(package):
+	"""A labeled page read after it was reloaded, with what an earlier visit learned."""
+	import textInfos
+	commands, controls = corpus.makeCommandList(100000, textInfos)
+	_labelDocument(package, _makeDocument(package, controls))
+	url = "https://intranet.example/app"
+	first = _makeDocument(package, controls, url=url)
+	first.getFields(0, controls[-1][2], commands)
+	package.virtualBufferSupport._unpatchInterceptor(first)
+	documents = []
+
+	def newDocument():
+		documents.append(_makeDocument(package, controls, url=url))
+
+	def read():
+		documents[-1].getFields(0, controls[-1][2], commands)
+	unpatched = _unpatchedRead(commands, controls[-1][2])
+	return bestTime(read, 1, repeat=3, setup=newDocument, calibration=unpatched) / 1000
+
+
+@benchmark("browse.fields100k.unlabeled", unit="ms")
+def _browseUnlabeled(package):
+	"""A page of an app without labels: the cost of the patch on most pages."""
+	import textInfos
+	commands, controls = corpus.makeCommandList(100000, textInfos)
+	document = _makeDocument(package, controls, "unlabeled")
+	document.getFields(0, controls[-1][2], commands)
+
+	def read():
+		document.getFields(0, controls[-1][2], commands)
+	return bestTime(read, 1, calibration=_unpatchedRead(commands, controls[-1][2])) / 1000
+
+
+@benchmark("browse.fields100k.labeledApp", unit="ms")
+def _browseLabeledApp(package):
+	"""A page with no labeled control in an app with labels, cache filled: each control is checked."""
+	import textInfos
+	commands, controls = corpus.makeCommandList(100000, textInfos)
+	package.labeler.labelStore.set(corpus.makeFingerprint(1000000, "labeledApp"), "Elsewhere")
+	document = _makeDocument(package, controls, "labeledApp")
+	document.getFields(0, controls[-1][2], commands)
+
+	def read():
+		document.getFields(0, controls[-1][2], commands)
+	return bestTime(read, 1, calibration=_unpatchedRead(commands, controls[-1][2])) / 1000
+
+
+@benchmark("browse.fields100k.unpatched", unit="ms", reference=True)
+def _browseUnpatched(package):
+	"""The same read without the add-on, for comparing with the other browse.fields100k benchmarks."""
+	import textInfos
+	commands, controls = corpus.makeCommandList(100000, textInfos)
+	return bestTime(_unpatchedRead(commands, controls[-1][2]), 1) / 1000
+
+
+def _makeNestedGroup(package, document, group, textInfos):
+	"""Add a labeled control and an unlabeled panel to a document, and return their commands.
+
+	In both, a control without a field, which cannot be looked up, comes before the
+	rest of the content. Returns (labeled control's commands, panel's commands).
+	"""
+	def control(ID, name, content):
+		document.objects[(1, ID)] = offline.makeObject(corpus.makeObjectDesc(ID, "IA2", "nested"))
+		field = textInfos.ControlField({
+			"controlIdentifier_docHandle": "1",
+			"controlIdentifier_ID": str(ID),
+			"role": 9,
+			"name": name,
+		})
+		start = textInfos.FieldCommand("controlStart", field)
+		return [start, *content, textInfos.FieldCommand("controlEnd", None)]
+
+	def unidentified(text):
+		return [
+			textInfos.FieldCommand("controlStart", textInfos.ControlField()),
+			text,
+			textInfos.FieldCommand("controlEnd", None),
+		]
+	base = group * 3 + 1
+	labeled = control(base, f"Labeled {group}", [*unidentified("x"), "rest"])
+	item = control(base + 2, f"Item {group}", ["item"])
+	panel = control(base + 1, f"Panel {group}", [*unidentified("y"), *item])
+	fingerprint = package.fingerPrintReader.getObjectFingerprint(document.objects[(1, base)])
+	package.labeler.labelStore.set(fingerprint, f"Nested label {group}")
+	return labeled, panel
+
+
+@benchmark("browse.nested.revisitFetches", unit="objects")
+def _browseNestedRevisit(package, groups=20):
+	"""Objects fetched when reading unlabeled panels again, after a first visit learned they have no label.
+
+	The first visit reads the whole page, so most controls are looked up while
+	labels are applied; the second reads each panel alone, so they are looked up
+	while checking for labeled controls. Both must give a node the same key, or the
+	second fetches and fingerprints it again. Also checks that the label of a control
+	whose text starts in a control without a field is spoken once, and its text not.
+	"""
+	import textInfos
+	url = "https://intranet.example/nested"
+	first = offline.FakeDocument(url, "nested")
+	commands = []
+	panels = []
+	textLength = 0
+	for group in range(groups):
+		labeled, panel = _makeNestedGroup(package, first, group, textInfos)
+		# Only the first offset of the labeled control's text is needed.
+		first.offsets[(1, group * 3 + 1)] = (textLength, textLength)
+		commands += labeled + panel
+		textLength += sum(len(item) for item in labeled + panel if isinstance(item, str))
+		panels.append(panel)
+	package.virtualBufferSupport.ensurePatched(first)
+	result = first.getFields(0, 0, commands)
+	texts = [item for item in result if isinstance(item, str)]
+	expected = [text for group in range(groups) for text in (f"Nested label {group}", "", "y", "item")]
+	if texts != expected:
+		raise AssertionError(f"Labels applied wrongly around controls without a field: {texts[:8]}")
+	package.virtualBufferSupport._unpatchInterceptor(first)
+
+	second = offline.FakeDocument(url, "nested")
+	second.objects = first.objects
+	second.offsets = first.offsets
+	fetched = []
+	getObject = second.getNVDAObjectFromIdentifier
+
+	def countingGetObject(docHandle, ID):
+		fetched.append(ID)
+		return getObject(docHandle, ID)
+	second.getNVDAObjectFromIdentifier = countingGetObject
+	package.virtualBufferSupport.ensurePatched(second)
+	for panel in panels:
+		second.getFields(0, 0, list(panel))
+	package.virtualBufferSupport._unpatchInterceptor(second)
+	return len(fetched) / groups
+
+
+@benchmark("browse.liveRegion.subtreeReads", unit="reads")
+def _browseLiveRegion(package, messages=40, events=30):
+	"""Subtrees read from the buffer per update of a page changing in place, as a chat log.
+
+	One update follows events on three nodes, the next on more nodes than are
+	remembered. Each changed subtree should be read once per update, however many
+	events came, and none when the document's entries are all dropped.
+	"""
+	import textInfos
+	document = offline.FakeDocument("https://chat.example/room", "liveRegion")
+	commands = []
+	for ID in range(1, messages + 1):
+		document.objects[(1, ID)] = offline.makeObject(corpus.makeObjectDesc(ID, "IA2", "liveRegion"))
+		document.offsets[(1, ID)] = (ID * 10, ID * 10 + 10)
+		field = textInfos.ControlField({
+			"controlIdentifier_docHandle": "1",
+			"controlIdentifier_ID": str(ID),
+			"role": 9,
+			"name": f"Message {ID}",
+		})
+		commands += [
+			textInfos.FieldCommand("controlStart", field),
+			f"text {ID}",
+			textInfos.FieldCommand("controlEnd", None),
+		]
+	document.pendingCommands = commands
+	reads = []
+	getFields = document.TextInfo._getFieldsInRange
+
+	def countingGetFields(textInfo, start, end):
+		reads.append(start)
+		return getFields(textInfo, start, end)
+	document.TextInfo._getFieldsInRange = countingGetFields
+	support = package.virtualBufferSupport
+	support.ensurePatched(document)
+	for obj in document.objects.values():
+		obj.treeInterceptor = document
+	changed = [document.objects[(1, ID)] for ID in (1, 2, 3)]
+	for index in range(events):
+		support.handleNodeChange(changed[index % len(changed)])
+	document._handleUpdate()
+	for obj in document.objects.values():
+		support.handleNodeChange(obj)
+	document._handleUpdate()
+	support._unpatchInterceptor(document)
+	return len(reads) / 2
+
+
+# Startup
+
+# Run in a new interpreter, as the add-on is already imported here.
+_STARTUP_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import offline
+offline.prepare()
+offline.importStubs()
+sys.path.insert(0, sys.argv[2])
+import run
+calibration = run._timeCalibration()
+start = time.perf_counter()
+import CustomLabels
+plugin = CustomLabels.GlobalPlugin()
+elapsed = time.perf_counter() - start
+modules = [name for name in sys.modules if name.startswith("CustomLabels.")]
+print(json.dumps({"elapsed": elapsed, "calibration": calibration, "modules": len(modules)}))
+"""
+
+
+def _measureStartup(repeat=7):
+	"""Return the best elapsed and calibration times of repeat startups, and the module count.
+
+	The two bests are kept apart, as in bestTime().
+	"""
+	import compileall
+	import subprocess
+	# NVDA loads add-ons from their bytecode, so compiling is not part of the measurement.
+	compileall.compile_dir(offline.PLUGINS_DIR, quiet=1, force=True)
+	best = None
+	for _run in range(repeat):
+		output = subprocess.run(
+			[sys.executable, "-c", _STARTUP_SCRIPT, offline.TOOLS_DIR, os.path.dirname(os.path.abspath(__file__))],
+			check=True, capture_output=True, text=True,
+		).stdout
+		result = json.loads(output.splitlines()[-1])
+		if best is None:
+			best = result
+		for key in ("elapsed", "calibration"):
+			best[key] = min(best[key], result[key])
+	return best
+
+
+@benchmark("startup.import", unit="ms")
+def _startupImport(package):
+	"""Importing the add-on and creating its GlobalPlugin, with NVDA's modules already loaded."""
+	global _lastCalibration
+	result = _measureStartup()
+	_lastCalibration = result["calibration"]
+	return result["elapsed"] * 1000
+
+
+@benchmark("startup.modules", unit="modules")
+def _startupModules(package):
+	"""The add-on's modules loaded at startup."""
+	return _measureStartup(repeat=1)["modules"]
+
+
+# Running and comparing
+
+def runBenchmarks(nameFilter=None, names=None):
+	"""Run the benchmarks whose name contains nameFilter, or those in names, and return the results."""
+	package = offline.setup()
+	results = {}
+	for name, (func, unit, reference) in _benchmarks.items():
+		if nameFilter and nameFilter not in name:
+			continue
+		if names is not None and name not in names:
+			continue
+		value = func(package)
+		result = {"value": round(value, 4), "unit": unit}
+		if unit in _TIME_UNITS:
+			result["calibration"] = round(_lastCalibration, 4)
+		if reference:
+			result["reference"] = True
+		results[name] = result
+		print(f"{name:32} {value:12.3f} {unit}", flush=True)
+	return {
+		"version": RESULTS_VERSION,
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"results": results,
+	}
+
+
+def _relativeTime(result):
+	"""Return a time result relative to the calibration workload measured with it."""
+	return result["value"] / result["calibration"]
+
+
+def compare(results, baseline, threshold, fastThreshold):
+	"""Print the change of each metric against the baseline. Returns the names of regressed metrics.
+
+	The change of a time is relative to the calibration workload; the values printed are raw.
+	"""
+	regressed = []
+	print(f"\n{'metric':32} {'baseline':>12} {'current':>12} {'change':>8}")
+	for name, current in results["results"].items():
+		base = baseline.get("results", {}).get(name)
+		if base is None:
+			print(f"{name:32} {'-':>12} {current['value']:12.3f}      new")
+			continue
+		baseValue = base["value"]
+		value = current["value"]
+		if current["unit"] not in _TIME_UNITS:
+			change = (value - baseValue) / baseValue * 100 if baseValue else 0.0
+			failed = value > baseValue
+		else:
+			baseRelative = _relativeTime(base)
+			change = (_relativeTime(current) - baseRelative) / baseRelative * 100
+			fast = current["unit"] == "us" and baseValue < FAST_TIME
+			failed = change > (fastThreshold if fast else threshold)
+		if current.get("reference"):
+			failed = False
+			mark = "  reference"
+		else:
+			mark = "  REGRESSED" if failed else ""
+		if failed:
+			regressed.append(name)
+		print(f"{name:32} {baseValue:12.3f} {value:12.3f} {change:+7.1f}%{mark}")
+	return regressed
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Run the Custom Labels microbenchmarks.")
+	parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+	parser.add_argument("--output", help="write the results to this JSON file")
+	parser.add_argument(
+		"--compare", nargs="?", const=DEFAULT_BASELINE,
+		help="compare against a baseline results file (default: the committed baseline.json)",
+	)
+	parser.add_argument(
+		"--threshold", type=float, default=50.0,
+		help="percentage a time may exceed its baseline before failing (default 50)",
+	)
+	parser.add_argument(
+		"--fast-threshold", type=float, default=100.0,
+		help=f"the same for times under {FAST_TIME:g} microseconds per operation (default 100)",
+	)
+	args = parser.parse_args()
+
+	results = runBenchmarks(args.filter)
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(results, f, indent=2)
+			f.write("\n")
+	if args.compare:
+		with open(args.compare, encoding="utf-8") as f:
+			baseline = json.load(f)
+		if baseline.get("version") != RESULTS_VERSION:
+			parser.error(f"{args.compare} was made by another version of this script: regenerate it")
+		regressed = compare(results, baseline, args.threshold, args.fast_threshold)
+		for _run in range(CONFIRM_RUNS):
+			times = [name for name in regressed if results["results"][name]["unit"] in _TIME_UNITS]
+			if not times:
+				break
+			print(f"\nMeasuring {len(times)} times again: {', '.join(times)}")
+			again = runBenchmarks(names=times)["results"]
+			# The best run of each counts, as within a run.
+			for name in times:
+				if _relativeTime(again[name]) < _relativeTime(results["results"][name]):
+					results["results"][name] = again[name]
+			confirmed = compare(
+				{"results": {name: results["results"][name] for name in times}},
+				baseline, args.threshold, args.fast_threshold,
+			)
+			regressed = [name for name in regressed if name not in times or name in confirmed]
+		if regressed:
+			print(f"\n{len(regressed)} metrics regressed: {', '.join(regressed)}")
+			sys.exit(1)
+		print("\nNo regressions")
+
+
+if __name__ == "__main__":
+	main()
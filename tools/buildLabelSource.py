@@ -0,0 +1,58 @@
+# buildLabelSource
+# A part of Custom Labels addon for NVDA
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Builds a read-only label source from label packs, outside of NVDA.
+#
+# Usage: python tools/buildLabelSource.py output.cldb pack.zip [pack.zip ...]
+# When several packs label the same control, the first pack given wins.
+# Packs should be exported by the current version of Custom Labels, so their
+# fingerprints are already in the current format.
+
+import argparse
+import importlib.util
+import json
+import os
+import zipfile
+
+_SOURCES_MODULE = os.path.join(
+	os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+	"addon", "globalPlugins", "CustomLabels", "labelSources.py",
+)
+
+
+def _loadLabelSources():
+	# labelSources has no NVDA dependencies; load it without importing the add-on package.
+	spec = importlib.util.spec_from_file_location("labelSources", _SOURCES_MODULE)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+
+def readPackLabels(path, labels):
+	"""Add the labels of a label pack to labels, keeping labels already there."""
+	with zipfile.ZipFile(path) as z:
+		manifest = json.loads(z.read("manifest.json"))
+		for entry in manifest.get("apps", []):
+			data = json.loads(z.read(entry["file"]))
+			for keyString, label in data.get("labels", {}).items():
+				fingerprint = tuple(tuple(item) for item in json.loads(keyString))
+				labels.setdefault(fingerprint, label)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Build a read-only label source from label packs.")
+	parser.add_argument("output", help="path of the label source to write (.cldb)")
+	parser.add_argument("packs", nargs="+", help="label packs exported from Custom Labels")
+	args = parser.parse_args()
+	labelSources = _loadLabelSources()
+	labels = {}
+	for pack in args.packs:
+		readPackLabels(pack, labels)
+	labelSources.writeLabelSource(args.output, labels)
+	print(f"Wrote {len(labels)} labels to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,11 @@
+# Stub of NVDA's NVDAObjects.JAB module for running the add-on outside NVDA.
+
+from . import NVDAObject
+
+
+def _processHtml(text):
+	return text
+
+
+class JAB(NVDAObject):
+	jabContext = None
@@ -0,0 +1,7 @@
+# Stub of NVDA's NVDAObjects.UIA module for running the add-on outside NVDA.
+
+from . import NVDAObject
+
+
+class UIA(NVDAObject):
+	UIAElement = None
@@ -0,0 +1,19 @@
+# Stub of NVDA's NVDAObjects package for running the add-on outside NVDA.
+# Objects are plain attribute holders: tools set the properties they need.
+
+
+class NVDAObject:
+	name = ""
+	description = ""
+	role = 0
+	parent = None
+	appModule = None
+	windowHandle = 0
+	windowClassName = ""
+	windowControlID = 0
+	indexInParent = None
+	positionInfo = {}
+	columnNumber = None
+	treeInterceptor = None
+	event_objectID = None
+	event_childID = None
@@ -0,0 +1,15 @@
+# Stub of NVDA's addonHandler module for running the add-on outside NVDA.
+
+import builtins
+
+
+def initTranslation():
+	"""Install an identity _() like NVDA does when the add-on has no translations."""
+	if not hasattr(builtins, "_"):
+		builtins._ = lambda text: text
+	if not hasattr(builtins, "ngettext"):
+		builtins.ngettext = lambda singular, plural, n: singular if n == 1 else plural
+
+
+def getCodeAddon():
+	return None
@@ -0,0 +1,24 @@
+# Stub of NVDA's api module for running the add-on outside NVDA.
+
+_focusObject = None
+_navigatorObject = None
+
+
+def getFocusObject():
+	return _focusObject
+
+
+def setFocusObject(obj):
+	global _focusObject
+	_focusObject = obj
+	return True
+
+
+def getNavigatorObject():
+	return _navigatorObject if _navigatorObject is not None else _focusObject
+
+
+def setNavigatorObject(obj):
+	global _navigatorObject
+	_navigatorObject = obj
+	return True
@@ -0,0 +1,47 @@
+# Stub of NVDA's config module for running the add-on outside NVDA.
+# conf["section"] returns the section with the defaults declared in conf.spec.
+
+import re
+
+_DEFAULT_RE = re.compile(r"^(\w+)\(default=(.*)\)$")
+
+
+def _parseDefault(spec):
+	match = _DEFAULT_RE.match(spec)
+	if not match:
+		return None
+	kind, value = match.groups()
+	if kind == "boolean":
+		return value == "True"
+	if kind == "integer":
+		return int(value)
+	if kind == "float":
+		return float(value)
+	if kind == "string_list":
+		return []
+	return value.strip("\"'")
+
+
+class _Conf(dict):
+
+	def __init__(self):
+		super().__init__()
+		self.spec = {}
+
+	def __missing__(self, section):
+		spec = self.spec.get(section)
+		if spec is None:
+			raise KeyError(section)
+		values = {key: _parseDefault(value) for key, value in spec.items()}
+		self[section] = values
+		return values
+
+
+conf = _Conf()
+
+
+class ConfigManager:
+	pass
+
+
+post_configProfileSwitch = None
@@ -0,0 +1,63 @@
+# Stub of NVDA's controlTypes module for running the add-on outside NVDA.
+# Role values are NVDA's, so fingerprints built offline match those built in NVDA.
+
+import enum
+
+
+class Role(enum.IntEnum):
+	UNKNOWN = 0
+	WINDOW = 1
+	TITLEBAR = 2
+	PANE = 3
+	DIALOG = 4
+	CHECKBOX = 5
+	RADIOBUTTON = 6
+	STATICTEXT = 7
+	EDITABLETEXT = 8
+	BUTTON = 9
+	MENUBAR = 10
+	MENUITEM = 11
+	POPUPMENU = 12
+	COMBOBOX = 13
+	LIST = 14
+	LISTITEM = 15
+	GRAPHIC = 16
+	HELPBALLOON = 17
+	TOOLTIP = 18
+	LINK = 19
+	TREEVIEW = 20
+	TREEVIEWITEM = 21
+	TAB = 22
+	TABCONTROL = 23
+	SLIDER = 24
+	PROGRESSBAR = 25
+	SCROLLBAR = 26
+	STATUSBAR = 27
+	TABLE = 28
+	TABLECELL = 29
+	TABLECOLUMN = 30
+	TABLEROW = 31
+	TABLECOLUMNHEADER = 32
+	TABLEROWHEADER = 33
+	FRAME = 34
+	TOOLBAR = 35
+	DROPDOWNBUTTON = 36
+	SEPARATOR = 38
+	FORM = 39
+	HEADING = 40
+	DOCUMENT = 52
+	GROUPING = 56
+	PROPERTYPAGE = 57
+	TOGGLEBUTTON = 91
+	MENUBUTTON = 101
+
+	@property
+	def displayString(self):
+		return self.name.lower()
+
+
+class State(enum.IntEnum):
+	FOCUSED = 0x4
+	SELECTED = 0x8
+	CHECKED = 0x20
+	INVISIBLE = 0x40000000
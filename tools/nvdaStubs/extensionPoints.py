@@ -0,0 +1,31 @@
+# Stub of NVDA's extensionPoints module for running the add-on outside NVDA.
+
+import inspect
+
+
+def _callWithSupportedKwargs(func, **kwargs):
+	# As NVDA does, handlers get only the keyword arguments they accept.
+	parameters = inspect.signature(func).parameters
+	if not any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()):
+		kwargs = {name: value for name, value in kwargs.items() if name in parameters}
+	return func(**kwargs)
+
+
+class Action:
+
+	def __init__(self):
+		self._handlers = []
+
+	def register(self, handler):
+		if handler not in self._handlers:
+			self._handlers.append(handler)
+
+	def unregister(self, handler):
+		try:
+			self._handlers.remove(handler)
+		except ValueError:
+			pass
+
+	def notify(self, **kwargs):
+		for handler in list(self._handlers):
+			_callWithSupportedKwargs(handler, **kwargs)
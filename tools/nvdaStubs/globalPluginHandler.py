@@ -0,0 +1,13 @@
+# Stub of NVDA's globalPluginHandler module for running the add-on outside NVDA.
+
+
+class GlobalPlugin:
+
+	def __init__(self):
+		pass
+
+	def terminate(self):
+		pass
+
+	def chooseNVDAObjectOverlayClasses(self, obj, clsList):
+		pass
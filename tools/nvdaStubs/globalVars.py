@@ -0,0 +1,6 @@
+# Stub of NVDA's globalVars module for running the add-on outside NVDA.
+# tools/offline.py sets appArgs.configPath before the add-on is imported.
+
+import types
+
+appArgs = types.SimpleNamespace(configPath=None, secure=False, launcher=False)
@@ -0,0 +1,9 @@
+# Stub of NVDA's gui package for running the add-on outside NVDA.
+
+from . import guiHelper, settingsDialogs  # noqa: F401
+
+mainFrame = None
+
+
+def messageBox(message, caption="", style=0, parent=None):
+	return 0
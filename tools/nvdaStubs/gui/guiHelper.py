@@ -0,0 +1,11 @@
+# Stub of NVDA's gui.guiHelper module for running the add-on outside NVDA.
+
+import wx
+
+
+class BoxSizerHelper(wx._Inert):
+	pass
+
+
+class ButtonHelper(wx._Inert):
+	pass
@@ -0,0 +1,11 @@
+# Stub of NVDA's gui.settingsDialogs module for running the add-on outside NVDA.
+
+import wx
+
+
+class SettingsPanel(wx._Inert):
+	title = ""
+
+
+class NVDASettingsDialog(wx._Inert):
+	categoryClasses = []
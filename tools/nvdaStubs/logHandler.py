@@ -0,0 +1,16 @@
+# Stub of NVDA's logHandler module for running the add-on outside NVDA.
+
+import logging
+
+
+class _Logger(logging.Logger):
+
+	def debugWarning(self, msg, *args, **kwargs):
+		self.debug(msg, *args, **kwargs)
+
+	def io(self, msg, *args, **kwargs):
+		self.debug(msg, *args, **kwargs)
+
+
+log = _Logger("nvda")
+log.addHandler(logging.NullHandler())
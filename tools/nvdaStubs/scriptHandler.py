@@ -0,0 +1,12 @@
+# Stub of NVDA's scriptHandler module for running the add-on outside NVDA.
+
+
+def script(**kwargs):
+	def decorator(func):
+		func.__dict__.update(kwargs)
+		return func
+	return decorator
+
+
+def getLastScriptRepeatCount():
+	return 0
@@ -0,0 +1,32 @@
+# Stub of NVDA's textInfos module for running the add-on outside NVDA.
+
+POSITION_FIRST = "first"
+POSITION_LAST = "last"
+POSITION_CARET = "caret"
+POSITION_ALL = "all"
+
+
+class Field(dict):
+	pass
+
+
+class ControlField(Field):
+	pass
+
+
+class FormatField(Field):
+	pass
+
+
+class FieldCommand:
+
+	def __init__(self, command, field):
+		self.command = command
+		self.field = field
+
+	def __repr__(self):
+		return f"FieldCommand({self.command!r}, {self.field!r})"
+
+
+class TextInfo:
+	pass
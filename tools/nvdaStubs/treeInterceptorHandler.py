@@ -0,0 +1,13 @@
+# Stub of NVDA's treeInterceptorHandler module for running the add-on outside NVDA.
+
+import extensionPoints
+
+post_browseModeStateChange = extensionPoints.Action()
+
+
+class TreeInterceptor:
+	passThrough = False
+
+
+def getTreeInterceptor(obj):
+	return getattr(obj, "treeInterceptor", None)
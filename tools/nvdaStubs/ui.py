@@ -0,0 +1,8 @@
+# Stub of NVDA's ui module for running the add-on outside NVDA.
+# Messages are collected in messages instead of being spoken.
+
+messages = []
+
+
+def message(text, *args, **kwargs):
+	messages.append(text)
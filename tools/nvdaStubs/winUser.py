@@ -0,0 +1,25 @@
+# Stub of NVDA's winUser module for running the add-on outside NVDA.
+# Every window is its own top-level window. Titles and class names can be set with setWindow().
+
+GA_PARENT = 1
+GA_ROOT = 2
+GA_ROOTOWNER = 3
+
+# Window handle -> (title, class name)
+_windows = {}
+
+
+def setWindow(hwnd, title="", className=""):
+	_windows[hwnd] = (title, className)
+
+
+def getAncestor(hwnd, flags):
+	return hwnd
+
+
+def getWindowText(hwnd):
+	return _windows.get(hwnd, ("", ""))[0]
+
+
+def getClassName(hwnd):
+	return _windows.get(hwnd, ("", ""))[1]
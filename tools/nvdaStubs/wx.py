@@ -0,0 +1,39 @@
+# Stub of wxPython for running the add-on outside NVDA.
+# Any class can be created and subclassed, and does nothing; any upper case
+# constant is 0. Nothing is ever displayed.
+
+
+class _Inert:
+
+	def __init__(self, *args, **kwargs):
+		pass
+
+	def __getattr__(self, name):
+		return _Inert()
+
+	def __call__(self, *args, **kwargs):
+		return _Inert()
+
+	def __bool__(self):
+		return False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+
+def CallAfter(func, *args, **kwargs):
+	func(*args, **kwargs)
+
+
+def __getattr__(name):
+	if name.isupper():
+		return 0
+	if name[:1].isupper():
+		# A distinct class per name, so add-on classes can subclass several of them.
+		cls = type(name, (_Inert,), {})
+		globals()[name] = cls
+		return cls
+	raise AttributeError(name)
@@ -0,0 +1,307 @@
+# offline
+# A part of Custom Labels addon for NVDA
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Loads the add-on outside NVDA, with the stubs in tools/nvdaStubs,
+# and builds fake objects and browse mode documents to drive it with.
+#
+# Usage:
+#   import offline
+#   CustomLabels = offline.setup()
+#   obj = offline.makeObject({"kind": "UIA", "appName": "notepad", "role": 9, ...})
+
+import builtins
+import importlib
+import os
+import sys
+import tempfile
+import types
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+STUBS_DIR = os.path.join(TOOLS_DIR, "nvdaStubs")
+PLUGINS_DIR = os.path.join(REPO_DIR, "addon", "globalPlugins")
+
+
+def prepare(configPath=None):
+	"""Make the stubs and the add-on importable, without importing the add-on.
+
+	Labels are stored under configPath, a new temporary folder by default.
+	"""
+	for path in (STUBS_DIR, PLUGINS_DIR):
+		if path not in sys.path:
+			sys.path.insert(0, path)
+	import globalVars
+	globalVars.appArgs.configPath = (
+		configPath or globalVars.appArgs.configPath or tempfile.mkdtemp(prefix="customLabels-")
+	)
+	# NVDA installs _() for every module; the add-on expects it before initTranslation().
+	if not hasattr(builtins, "_"):
+		builtins._ = lambda text: text
+
+
+def importStubs():
+	"""Import every stub module, as NVDA has loaded its own modules before add-ons."""
+	for folder, _dirs, files in os.walk(STUBS_DIR):
+		package = os.path.relpath(folder, STUBS_DIR).replace(os.sep, ".")
+		for fileName in sorted(files):
+			if not fileName.endswith(".py"):
+				continue
+			name = fileName[:-3]
+			if package != ".":
+				name = package if name == "__init__" else f"{package}.{name}"
+			importlib.import_module(name)
+
+
+def setup(configPath=None):
+	"""Import the add-on package with NVDA stubbed out, and return it.
+
+	Labels are stored under configPath, a new temporary folder by default.
+	Calling setup() again returns the package already imported.
+	"""
+	if "CustomLabels" in sys.modules:
+		return sys.modules["CustomLabels"]
+	prepare(configPath)
+	import CustomLabels
+	# The add-on imports these when first needed; the tools use them directly.
+	for name in ("labelFiles", "usageStats", "virtualBufferSupport"):
+		importlib.import_module(f"CustomLabels.{name}")
+	return CustomLabels
+
+
+# Fake objects
+
+class _AppModule:
+
+	def __init__(self, appName):
+		self.appName = appName
+
+
+class _JABContextInfo:
+
+	def __init__(self, name, description):
+		self.name = name
+		self.description = description
+
+
+class _JABContext:
+	"""Answers the bridge calls the JAB handler makes, and counts them.
+
+	With fails, getting the context info raises, as when the bridge loses the object.
+	"""
+
+	calls = 0
+
+	def __init__(self, info, parentContext, fails=False):
+		self._info = info
+		self._parentContext = parentContext
+		self._fails = fails
+
+	def getAccessibleContextInfo(self):
+		_JABContext.calls += 1
+		if self._fails:
+			raise RuntimeError("Java Access Bridge call failed")
+		return self._info
+
+	def getAccessibleParentFromContext(self):
+		_JABContext.calls += 1
+		return self._parentContext
+
+
+def _getObjectClasses():
+	# Imported lazily: the stubs are only importable after setup().
+	from NVDAObjects import NVDAObject
+	from NVDAObjects.UIA import UIA
+	from NVDAObjects.JAB import JAB
+	return {"UIA": UIA, "JAB": JAB, "IA2": NVDAObject}
+
+
+def _role(desc):
+	import controlTypes
+	roleName = desc.get("roleName")
+	if roleName and roleName in controlTypes.Role.__members__:
+		return controlTypes.Role[roleName]
+	role = desc.get("role") or 0
+	try:
+		return controlTypes.Role(role)
+	except ValueError:
+		return role
+
+
+def makeObject(desc):
+	"""Return a fake NVDAObject with the properties in desc.
+
+	desc is in the format of recorder.describeObject(): appName, role or roleName,
+	name, description, window properties, kind ("UIA", "JAB" or "IA2") with its
+	backend properties under "uia" or "jab", and parent, another such dict. A "jab"
+	dict with "fails" gives an object whose bridge calls for context info fail.
+	Missing properties take the defaults of the NVDAObject stub.
+	"""
+	if desc is None:
+		return None
+	kind = desc.get("kind", "IA2")
+	base = _getObjectClasses()[kind]
+	obj = base()
+	obj.appModule = _AppModule(desc.get("appName") or "unknown")
+	obj.role = _role(desc)
+	for attr in (
+		"name",
+		"description",
+		"windowClassName",
+		"windowControlID",
+		"windowHandle",
+		"indexInParent",
+		"columnNumber",
+		"positionInfo",
+		"event_objectID",
+		"event_childID",
+	):
+		value = desc.get(attr)
+		if value is not None:
+			setattr(obj, attr, value)
+	obj.parent = makeObject(desc.get("parent"))
+	if kind == "UIA":
+		uia = desc.get("uia") or {}
+		obj.UIAElement = types.SimpleNamespace(**{
+			prop: uia.get(prop) or ""
+			for prop in (
+				"currentAutomationId",
+				"cachedAutomationId",
+				"currentFrameworkId",
+				"currentAriaProperties",
+				"currentAriaRole",
+			)
+		})
+	elif kind == "JAB":
+		jab = desc.get("jab") or {"name": obj.name, "description": obj.description}
+		# The bridge gives no parent for a control whose parent is not a Java object.
+		parentContext = getattr(obj.parent, "jabContext", None)
+		obj.jabContext = _JABContext(
+			_JABContextInfo(jab.get("name"), jab.get("description")), parentContext, jab.get("fails", False),
+		)
+	return obj
+
+
+# Fake browse mode documents
+
+class FakeDocument:
+	"""A browse mode document whose TextInfo returns prepared command lists.
+
+	Each document gets its own TextInfo class, as the add-on patches
+	_getFieldsInRange on the class of each document it sees.
+	With markup, the commands are given to _getFieldsInRange as the XML a virtual
+	buffer returns, and parsed into a list at every call as NVDA does: the time of
+	the original method is then close to NVDA's.
+	"""
+
+	passThrough = False
+
+	def __init__(self, url=None, appName="unknown", markup=False):
+		# What identifies the document between loads, as for Firefox and Chrome documents.
+		self.documentConstantIdentifier = url
+		self.rootNVDAObject = makeObject({"appName": appName, "roleName": "DOCUMENT"})
+		# (docHandle, ID) -> fake object
+		self.objects = {}
+		# (docHandle, ID) -> (startOffset, endOffset)
+		self.offsets = {}
+		self.pendingCommands = []
+		self.markup = markup
+		# (commands, their XML) for the last commands given with markup
+		self._pendingMarkup = (None, None)
+		document = self
+
+		def _getFieldsInRange(textInfo, start, end):
+			if document.markup:
+				return parseMarkup(document._pendingMarkup[1])
+			# A new list for every call, as NVDA builds: the add-on edits it in place.
+			return list(document.pendingCommands)
+
+		def _getOffsetsFromFieldIdentifier(textInfo, docHandle, ID):
+			try:
+				return document.offsets[(docHandle, ID)]
+			except KeyError:
+				raise LookupError((docHandle, ID))
+
+		self.TextInfo = type("FakeTextInfo", (), {
+			"_getFieldsInRange": _getFieldsInRange,
+			"_getOffsetsFromFieldIdentifier": _getOffsetsFromFieldIdentifier,
+		})
+		self.textInfo = self.TextInfo()
+
+	def makeTextInfo(self, position):
+		return self.textInfo
+
+	def getNVDAObjectFromIdentifier(self, docHandle, ID):
+		return self.objects.get((docHandle, ID))
+
+	def getIdentifierFromNVDAObject(self, obj):
+		for key, candidate in self.objects.items():
+			if candidate is obj:
+				return key
+		raise LookupError("object not in document")
+
+	def _handleUpdate(self):
+		"""Called by the test after changing objects, offsets or commands, as the buffer does after a change."""
+
+	def getFields(self, start, end, commands):
+		"""Call the (possibly patched) _getFieldsInRange with commands as the buffer's content."""
+		self.pendingCommands = commands
+		if self.markup and self._pendingMarkup[0] is not commands:
+			self._pendingMarkup = (commands, toMarkup(commands))
+		return self.TextInfo._getFieldsInRange(self.textInfo, start, end)
+
+
+def toMarkup(commands):
+	"""Return the XML a virtual buffer gives for a command list of controls and text."""
+	from xml.sax.saxutils import escape, quoteattr
+	parts = []
+	for item in commands:
+		if isinstance(item, str):
+			parts.append(escape(item))
+		elif item.command == "controlStart":
+			attrs = "".join(f" {name}={quoteattr(str(value))}" for name, value in item.field.items())
+			parts.append(f"<control{attrs}>")
+		elif item.command == "controlEnd":
+			parts.append("</control>")
+		else:
+			raise ValueError(f"Command not supported in markup: {item.command}")
+	return "".join(parts)
+
+
+def parseMarkup(markup):
+	"""Return the command list for virtual buffer XML, built as NVDA's XMLTextParser does."""
+	import textInfos
+	from xml.parsers import expat
+	commands = []
+
+	def startElement(tagName, attrs):
+		if tagName == "control":
+			commands.append(textInfos.FieldCommand("controlStart", textInfos.ControlField(attrs)))
+
+	def endElement(tagName):
+		if tagName == "control":
+			commands.append(textInfos.FieldCommand("controlEnd", None))
+
+	def characterData(data):
+		# expat may give a text in several parts.
+		if commands and isinstance(commands[-1], str):
+			commands[-1] += data
+		else:
+			commands.append(data)
+
+	parser = expat.ParserCreate()
+	parser.StartElementHandler = startElement
+	parser.EndElementHandler = endElement
+	parser.CharacterDataHandler = characterData
+	parser.Parse(f"<root>{markup}</root>", True)
+	return commands
+
+
+def makeCommand(item):
+	"""Convert a recorded command list item back to a str or FieldCommand."""
+	import textInfos
+	if item is None or isinstance(item, str):
+		return item
+	field = item.get("field")
+	return textInfos.FieldCommand(item["command"], textInfos.ControlField(field) if field else field)
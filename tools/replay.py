@@ -0,0 +1,146 @@
+# replay
+# A part of Custom Labels addon for NVDA
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Replays a recording made with the add-on's recording command, outside NVDA,
+# and reports where the add-on spends its time.
+#
+# Usage:
+#   python tools/replay.py recording.jsonl [--labels FOLDER] [--synthesize PERCENT]
+#       [--repeat N] [--top N] [--sort cumulative|tottime] [--output FILE.prof]
+#
+# Focus events are replayed the way NVDA handles them: chooseNVDAObjectOverlayClasses
+# on the new object, then event_gainFocus. Browse mode reads are replayed through the
+# add-on's patched _getFieldsInRange on fake documents built from the recording.
+# Labels come from a copy of a customLabels folder (--labels), or are made up for a
+# share of the recorded objects (--synthesize), so recordings need not include labels.
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import offline
+
+
+def readRecording(path):
+	events = []
+	with open(path, encoding="utf-8") as f:
+		for line in f:
+			line = line.strip()
+			if line:
+				events.append(json.loads(line))
+	if not events or events[0].get("type") != "header":
+		raise SystemExit(f"{path} is not a Custom Labels recording")
+	return events
+
+
+class Replayer:
+
+	def __init__(self, package, events):
+		self.package = package
+		self.plugin = package.GlobalPlugin()
+		self.focusObjects = []
+		self.documents = {}
+		self.reads = []
+		for event in events:
+			kind = event.get("type")
+			if kind == "focus":
+				self.focusObjects.append(offline.makeObject(event["obj"]))
+			elif kind == "node":
+				document = self._getDocument(event["document"])
+				key = (event["docHandle"], event["ID"])
+				document.objects[key] = offline.makeObject(event["obj"])
+				if event.get("offsets"):
+					document.offsets[key] = tuple(event["offsets"])
+			elif kind == "fields":
+				document = self._getDocument(event["document"])
+				commands = [offline.makeCommand(item) for item in event["items"]]
+				self.reads.append((document, event["start"], event["end"], commands))
+
+	def _getDocument(self, number):
+		document = self.documents.get(number)
+		if document is None:
+			document = self.documents[number] = offline.FakeDocument()
+			self.package.virtualBufferSupport.ensurePatched(document)
+		return document
+
+	def synthesizeLabels(self, percent, seed=0):
+		"""Label a share of the recorded objects, so lookups find labels as they would for a user."""
+		rng = random.Random(seed)
+		objects = list(self.focusObjects)
+		for document in self.documents.values():
+			objects.extend(document.objects.values())
+		labels = []
+		for obj in objects:
+			if obj is None or rng.random() * 100 >= percent:
+				continue
+			fp = self.package.fingerPrintReader.getObjectFingerprint(obj, enforceBudget=False)
+			if fp:
+				labels.append((fp, f"label {len(labels)}"))
+		self.package.labeler.labelStore.setMany(labels)
+		return len(labels)
+
+	def run(self):
+		plugin = self.plugin
+		for obj in self.focusObjects:
+			if obj is None:
+				continue
+			plugin.chooseNVDAObjectOverlayClasses(obj, [])
+			plugin.event_gainFocus(obj, lambda: None)
+		for document, start, end, commands in self.reads:
+			document.getFields(start, end, commands)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Replay a Custom Labels recording under cProfile.")
+	parser.add_argument("recording", help="a recording (.jsonl) from the recordings folder")
+	parser.add_argument("--labels", help="a customLabels folder to copy and use as the user's labels")
+	parser.add_argument(
+		"--synthesize", type=float, default=0,
+		help="label this percentage of the recorded objects (default 0)",
+	)
+	parser.add_argument("--repeat", type=int, default=1, help="replay the recording this many times")
+	parser.add_argument("--top", type=int, default=30, help="number of functions to report")
+	parser.add_argument("--sort", default="cumulative", choices=("cumulative", "tottime"))
+	parser.add_argument("--output", help="also save the raw profile to this file, for snakeviz and similar")
+	args = parser.parse_args()
+
+	configPath = tempfile.mkdtemp(prefix="customLabels-replay-")
+	if args.labels:
+		shutil.copytree(args.labels, os.path.join(configPath, "customLabels"))
+	package = offline.setup(configPath)
+	replayer = Replayer(package, readRecording(args.recording))
+	if args.synthesize:
+		print(f"Synthesized {replayer.synthesizeLabels(args.synthesize)} labels")
+	print(
+		f"Replaying {len(replayer.focusObjects)} focus events and {len(replayer.reads)} browse mode reads "
+		f"in {len(replayer.documents)} documents, {args.repeat} times"
+	)
+
+	profiler = cProfile.Profile()
+	startTime = time.perf_counter()
+	profiler.enable()
+	for _iteration in range(args.repeat):
+		replayer.run()
+	profiler.disable()
+	elapsed = time.perf_counter() - startTime
+	print(f"Total {elapsed * 1000:.1f} ms")
+
+	stats = pstats.Stats(profiler, stream=sys.stdout)
+	if args.output:
+		stats.dump_stats(args.output)
+	# Only the add-on's own functions are ranked; the stubs and this tool are left out.
+	stats.sort_stats(args.sort).print_stats(offline.PLUGINS_DIR.replace("\\", "\\\\"), args.top)
+	shutil.rmtree(configPath, ignore_errors=True)
+
+
+if __name__ == "__main__":
+	main()
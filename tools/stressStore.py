@@ -0,0 +1,202 @@
+# stressStore
+# A part of Custom Labels addon for NVDA
+# copyright: 2026 Kefas Lungu
+# This file is licensed under the GNU General Public License v2.
+# See the file COPYING.txt for details.
+# Runs concurrent readers and writers against a LabelStore, outside NVDA,
+# and checks that readers only ever see whole commits.
+#
+# Usage:
+#   python tools/stressStore.py [--seconds 10] [--readers 4] [--writers 2]
+#       [--apps 4] [--labels 200] [--external]
+#
+# Every write relabels all labels of an app in one batch, with a label naming the
+# writer and the write. Readers look labels up, and check that every copy of an
+# app's labels they get carries a single write, and all of its labels. With
+# --external, another thread rewrites app files directly, as deployment scripts do,
+# and the store reloads them. At the end, the store must match what a new store
+# reads from the files, and the label count of every app must match the one kept
+# from labelChanged notifications, as the settings panel keeps it: most writes edit
+# labels that exist, which must not count. Exits with status 1 if any check failed.
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import offline
+
+sys.path.insert(0, os.path.join(offline.TOOLS_DIR, "benchmarks"))
+import corpus  # noqa: E402
+
+
+class Stress:
+
+	def __init__(self, package, appCount, labelCount):
+		self.labeler = package.labeler
+		self.store = self.labeler.LabelStore()
+		self.apps = [f"stress{index}" for index in range(appCount)]
+		self.fingerprints = {appName: list(corpus.makeLabels(labelCount, appName)) for appName in self.apps}
+		self.stop = threading.Event()
+		self.lock = threading.Lock()
+		self.failures = []
+		self.counts = {"lookups": 0, "snapshots": 0, "writes": 0, "externalWrites": 0}
+		# {appName: label count}, from labelChanged notifications
+		self.notifiedCounts = {}
+		self.store.labelChanged.register(self.onLabelChanged)
+		with self.store.batch():
+			for appName in self.apps:
+				self.store.setMany((fp, "initial:0") for fp in self.fingerprints[appName])
+
+	def fail(self, message):
+		with self.lock:
+			if len(self.failures) < 20:
+				self.failures.append(message)
+		self.stop.set()
+
+	def count(self, name, value):
+		with self.lock:
+			self.counts[name] += value
+
+	def onLabelChanged(self, appName, fingerprint, label, previousLabel):
+		# Notified with the store's lock held, so one at a time.
+		if fingerprint is None:
+			self.notifiedCounts[appName] = 0
+		elif label is None:
+			self.notifiedCounts[appName] = self.notifiedCounts.get(appName, 0) - 1
+		elif previousLabel is None:
+			self.notifiedCounts[appName] = self.notifiedCounts.get(appName, 0) + 1
+
+	def checkLabels(self, appName, labels):
+		"""Check that a copy of an app's labels holds one whole write."""
+		if len(labels) != len(self.fingerprints[appName]):
+			self.fail(f"{appName}: {len(labels)} labels seen, expected {len(self.fingerprints[appName])}")
+			return
+		writes = set(labels.values())
+		if len(writes) != 1:
+			self.fail(f"{appName}: labels from {len(writes)} writes seen together: {sorted(writes)[:3]}")
+
+	def reader(self, seed):
+		rng = random.Random(seed)
+		store = self.store
+		lookups = snapshots = 0
+		try:
+			while not self.stop.is_set():
+				appName = rng.choice(self.apps)
+				fingerprints = self.fingerprints[appName]
+				for _index in range(50):
+					fingerprint = rng.choice(fingerprints)
+					if store.get(fingerprint) is None or store.getLabelKey(fingerprint) != fingerprint:
+						self.fail(f"{appName}: no label for a fingerprint")
+					lookups += 1
+				self.checkLabels(appName, store.getLabelsForApp(appName))
+				for otherApp, labels in store.getAllByApp().items():
+					if otherApp in self.fingerprints:
+						self.checkLabels(otherApp, dict(labels))
+				snapshots += 1
+		except Exception as e:
+			self.fail(f"reader: {e!r}")
+		self.count("lookups", lookups)
+		self.count("snapshots", snapshots)
+
+	def writer(self, writerIndex, seed):
+		rng = random.Random(seed)
+		store = self.store
+		writes = 0
+		try:
+			while not self.stop.is_set():
+				appName = rng.choice(self.apps)
+				label = f"writer{writerIndex}:{writes}"
+				with store.batch():
+					if rng.random() < 0.2:
+						# Replacing all of an app's labels, as importing a label pack does.
+						store.removeApp(appName)
+					store.setMany((fp, label) for fp in self.fingerprints[appName])
+				writes += 1
+		except Exception as e:
+			self.fail(f"writer: {e!r}")
+		self.count("writes", writes)
+
+	def externalWriter(self, seed):
+		"""Rewrite app files directly, as another program would."""
+		rng = random.Random(seed)
+		writes = 0
+		try:
+			while not self.stop.is_set():
+				appName = rng.choice(self.apps)
+				labels = {fp: f"external:{writes}" for fp in self.fingerprints[appName]}
+				data = self.store.dumpAppData(appName, labels)
+				filePath = self.labeler.getAppFilePath(appName)
+				# Written aside and renamed, so the store never reads half a file.
+				tempPath = f"{filePath}.tmp"
+				with open(tempPath, "w", encoding="utf-8") as f:
+					json.dump(data, f)
+				os.replace(tempPath, filePath)
+				writes += 1
+				time.sleep(0.01)
+		except Exception as e:
+			self.fail(f"external writer: {e!r}")
+		self.count("externalWrites", writes)
+
+	def checkFiles(self):
+		"""Check that the store matches what a new store reads from the files, and its notifications."""
+		self.store.checkForChanges()
+		fresh = self.labeler.LabelStore()
+		for appName in self.apps:
+			inMemory = self.store.getLabelsForApp(appName)
+			onDisk = fresh.getLabelsForApp(appName)
+			if inMemory != onDisk:
+				self.fail(f"{appName}: the store and its file differ after the run")
+			notified = self.notifiedCounts.get(appName, 0)
+			if notified != len(inMemory):
+				self.fail(f"{appName}: notifications counted {notified} labels, the store has {len(inMemory)}")
+
+	def run(self, seconds, readers, writers, external):
+		threads = [threading.Thread(target=self.reader, args=(index,)) for index in range(readers)]
+		threads += [threading.Thread(target=self.writer, args=(index, 1000 + index)) for index in range(writers)]
+		if external:
+			threads.append(threading.Thread(target=self.externalWriter, args=(2000,)))
+		for thread in threads:
+			thread.start()
+		self.stop.wait(seconds)
+		self.stop.set()
+		for thread in threads:
+			thread.join()
+		self.checkFiles()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Stress a Custom Labels LabelStore with concurrent threads.")
+	parser.add_argument("--seconds", type=float, default=10, help="how long to run (default 10)")
+	parser.add_argument("--readers", type=int, default=4, help="number of reader threads (default 4)")
+	parser.add_argument("--writers", type=int, default=2, help="number of writer threads (default 2)")
+	parser.add_argument("--apps", type=int, default=4, help="number of apps (default 4)")
+	parser.add_argument("--labels", type=int, default=200, help="labels per app (default 200)")
+	parser.add_argument(
+		"--external", action="store_true",
+		help="also rewrite app files from another thread, as other programs would",
+	)
+	args = parser.parse_args()
+
+	package = offline.setup()
+	# Check files on every use, and switch threads often, to meet more interleavings.
+	package.labeler.CHANGE_CHECK_INTERVAL = 0
+	sys.setswitchinterval(1e-5)
+	stress = Stress(package, args.apps, args.labels)
+	start = time.perf_counter()
+	stress.run(args.seconds, args.readers, args.writers, args.external)
+	elapsed = time.perf_counter() - start
+	print(f"Ran {elapsed:.1f} s: " + ", ".join(f"{count} {name}" for name, count in stress.counts.items()))
+	if stress.failures:
+		print(f"\n{len(stress.failures)} failures:")
+		for failure in stress.failures:
+			print(f"  {failure}")
+		sys.exit(1)
+	print("No failures")
+
+
+if __name__ == "__main__":
+	main()